@@ -22,6 +22,24 @@
         "views/concepto_views.xml",          
         "views/centro_costo_views.xml",      
         "views/proveedor_views.xml", 
+        "views/evento_views.xml",
+        "views/cola_views.xml",
+        "views/importacion_views.xml",
+        "views/cfdi_views.xml",
+        "views/fondo_views.xml",
+        "views/cubo_views.xml",
+        "views/medicion_views.xml",
+        "views/recalculo_views.xml",
+        "views/archivo_views.xml",
+        "views/presupuesto_views.xml",
+        "views/comprobante_views.xml",
+        "views/consolidacion_views.xml",
+        
+        # Reportes
+        "report/vale_caja_report.xml",
+        
+        # Datos
+        "data/ir_cron_data.xml",
     ],
     "installable": True,
     "application": True,
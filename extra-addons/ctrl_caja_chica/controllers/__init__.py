@@ -0,0 +1,2 @@
+from . import bandeja_api
+from . import comprobante
@@ -0,0 +1,108 @@
+import hashlib
+
+from odoo import fields, http
+from odoo.exceptions import AccessError
+from odoo.http import request
+
+from ..models.solicitud import COLAS_TOMA
+
+LIMITE_DEFAULT = 20
+LIMITE_MAXIMO = 100
+
+
+class CtrlCajaBandejaApi(http.Controller):
+    """API JSON ligera para autorizar desde el teléfono sin cargar el cliente web.
+
+    GET  /ctrl_caja/api/bandeja                       solicitudes pendientes del usuario
+    POST /ctrl_caja/api/solicitud/<id>/autorizar      (JSON-RPC) {"nivel": "nivel1"}
+    POST /ctrl_caja/api/solicitud/<id>/rechazar       (JSON-RPC) {"nivel": "nivel1", "comentario": "..."}
+    POST /ctrl_caja/api/tomar                         (JSON-RPC) {"cola": "autorizacion"}
+    """
+
+    @http.route('/ctrl_caja/api/bandeja', type='http', auth='user', methods=['GET'])
+    def bandeja(self, limite=LIMITE_DEFAULT, cursor=None, **kwargs):
+        """Página de la bandeja, paginada por llave (fecha_solicitud, id).
+        La respuesta trae `siguiente`: el cursor a enviar para la página siguiente.
+        Con If-None-Match y la bandeja sin cambios responde 304 sin cuerpo.
+        """
+        try:
+            limite = min(max(int(limite), 1), LIMITE_MAXIMO)
+            cursor = self._leer_cursor(cursor)
+        except ValueError:
+            return request.make_json_response({'error': 'Parámetros de paginación inválidos.'}, status=400)
+
+        Bandeja = request.env['ctrl.caja.bandeja']
+        huella = f'{Bandeja._version_api()}:{limite}:{self._escribir_cursor(cursor)}'
+        etag = f'W/"{hashlib.sha1(huella.encode()).hexdigest()}"'
+        encabezados = [('ETag', etag), ('Cache-Control', 'private, no-cache')]
+        if etag in request.httprequest.headers.get('If-None-Match', ''):
+            return request.make_response('', headers=encabezados, status=304)
+
+        solicitudes, siguiente = Bandeja._pagina_api(limite, cursor)
+        return request.make_json_response({
+            'solicitudes': [Bandeja._datos_api(solicitud) for solicitud in solicitudes],
+            'siguiente': self._escribir_cursor(siguiente),
+        }, headers=encabezados)
+
+    @http.route('/ctrl_caja/api/solicitud/<int:solicitud_id>/autorizar', type='json', auth='user', methods=['POST'])
+    def autorizar(self, solicitud_id, nivel=None, comentario=None, **kwargs):
+        """Autoriza el nivel indicado; enviar el nivel mostrado en la bandeja evita
+        autorizar dos veces si la solicitud avanzó mientras tanto
+        """
+        datos = {'nivel': nivel}
+        if comentario:
+            datos['comentario'] = comentario
+        return self._transicionar(solicitud_id, 'autorizar', **datos)
+
+    @http.route('/ctrl_caja/api/solicitud/<int:solicitud_id>/rechazar', type='json', auth='user', methods=['POST'])
+    def rechazar(self, solicitud_id, nivel=None, comentario=None, **kwargs):
+        if not comentario or not comentario.strip():
+            return {'ok': False, 'error': 'Debe especificar un motivo para el rechazo.'}
+        return self._transicionar(solicitud_id, 'rechazar', nivel=nivel, comentario=comentario)
+
+    @http.route('/ctrl_caja/api/tomar', type='json', auth='user', methods=['POST'])
+    def tomar(self, cola='autorizacion', **kwargs):
+        """Toma la siguiente solicitud libre de la cola; dos teléfonos que piden
+        al mismo tiempo reciben solicitudes distintas
+        """
+        if cola not in COLAS_TOMA:
+            return {'ok': False, 'error': f'Cola desconocida: {cola}.'}
+        solicitud = request.env['ctrl.caja.solicitud']._tomar_siguiente(cola)
+        if not solicitud:
+            return {'ok': True, 'solicitud': None}
+        return {
+            'ok': True,
+            'solicitud': request.env['ctrl.caja.bandeja']._datos_api(solicitud),
+            'tomada_hasta': fields.Datetime.to_string(solicitud.tomada_hasta),
+        }
+
+    def _transicionar(self, solicitud_id, accion, **datos):
+        """Aplica la transición con el mismo motor que los botones del formulario"""
+        solicitud = request.env['ctrl.caja.solicitud'].browse(solicitud_id).exists()
+        try:
+            solicitud.check_access_rights('write')
+            solicitud.check_access_rule('write')
+        except AccessError:
+            solicitud = solicitud.browse()
+        if not solicitud:
+            return {'ok': False, 'error': 'La solicitud no existe o no tiene acceso a ella.'}
+        procesadas, errores = solicitud._transicionar(accion, **datos)
+        if errores:
+            return {'ok': False, 'error': errores[solicitud]}
+        return {'ok': True, 'id': solicitud.id, 'estado': procesadas.estado}
+
+    @staticmethod
+    def _leer_cursor(cursor):
+        """'AAAA-MM-DD_id' → (date, id)"""
+        if not cursor:
+            return None
+        fecha, _, ultimo_id = cursor.partition('_')
+        if not fecha:
+            raise ValueError(cursor)
+        return fields.Date.to_date(fecha), int(ultimo_id)
+
+    @staticmethod
+    def _escribir_cursor(cursor):
+        if not cursor:
+            return None
+        return f'{fields.Date.to_string(cursor[0])}_{cursor[1]}'
@@ -0,0 +1,40 @@
+from odoo import http
+from odoo.exceptions import AccessError, UserError
+from odoo.http import request
+
+from ..models.comprobante import MODELOS_COMPROBANTE
+
+
+class CtrlCajaComprobanteController(http.Controller):
+
+    @http.route('/ctrl_caja/comprobante/subir', type='http', auth='user', methods=['POST'])
+    def subir(self, modelo, res_id, archivo, **kwargs):
+        """Sube un comprobante (multipart/form-data: modelo, res_id, archivo, csrf_token).
+        Werkzeug deja el cuerpo en un temporal en disco y el archivo se lee por bloques:
+        una foto de varios MB nunca se carga completa en memoria.
+        """
+        if modelo not in MODELOS_COMPROBANTE:
+            return request.make_json_response({'error': 'Modelo no soportado.'}, status=400)
+        registro = request.env[modelo].browse(int(res_id)).exists()
+        if not registro:
+            return request.make_json_response({'error': 'El registro no existe.'}, status=404)
+        try:
+            comprobante = request.env['ctrl.caja.comprobante']._desde_archivo(archivo.stream, archivo.filename)
+            comprobante._vincular(registro)
+        except (AccessError, UserError) as e:
+            return request.make_json_response({'error': str(e)}, status=403 if isinstance(e, AccessError) else 400)
+        return request.make_json_response({'id': comprobante.id, 'checksum': comprobante.checksum})
+
+    @http.route('/ctrl_caja/comprobante/<int:comprobante_id>/miniatura', type='http', auth='user', methods=['GET'])
+    def miniatura(self, comprobante_id, **kwargs):
+        """Miniatura del comprobante: se genera en la primera vista y después se sirve
+        desde el filestore con su ETag; las listas y kanban nunca bajan el original
+        """
+        comprobante = request.env['ctrl.caja.comprobante'].browse(comprobante_id).exists()
+        if not comprobante:
+            raise request.not_found()
+        # Antes de generar nada con sudo: la miniatura es del registro vinculado
+        comprobante._check_acceso_vinculados()
+        if not comprobante._miniatura():
+            return request.redirect('/web/static/img/mimetypes/pdf.svg')
+        return request.env['ir.binary']._get_stream_from(comprobante, 'miniatura').get_response()
@@ -1,7 +1,24 @@
+from . import secuencia
+from . import medicion
 from . import caja_chica
 from . import arqueo
+from . import fondo
+from . import estadisticas
+from . import busqueda
 from . import concepto
 from . import centro_costo
 from . import proveedor
 from . import solicitud
+from . import archivo
+from . import presupuesto
+from . import comprobante
+from . import cubo
+from . import bandeja
+from . import solicitud_evento
+from . import cola
+from . import recalculo
+from . import consolidacion
+from . import benchmark
+from . import importacion_wizard
+from . import cfdi_wizard
 from . import solicitud_rechazo_wizard
\ No newline at end of file
@@ -0,0 +1,215 @@
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+from odoo.tools import create_index
+
+from .solicitud import CtrlCajaSolicitud
+
+PARAMETRO_DIAS = 'ctrl_caja_chica.dias_archivo'
+ESTADOS_CERRADOS = ('entregado', 'rechazado', 'cancelado')
+TAMANO_LOTE_ARCHIVO = 1000
+# Las archivadas se muestran en el historial con su id más este valor: las ids de las
+# activas son int4 y nunca lo alcanzan, así que no chocan y siguen siendo positivas
+DESPLAZAMIENTO_HISTORIAL = 2 ** 31
+
+
+def _seleccion_solicitud(campo):
+    return lambda self: self.env['ctrl.caja.solicitud']._fields[campo].selection
+
+
+class CtrlCajaSolicitudArchivo(models.Model):
+    _name = 'ctrl.caja.solicitud.archivo'
+    _description = 'Solicitud de Compra Archivada'
+    _inherit = ['mail.thread']
+    _order = 'fecha_solicitud desc, id desc'
+    _rec_name = 'numero_solicitud'
+
+    # Mismos campos almacenados que ctrl.caja.solicitud; se copian por nombre al archivar
+    solicitud_origen_id = fields.Integer(string='ID Original', readonly=True, index=True)
+    fecha_archivo = fields.Datetime(string='Fecha de Archivo', readonly=True)
+    numero_solicitud = fields.Char(string='Número de Solicitud', readonly=True, index=True)
+    fecha_solicitud = fields.Date(string='Fecha de Solicitud', readonly=True)
+    responsable_id = fields.Many2one('res.users', string='Responsable', readonly=True)
+    categoria_id = fields.Many2one('ctrl.caja.concepto', string='Concepto', readonly=True,
+                                   index='btree_not_null')
+    concepto_otro = fields.Boolean(string='Concepto: Otros', readonly=True)
+    concepto_texto = fields.Char(string='Especificar Concepto', readonly=True)
+    centro_costo_id = fields.Many2one('ctrl.caja.centro.costo', string='Centro de Costos',
+                                      readonly=True, index=True)
+    monto_estimado = fields.Monetary(string='Costo Estimado', readonly=True, currency_field='currency_id')
+    currency_id = fields.Many2one('res.currency', string='Moneda', readonly=True)
+    metodo_pago = fields.Selection(_seleccion_solicitud('metodo_pago'), string='Forma de Pago', readonly=True)
+    proveedor_id = fields.Many2one('ctrl.caja.proveedor', string='Proveedor', readonly=True,
+                                   index='btree_not_null')
+    proveedor_otro = fields.Boolean(string='Proveedor: Otros', readonly=True)
+    proveedor_texto = fields.Char(string='Especificar Proveedor', readonly=True)
+    estado = fields.Selection(_seleccion_solicitud('estado'), string='Estatus', readonly=True)
+    nivel_requerido = fields.Selection(_seleccion_solicitud('nivel_requerido'),
+                                       string='Nivel de Autorización', readonly=True)
+    autorizador_nivel1_id = fields.Many2one('res.users', string='Autorizador Nivel 1', readonly=True)
+    fecha_autorizacion_nivel1 = fields.Datetime(string='Fecha Autorización N1', readonly=True)
+    comentario_nivel1 = fields.Text(string='Comentarios Nivel 1', readonly=True)
+    autorizador_nivel2_id = fields.Many2one('res.users', string='Autorizador Nivel 2', readonly=True)
+    fecha_autorizacion_nivel2 = fields.Datetime(string='Fecha Autorización N2', readonly=True)
+    comentario_nivel2 = fields.Text(string='Comentarios Nivel 2', readonly=True)
+    autorizador_nivel3_id = fields.Many2one('res.users', string='Autorizador Nivel 3', readonly=True)
+    fecha_autorizacion_nivel3 = fields.Datetime(string='Fecha Autorización N3', readonly=True)
+    comentario_nivel3 = fields.Text(string='Comentarios Nivel 3', readonly=True)
+    tesorero_id = fields.Many2one('res.users', string='Entregado por', readonly=True)
+    fecha_entrega = fields.Datetime(string='Fecha de Entrega', readonly=True)
+    comentario_tesoreria = fields.Text(string='Comentarios Tesorería', readonly=True)
+    descripcion = fields.Text(string='Descripción / Justificación', readonly=True)
+    notas_internas = fields.Text(string='Notas Internas', readonly=True)
+    movimiento_id = fields.Many2one('ctrl.caja.chica', string='Movimiento de Caja', readonly=True,
+                                    ondelete='set null')
+    cfdi_uuid = fields.Char(string='UUID CFDI', readonly=True, index='btree_not_null')
+    comprobante_ids = fields.Many2many('ctrl.caja.comprobante', 'ctrl_caja_solicitud_archivo_comprobante_rel',
+                                       'archivo_id', 'comprobante_id', string='Comprobantes', readonly=True)
+    evento_ids = fields.Many2many('ctrl.caja.solicitud.evento', string='Bitácora',
+                                  compute='_compute_evento_ids')
+
+    _sql_constraints = [
+        ('solicitud_origen_unique', 'unique(solicitud_origen_id)', 'La solicitud ya está archivada'),
+    ]
+
+    def init(self):
+        create_index(self.env.cr, 'ctrl_caja_solicitud_archivo_orden_idx', self._table,
+                     ['fecha_solicitud DESC', 'id DESC'])
+
+    def _compute_evento_ids(self):
+        # La bitácora pierde el vínculo al archivar pero conserva el número de solicitud
+        eventos = self.env['ctrl.caja.solicitud.evento'].search([
+            ('numero_solicitud', 'in', self.mapped('numero_solicitud')),
+        ])
+        for rec in self:
+            rec.evento_ids = eventos.filtered(lambda e: e.numero_solicitud == rec.numero_solicitud)
+
+    def _columnas_copiadas(self):
+        """Columnas que comparten la tabla activa y la de archivo"""
+        Solicitud = self.env['ctrl.caja.solicitud']
+        return [
+            nombre for nombre, campo in self._fields.items()
+            if campo.store and campo.column_type and nombre != 'id'
+            and nombre not in models.LOG_ACCESS_COLUMNS
+            and nombre in Solicitud._fields and Solicitud._fields[nombre].store
+        ]
+
+    @api.model
+    def _archivar(self, limite=TAMANO_LOTE_ARCHIVO):
+        """Mueve al archivo un lote de solicitudes cerradas más antiguas que los días
+        configurados en ctrl_caja_chica.dias_archivo (sin valor, el archivado está apagado).
+        Lo ejecuta el cron, que se vuelve a programar mientras queden solicitudes por archivar.
+        """
+        dias = int(self.env['ir.config_parameter'].sudo().get_param(PARAMETRO_DIAS) or 0)
+        if dias <= 0:
+            return 0
+        Solicitud = self.env['ctrl.caja.solicitud'].sudo()
+        solicitudes = Solicitud.search([
+            ('estado', 'in', ESTADOS_CERRADOS),
+            ('fecha_solicitud', '<', fields.Date.context_today(self) - timedelta(days=dias)),
+        ], order='id', limit=limite)
+        if not solicitudes:
+            return 0
+        solicitudes.flush_recordset()
+        columnas = ', '.join(self._columnas_copiadas())
+        self.env.cr.execute(f"""
+            INSERT INTO ctrl_caja_solicitud_archivo (solicitud_origen_id, fecha_archivo, {columnas},
+                                                     create_uid, create_date, write_uid, write_date)
+            SELECT id, NOW() AT TIME ZONE 'UTC', {columnas}, create_uid, create_date, write_uid, write_date
+              FROM ctrl_caja_solicitud
+             WHERE id IN %s
+            ON CONFLICT (solicitud_origen_id) DO NOTHING
+        """, [tuple(solicitudes.ids)])
+        self._trasladar_vinculos(solicitudes)
+        self.invalidate_model()
+        # El cubo conserva las celdas de las archivadas; la bitácora conserva el número
+        solicitudes.with_context(ctrl_caja_archivando=True).unlink()
+        if len(solicitudes) == limite:
+            self.env.ref('ctrl_caja_chica.ir_cron_ctrl_caja_archivo')._trigger()
+        return len(solicitudes)
+
+    @api.model
+    def _trasladar_vinculos(self, solicitudes):
+        """Pasa a las archivadas los comprobantes, los mensajes del chatter y sus adjuntos,
+        que el unlink de la solicitud borraría
+        """
+        cr = self.env.cr
+        ids = tuple(solicitudes.ids)
+        cr.execute("""
+            INSERT INTO ctrl_caja_solicitud_archivo_comprobante_rel (archivo_id, comprobante_id)
+            SELECT a.id, r.comprobante_id
+              FROM ctrl_caja_solicitud_comprobante_rel r
+              JOIN ctrl_caja_solicitud_archivo a ON a.solicitud_origen_id = r.solicitud_id
+             WHERE r.solicitud_id IN %s
+            ON CONFLICT DO NOTHING
+        """, [ids])
+        self.env['mail.message'].flush_model(['model', 'res_id'])
+        self.env['ir.attachment'].flush_model(['res_model', 'res_id'])
+        # Los valores de seguimiento cuelgan del mensaje y se van con él
+        cr.execute("""
+            UPDATE mail_message m
+               SET model = %s, res_id = a.id
+              FROM ctrl_caja_solicitud_archivo a
+             WHERE m.model = %s AND m.res_id = a.solicitud_origen_id AND a.solicitud_origen_id IN %s
+        """, [self._name, solicitudes._name, ids])
+        cr.execute("""
+            UPDATE ir_attachment t
+               SET res_model = %s, res_id = a.id
+              FROM ctrl_caja_solicitud_archivo a
+             WHERE t.res_model = %s AND t.res_id = a.solicitud_origen_id AND t.res_field IS NULL
+               AND a.solicitud_origen_id IN %s
+        """, [self._name, solicitudes._name, ids])
+        self.env['mail.message'].invalidate_model(['model', 'res_id'])
+        self.env['ir.attachment'].invalidate_model(['res_model', 'res_id'])
+
+    def _filas_cubo(self):
+        # Mismos campos que la solicitud activa: mismas celdas del cubo
+        return CtrlCajaSolicitud._filas_cubo(self)
+
+
+class CtrlCajaSolicitudHistorial(models.Model):
+    _name = 'ctrl.caja.solicitud.historial'
+    _description = 'Historial de Solicitudes (activas y archivadas)'
+    _auto = False
+    _order = 'fecha_solicitud desc, id desc'
+    _rec_name = 'numero_solicitud'
+
+    archivada = fields.Boolean(string='Archivada', readonly=True)
+    solicitud_id = fields.Many2one('ctrl.caja.solicitud', string='Solicitud', readonly=True)
+    archivo_id = fields.Many2one('ctrl.caja.solicitud.archivo', string='Solicitud Archivada', readonly=True)
+    numero_solicitud = fields.Char(string='Número de Solicitud', readonly=True)
+    fecha_solicitud = fields.Date(string='Fecha de Solicitud', readonly=True)
+    responsable_id = fields.Many2one('res.users', string='Responsable', readonly=True)
+    categoria_id = fields.Many2one('ctrl.caja.concepto', string='Concepto', readonly=True)
+    centro_costo_id = fields.Many2one('ctrl.caja.centro.costo', string='Centro de Costos', readonly=True)
+    proveedor_id = fields.Many2one('ctrl.caja.proveedor', string='Proveedor', readonly=True)
+    monto_estimado = fields.Monetary(string='Costo Estimado', readonly=True, currency_field='currency_id')
+    currency_id = fields.Many2one('res.currency', string='Moneda', readonly=True)
+    estado = fields.Selection(_seleccion_solicitud('estado'), string='Estatus', readonly=True)
+    nivel_requerido = fields.Selection(_seleccion_solicitud('nivel_requerido'),
+                                       string='Nivel de Autorización', readonly=True)
+
+    def init(self):
+        columnas = ('numero_solicitud, fecha_solicitud, responsable_id, categoria_id, centro_costo_id, '
+                    'proveedor_id, monto_estimado, currency_id, estado, nivel_requerido')
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        # Las archivadas se desplazan fuera del rango de ids de las activas
+        self.env.cr.execute(f"""
+            CREATE VIEW {self._table} AS (
+                SELECT id::bigint AS id, false AS archivada, id AS solicitud_id, NULL::int AS archivo_id, {columnas}
+                  FROM ctrl_caja_solicitud
+                UNION ALL
+                SELECT id::bigint + %s, true, NULL::int, id, {columnas}
+                  FROM ctrl_caja_solicitud_archivo
+            )
+        """, [DESPLAZAMIENTO_HISTORIAL])
+
+    def action_abrir(self):
+        self.ensure_one()
+        registro = self.archivo_id or self.solicitud_id
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': registro._name,
+            'res_id': registro.id,
+            'view_mode': 'form',
+        }
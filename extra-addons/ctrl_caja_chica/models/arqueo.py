@@ -3,6 +3,7 @@ from odoo import models, fields, api
 class CtrlCajaArqueo(models.Model):
     _name = 'ctrl.caja.arqueo'
     _description = 'Arqueo de Caja Chica'
+    _inherit = ['ctrl.caja.secuencia.mixin']
     _order = 'fecha desc'
 
     name = fields.Char(string='Referencia', readonly=True)
@@ -23,7 +24,18 @@ class CtrlCajaArqueo(models.Model):
         for rec in self:
             rec.diferencia = (rec.monto_caja or 0.0) - (rec.monto_real or 0.0)
 
-    @api.model
-    def create(self, vals):
-        vals['name'] = vals.get('name') or self.env['ir.sequence'].next_by_code('ctrl.caja.arqueo') or '/'
-        return super().create(vals)
+    @api.onchange('fecha')
+    def _onchange_fecha(self):
+        """Propone el monto esperado con el saldo del fondo a la fecha del arqueo"""
+        if self.fecha:
+            self.monto_caja = self.env['ctrl.caja.fondo.movimiento'].sudo()._saldo_a_fecha(self.fecha)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._asignar_folios(vals_list, 'name', 'ctrl.caja.arqueo', '/')
+        Fondo = self.env['ctrl.caja.fondo.movimiento'].sudo()
+        for vals in vals_list:
+            if 'monto_caja' not in vals:
+                fecha = fields.Date.to_date(vals.get('fecha')) or fields.Date.context_today(self)
+                vals['monto_caja'] = Fondo._saldo_a_fecha(fecha)
+        return super().create(vals_list)
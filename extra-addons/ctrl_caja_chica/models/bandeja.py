@@ -0,0 +1,217 @@
+from collections import defaultdict
+
+from odoo import models, fields, api
+from odoo.tools import create_index, html_escape
+
+from .solicitud import ESTADO_NIVEL
+
+NIVELES_BANDEJA = ('nivel1', 'nivel2', 'nivel3')
+LIMITE_RESUMEN = 50
+
+
+class CtrlCajaBandeja(models.Model):
+    _name = 'ctrl.caja.bandeja'
+    _description = 'Bandeja de Autorización por Usuario'
+    _log_access = False
+
+    user_id = fields.Many2one('res.users', string='Autorizador', required=True,
+                              ondelete='cascade', index=True)
+    solicitud_id = fields.Many2one('ctrl.caja.solicitud', string='Solicitud', required=True,
+                                   ondelete='cascade', index=True)
+    centro_costo_id = fields.Many2one('ctrl.caja.centro.costo', string='Centro de Costo',
+                                      required=True, ondelete='cascade', index=True)
+    nivel = fields.Selection([
+        ('nivel1', 'Nivel 1'),
+        ('nivel2', 'Nivel 2'),
+        ('nivel3', 'Nivel 3')
+    ], string='Nivel', required=True)
+    # Ya incluida en un resumen enviado al autorizador
+    notificado = fields.Boolean(string='Notificado', default=False)
+
+    _sql_constraints = [
+        ('bandeja_unique', 'unique(user_id, solicitud_id, nivel)',
+         'La solicitud ya está en la bandeja del autorizador para este nivel')
+    ]
+
+    def init(self):
+        create_index(self.env.cr, 'ctrl_caja_bandeja_user_solicitud_idx',
+                     self._table, ['user_id', 'solicitud_id'])
+        self._reconstruir()
+
+    def _sql_vigentes(self, condicion):
+        """Filas de bandeja (user_id, solicitud_id, centro_costo_id, nivel) que corresponden a
+        las solicitudes en autorización que cumplan la condición
+        """
+        selects = []
+        for nivel in NIVELES_BANDEJA:
+            rel = self.env['ctrl.caja.centro.costo']._fields[f'autorizador_{nivel}_ids'].relation
+            selects.append(f"""
+                SELECT rel.user_id, s.id, s.centro_costo_id, '{nivel}'
+                  FROM ctrl_caja_solicitud s
+                  JOIN {rel} rel ON rel.centro_costo_id = s.centro_costo_id
+                 WHERE s.estado = 'autorizacion_{nivel}' AND {condicion}
+            """)
+        return ' UNION ALL '.join(selects)
+
+    def _sincronizar(self, condicion_bandeja, condicion, params):
+        """Elimina las filas que ya no corresponden e inserta las faltantes.
+        Las filas que siguen vigentes se conservan (y con ellas su marca de notificado).
+        """
+        vigentes = self._sql_vigentes(condicion)
+        self.env.cr.execute(f"""
+            DELETE FROM ctrl_caja_bandeja b
+             WHERE {condicion_bandeja}
+               AND (b.user_id, b.solicitud_id, b.nivel) NOT IN (
+                    SELECT v.user_id, v.id, v.nivel FROM ({vigentes}) AS v (user_id, id, centro_costo_id, nivel)
+               )
+        """, params * (1 + len(NIVELES_BANDEJA)))
+        self.env.cr.execute(f"""
+            INSERT INTO ctrl_caja_bandeja (user_id, solicitud_id, centro_costo_id, nivel, notificado)
+            SELECT v.*, false FROM ({vigentes}) AS v
+            ON CONFLICT DO NOTHING
+        """, params * len(NIVELES_BANDEJA))
+        self.invalidate_model()
+
+    def _reconstruir(self):
+        """Reconstruye la bandeja completa desde las solicitudes abiertas"""
+        self._sincronizar('TRUE', 'TRUE', [])
+
+    def _actualizar_solicitudes(self, solicitudes):
+        """Sincroniza las filas de bandeja de las solicitudes dadas"""
+        if not solicitudes:
+            return
+        solicitudes.flush_recordset(['estado', 'centro_costo_id'])
+        self.env['ctrl.caja.centro.costo'].flush_model([
+            'autorizador_nivel1_ids', 'autorizador_nivel2_ids', 'autorizador_nivel3_ids',
+        ])
+        self._sincronizar('b.solicitud_id IN %s', 's.id IN %s', [tuple(solicitudes.ids)])
+        solicitudes.invalidate_recordset(['bandeja_ids'])
+
+    def _actualizar_centros(self, centros):
+        """Sincroniza la bandeja de las solicitudes abiertas de los centros dados"""
+        if not centros:
+            return
+        solicitudes = self.env['ctrl.caja.solicitud'].sudo().search([
+            ('centro_costo_id', 'in', centros.ids),
+            ('estado', 'in', [f'autorizacion_{nivel}' for nivel in NIVELES_BANDEJA]),
+        ])
+        self._actualizar_solicitudes(solicitudes)
+
+    # ============ RESUMEN PARA AUTORIZADORES ============
+
+    @api.model
+    def _enviar_resumen(self):
+        """Envía a cada autorizador un solo correo con las solicitudes que entraron a su
+        bandeja desde el resumen anterior. Lo ejecuta el cron.
+        """
+        self.flush_model()
+        self.env.cr.execute("""
+            UPDATE ctrl_caja_bandeja SET notificado = true
+             WHERE notificado IS NOT TRUE
+         RETURNING user_id, solicitud_id
+        """)
+        pendientes = defaultdict(list)
+        for user_id, solicitud_id in self.env.cr.fetchall():
+            pendientes[user_id].append(solicitud_id)
+        self.invalidate_model(['notificado'])
+        if not pendientes:
+            return 0
+        base_url = self.env['ir.config_parameter'].sudo().get_param('web.base.url')
+        Solicitud = self.env['ctrl.caja.solicitud'].sudo()
+        # Una sola lectura para todos los correos
+        Solicitud.browse({i for ids in pendientes.values() for i in ids}).read(
+            ['numero_solicitud', 'centro_costo_id', 'monto_estimado', 'estado'])
+        correos = []
+        for usuario in self.env['res.users'].sudo().browse(list(pendientes)):
+            if not usuario.email:
+                continue
+            solicitudes = Solicitud.browse(sorted(pendientes[usuario.id]))
+            correos.append({
+                'subject': f'Caja Chica: {len(solicitudes)} solicitud(es) pendiente(s) de autorizar',
+                'body_html': self._cuerpo_resumen(solicitudes, base_url),
+                'email_to': usuario.email_formatted,
+                'email_from': self.env.company.email_formatted or usuario.company_id.email_formatted,
+                'auto_delete': True,
+            })
+        if correos:
+            self.env['mail.mail'].sudo().create(correos)
+        return len(correos)
+
+    @api.model
+    def _cuerpo_resumen(self, solicitudes, base_url):
+        estados = dict(solicitudes._fields['estado']._description_selection(self.env))
+        filas = ''.join(
+            f'<tr><td><a href="{base_url}/web#id={s.id}&amp;model=ctrl.caja.solicitud&amp;view_type=form">'
+            f'{html_escape(s.numero_solicitud)}</a></td>'
+            f'<td>{html_escape(s.centro_costo_id.name)}</td>'
+            f'<td style="text-align: right;">${s.monto_estimado:,.2f}</td>'
+            f'<td>{estados.get(s.estado, "")}</td></tr>'
+            for s in solicitudes[:LIMITE_RESUMEN]
+        )
+        restantes = len(solicitudes) - LIMITE_RESUMEN
+        return (
+            '<p>Tiene nuevas solicitudes pendientes de autorizar:</p>'
+            '<table border="0" cellpadding="4">'
+            '<tr><th>Solicitud</th><th>Centro de Costos</th><th>Monto</th><th>Estado</th></tr>'
+            f'{filas}</table>'
+            + (f'<p>… y {restantes} más en su bandeja de autorización.</p>' if restantes > 0 else '')
+        )
+
+    # ============ API PARA AUTORIZADORES MÓVILES ============
+
+    @api.model
+    def _version_api(self):
+        """Huella de la bandeja del usuario actual: cambia cuando entra o sale una
+        solicitud, o cuando alguna de ellas se modifica. Se usa como ETag.
+        """
+        self.flush_model()
+        self.env['ctrl.caja.solicitud'].flush_model(['write_date'])
+        self.env.cr.execute("""
+            SELECT COUNT(*), COALESCE(SUM(b.solicitud_id), 0), MAX(s.write_date)
+              FROM ctrl_caja_bandeja b
+              JOIN ctrl_caja_solicitud s ON s.id = b.solicitud_id
+             WHERE b.user_id = %s
+        """, [self.env.uid])
+        cantidad, suma, modificada = self.env.cr.fetchone()
+        return f'{cantidad}-{suma}-{modificada.timestamp() if modificada else 0}'
+
+    @api.model
+    def _pagina_api(self, limite, cursor=None):
+        """Página de la bandeja del usuario actual en el orden de las listas
+        (fecha_solicitud desc, id desc). `cursor` es la (fecha, id) de la última
+        solicitud de la página anterior: se continúa por llave y no por OFFSET.
+        Retorna (solicitudes, cursor de la página siguiente o None).
+        """
+        dominio = [('puedo_autorizar', '=', True)]
+        if cursor:
+            fecha, ultimo_id = cursor
+            dominio += [
+                '|', ('fecha_solicitud', '<', fecha),
+                '&', ('fecha_solicitud', '=', fecha), ('id', '<', ultimo_id),
+            ]
+        # Un registro de más indica si hay página siguiente
+        solicitudes = self.env['ctrl.caja.solicitud'].search(dominio, limit=limite + 1)
+        if len(solicitudes) <= limite:
+            return solicitudes, None
+        solicitudes = solicitudes[:limite]
+        return solicitudes, (solicitudes[-1].fecha_solicitud, solicitudes[-1].id)
+
+    @api.model
+    def _datos_api(self, solicitud):
+        """Representación compacta de una solicitud para la API"""
+        return {
+            'id': solicitud.id,
+            'numero': solicitud.numero_solicitud,
+            'fecha': fields.Date.to_string(solicitud.fecha_solicitud),
+            'responsable': solicitud.responsable_id.name,
+            'centro_costo': solicitud.centro_costo_id.name,
+            'concepto': solicitud.categoria_id.name or solicitud.concepto_texto,
+            'proveedor': solicitud.proveedor_id.name or solicitud.proveedor_texto,
+            'monto': solicitud.monto_estimado,
+            'moneda': solicitud.currency_id.name,
+            'metodo_pago': solicitud.metodo_pago,
+            'estado': solicitud.estado,
+            'nivel': ESTADO_NIVEL.get(solicitud.estado),
+            'nivel_requerido': solicitud.nivel_requerido,
+            'descripcion': solicitud.descripcion or '',
+        }
@@ -0,0 +1,322 @@
+import json
+import logging
+import statistics
+import time
+
+from odoo import models, fields, api
+
+from .solicitud import NIVELES
+
+_logger = logging.getLogger(__name__)
+
+PREFIJO = 'BENCH'
+TAMANO_LOTE_BENCH = 100000
+
+# Especificaciones web_read/web_search_read equivalentes a lo que carga cada vista
+KANBAN_AUTORIZADOR = {
+    campo: {} for campo in (
+        'numero_solicitud', 'fecha_solicitud', 'responsable_id', 'categoria_id', 'concepto_texto',
+        'centro_costo_id', 'proveedor_id', 'proveedor_texto', 'monto_estimado', 'currency_id',
+        'estado', 'nivel_requerido', 'nivel_requerido_texto', 'puedo_autorizar',
+    )
+}
+LISTA_PENDIENTES = {
+    campo: {} for campo in (
+        'numero_solicitud', 'fecha_solicitud', 'responsable_id', 'categoria_id', 'centro_costo_id',
+        'monto_estimado', 'currency_id', 'estado', 'nivel_requerido',
+    )
+}
+LISTA_CATALOGO = {'name': {}, 'cantidad_solicitudes': {}, 'monto_total': {}, 'currency_id': {}}
+FORM_ARQUEO = {
+    'name': {}, 'fecha': {}, 'mes': {}, 'monto_caja': {}, 'monto_real': {}, 'diferencia': {},
+    'accion': {}, 'realizo_id': {}, 'reviso_id': {}, 'currency_id': {},
+    'gastos_ids': {'fields': {'name': {}, 'fecha': {}, 'tipo_gasto': {}, 'monto': {}, 'currency_id': {}}},
+}
+
+
+class CtrlCajaBenchmark(models.AbstractModel):
+    _name = 'ctrl.caja.benchmark'
+    _description = 'Generador de Datos y Benchmark de Caja Chica'
+
+    # ============ GENERADOR DE DATOS ============
+
+    @api.model
+    def _generar_datos(self, centros=20, autorizadores=3, catalogos=200,
+                       solicitudes=1000000, movimientos=1000000, dias=1095):
+        """Carga volumen sintético en una base vacía para medir el módulo. Uso desde odoo shell:
+
+            env['ctrl.caja.benchmark']._generar_datos(centros=50, solicitudes=3000000)
+            env.cr.commit()
+
+        Crea `centros` centros de costo con `autorizadores` usuarios por nivel,
+        `catalogos` conceptos y proveedores, y las solicitudes y movimientos de
+        caja repartidos en los últimos `dias` días. Los registros masivos se
+        insertan por SQL; después se reconstruyen bandeja, cubo, libro del fondo
+        y presupuestos.
+        """
+        inicio = time.monotonic()
+        flujo = self._usuario_flujo()
+        usuarios = self._crear_autorizadores(centros, autorizadores)
+        centros_ids = self.env['ctrl.caja.centro.costo'].create([{
+            'name': f'{PREFIJO} Centro {i}',
+            'codigo': f'{PREFIJO}-{i}',
+            'monto_nivel1': 1000.0,
+            'monto_nivel2': 5000.0,
+            **{
+                f'autorizador_{nivel}_ids': [(6, 0, [flujo.id] + usuarios[(i, nivel)])]
+                for nivel in NIVELES
+            },
+        } for i in range(centros)]).ids
+        conceptos_ids = self.env['ctrl.caja.concepto'].create([
+            {'name': f'{PREFIJO} Concepto {i}', 'codigo': f'{PREFIJO}-C{i}'} for i in range(catalogos)
+        ]).ids
+        proveedores_ids = self.env['ctrl.caja.proveedor'].create([
+            {'name': f'{PREFIJO} Proveedor {i}', 'codigo': f'{PREFIJO}-P{i}'} for i in range(catalogos)
+        ]).ids
+        self.env.flush_all()
+
+        for desde in range(1, solicitudes + 1, TAMANO_LOTE_BENCH):
+            self._insertar_solicitudes(desde, min(desde + TAMANO_LOTE_BENCH - 1, solicitudes),
+                                       centros_ids, conceptos_ids, proveedores_ids, flujo, dias)
+        for desde in range(1, movimientos + 1, TAMANO_LOTE_BENCH):
+            self._insertar_movimientos(desde, min(desde + TAMANO_LOTE_BENCH - 1, movimientos), dias)
+        self._crear_arqueo()
+        self._reconstruir_derivados(centros_ids)
+        _logger.info('Datos de benchmark generados en %.1f s', time.monotonic() - inicio)
+        return True
+
+    @api.model
+    def _usuario_flujo(self):
+        """Usuario con el que se miden los escenarios: administrador de caja chica
+        (solicitante, autorizador de todos los niveles y tesorero)
+        """
+        login = f'{PREFIJO.lower()}.flujo'
+        usuario = self.env['res.users'].with_context(active_test=False).search([('login', '=', login)])
+        if usuario:
+            return usuario
+        return self.env['res.users'].with_context(no_reset_password=True).create({
+            'name': f'{PREFIJO} Flujo',
+            'login': login,
+            'groups_id': [(6, 0, [
+                self.env.ref('base.group_user').id,
+                self.env.ref('ctrl_caja_chica.group_caja_admin').id,
+            ])],
+        })
+
+    @api.model
+    def _crear_autorizadores(self, centros, autorizadores):
+        """Retorna {(centro, nivel): [user_id]} con usuarios nuevos por centro y nivel"""
+        claves = [(i, nivel, j) for i in range(centros) for nivel in NIVELES for j in range(autorizadores)]
+        base = self.env.ref('base.group_user').id
+        usuarios = self.env['res.users'].with_context(no_reset_password=True).create([{
+            'name': f'{PREFIJO} Autorizador {i}-{nivel}-{j}',
+            'login': f'{PREFIJO.lower()}.{i}.{nivel}.{j}',
+            'groups_id': [(6, 0, [base, self.env.ref(f'ctrl_caja_chica.group_caja_autorizador_{nivel}').id])],
+        } for i, nivel, j in claves])
+        resultado = {}
+        for (i, nivel, __), usuario in zip(claves, usuarios):
+            resultado.setdefault((i, nivel), []).append(usuario.id)
+        return resultado
+
+    @api.model
+    def _insertar_solicitudes(self, desde, hasta, centros_ids, conceptos_ids, proveedores_ids, usuario, dias):
+        """Inserta solicitudes con una distribución de estados cercana a la operación real:
+        la mayoría entregadas, una fracción abierta en autorización y el resto cerradas.
+        """
+        self.env.cr.execute("""
+            WITH base AS (
+                SELECT g,
+                       (%(centros)s::int[])[1 + floor(random() * cardinality(%(centros)s::int[]))::int] AS centro_id,
+                       round((50 + random() * random() * 10000)::numeric, 2) AS monto,
+                       CURRENT_DATE - floor(random() * %(dias)s)::int AS fecha,
+                       random() AS r
+                  FROM generate_series(%(desde)s, %(hasta)s) g
+            ), niveles AS (
+                SELECT b.*,
+                       CASE WHEN b.monto < c.monto_nivel1 THEN 1
+                            WHEN b.monto < c.monto_nivel2 THEN 2
+                            ELSE 3 END AS nivel
+                  FROM base b
+                  JOIN ctrl_caja_centro_costo c ON c.id = b.centro_id
+            )
+            INSERT INTO ctrl_caja_solicitud (
+                numero_solicitud, fecha_solicitud, responsable_id, centro_costo_id, categoria_id,
+                proveedor_id, proveedor_texto, monto_estimado, currency_id, metodo_pago, estado,
+                nivel_requerido, concepto_otro, proveedor_otro,
+                create_uid, create_date, write_uid, write_date)
+            SELECT %(prefijo)s || '/' || lpad(g::text, 8, '0'), fecha, %(usuario)s, centro_id,
+                   (%(conceptos)s::int[])[1 + floor(random() * cardinality(%(conceptos)s::int[]))::int],
+                   CASE WHEN random() < 0.8
+                        THEN (%(proveedores)s::int[])[1 + floor(random() * cardinality(%(proveedores)s::int[]))::int]
+                   END,
+                   'Proveedor eventual',
+                   monto, %(moneda)s,
+                   (ARRAY['efectivo', 'transferencia', 'cheque'])[1 + floor(random() * 3)::int],
+                   CASE WHEN r < 0.05 THEN 'borrador'
+                        WHEN r < 0.12 THEN 'autorizacion_nivel' || (1 + floor(random() * nivel)::int)
+                        WHEN r < 0.16 THEN 'autorizado'
+                        WHEN r < 0.84 THEN 'entregado'
+                        WHEN r < 0.92 THEN 'rechazado'
+                        ELSE 'cancelado' END,
+                   'nivel' || nivel, false, false,
+                   %(usuario)s, NOW() AT TIME ZONE 'UTC', %(usuario)s, NOW() AT TIME ZONE 'UTC'
+              FROM niveles
+        """, {
+            'centros': centros_ids,
+            'conceptos': conceptos_ids,
+            'proveedores': proveedores_ids,
+            'dias': dias,
+            'desde': desde,
+            'hasta': hasta,
+            'prefijo': PREFIJO,
+            'usuario': usuario.id,
+            'moneda': self.env.company.currency_id.id,
+        })
+
+    @api.model
+    def _insertar_movimientos(self, desde, hasta, dias):
+        """Inserta movimientos de caja pagados en su mayoría, con fecha, semana y mes consistentes"""
+        Movimiento = self.env['ctrl.caja.chica']
+        self.env.cr.execute("""
+            INSERT INTO ctrl_caja_chica (
+                name, fecha, fecha_solicitud, semana, mes, tipo_gasto, centro_costo, monto, currency_id,
+                estado_pago, metodo_pago, create_uid, create_date, write_uid, write_date)
+            SELECT %(prefijo)s || '/' || lpad(g::text, 8, '0'), fecha, fecha - floor(random() * 5)::int,
+                   extract(week FROM fecha)::int, extract(month FROM fecha)::int::text,
+                   (%(tipos)s::varchar[])[1 + floor(random() * cardinality(%(tipos)s::varchar[]))::int],
+                   (%(centros)s::varchar[])[1 + floor(random() * cardinality(%(centros)s::varchar[]))::int],
+                   round((20 + random() * random() * 3000)::numeric, 2), %(moneda)s,
+                   CASE WHEN random() < 0.9 THEN 'pagada' WHEN random() < 0.5 THEN 'parcial' ELSE 'pendiente' END,
+                   (ARRAY['efectivo', 'transferencia', 'cheque'])[1 + floor(random() * 3)::int],
+                   %(usuario)s, NOW() AT TIME ZONE 'UTC', %(usuario)s, NOW() AT TIME ZONE 'UTC'
+              FROM (
+                    SELECT g, CURRENT_DATE - floor(random() * %(dias)s)::int AS fecha
+                      FROM generate_series(%(desde)s, %(hasta)s) g
+                   ) s
+        """, {
+            'tipos': Movimiento._fields['tipo_gasto'].get_values(self.env),
+            'centros': Movimiento._fields['centro_costo'].get_values(self.env),
+            'dias': dias,
+            'desde': desde,
+            'hasta': hasta,
+            'prefijo': PREFIJO,
+            'usuario': self.env.uid,
+            'moneda': self.env.company.currency_id.id,
+        })
+
+    @api.model
+    def _crear_arqueo(self):
+        """Arqueo del mes en curso con los movimientos de los últimos 30 días vinculados"""
+        arqueo = self.env['ctrl.caja.arqueo'].create({'mes': f'{PREFIJO} {fields.Date.today():%Y-%m}'})
+        self.env.cr.execute("""
+            UPDATE ctrl_caja_chica SET arqueo_id = %s
+             WHERE arqueo_id IS NULL AND fecha > CURRENT_DATE - 30 AND name LIKE %s
+        """, [arqueo.id, f'{PREFIJO}/%'])
+        return arqueo
+
+    @api.model
+    def _reconstruir_derivados(self, centros_ids):
+        """Pone al día las estructuras que normalmente mantiene el ORM"""
+        self.env.invalidate_all()
+        self.env['ctrl.caja.fondo.movimiento'].sudo()._registrar_gastos_faltantes()
+        self.env['ctrl.caja.bandeja'].sudo()._reconstruir()
+        self.env['ctrl.caja.cubo'].sudo()._reconstruir()
+        self.env['ctrl.caja.presupuesto'].sudo().search([('centro_costo_id', 'in', centros_ids)])._recalcular()
+        self.env.flush_all()
+        for tabla in ('ctrl_caja_solicitud', 'ctrl_caja_chica', 'ctrl_caja_bandeja', 'ctrl_caja_cubo'):
+            self.env.cr.execute(f'ANALYZE {tabla}')
+
+    # ============ BENCHMARK ============
+
+    @api.model
+    def _ejecutar_benchmark(self, repeticiones=5):
+        """Mide los escenarios principales y retorna el resultado como JSON.
+
+        Cada escenario se repite `repeticiones` veces con la caché vacía y se
+        reportan tiempos (ms) y número de consultas SQL. Uso desde odoo shell:
+
+            print(env['ctrl.caja.benchmark']._ejecutar_benchmark())
+        """
+        usuario = self._usuario_flujo()
+        env = self.env(user=usuario)
+        centro = env['ctrl.caja.centro.costo'].search([('autorizador_nivel3_ids', 'in', usuario.ids)], limit=1)
+        escenarios = {
+            'kanban_autorizador': lambda: self._escenario_kanban(env),
+            'mis_pendientes': lambda: self._escenario_pendientes(env),
+            'estadisticas_catalogos': lambda: self._escenario_catalogos(env),
+            'flujo_completo': lambda: self._escenario_flujo(env, centro),
+            'formulario_arqueo': lambda: self._escenario_arqueo(env),
+        }
+        resultado = {
+            'version': self.env['ir.module.module'].search([('name', '=', 'ctrl_caja_chica')]).latest_version,
+            'fecha': fields.Datetime.to_string(fields.Datetime.now()),
+            'volumen': {
+                modelo: self.env[modelo].sudo().search_count([])
+                for modelo in ('ctrl.caja.solicitud', 'ctrl.caja.chica', 'ctrl.caja.centro.costo',
+                               'ctrl.caja.concepto', 'ctrl.caja.proveedor')
+            },
+            'escenarios': {
+                nombre: self._medir(funcion, repeticiones) for nombre, funcion in escenarios.items()
+            },
+        }
+        salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+        _logger.info('Benchmark de caja chica:\n%s', salida)
+        return salida
+
+    @api.model
+    def _medir(self, funcion, repeticiones):
+        cr = self.env.cr
+        tiempos = []
+        consultas = []
+        for __ in range(repeticiones):
+            self.env.invalidate_all()
+            consultas_inicio = cr.sql_log_count
+            inicio = time.perf_counter()
+            funcion()
+            self.env.flush_all()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(cr.sql_log_count - consultas_inicio)
+        return {
+            'ms_min': round(min(tiempos), 2),
+            'ms_mediana': round(statistics.median(tiempos), 2),
+            'ms_max': round(max(tiempos), 2),
+            'consultas': max(consultas),
+        }
+
+    def _escenario_kanban(self, env):
+        """Kanban del autorizador: columnas por estado y primera página de cada una"""
+        Solicitud = env['ctrl.caja.solicitud']
+        domain = [('puedo_autorizar', '=', True)]
+        grupos = Solicitud.web_read_group(domain, ['monto_estimado:sum'], ['estado'])
+        for grupo in grupos['groups']:
+            Solicitud.web_search_read(grupo['__domain'], KANBAN_AUTORIZADOR, limit=40)
+
+    def _escenario_pendientes(self, env):
+        """Lista con el filtro "Mis Pendientes" activo"""
+        env['ctrl.caja.solicitud'].web_search_read(
+            [('puedo_autorizar', '=', True)], LISTA_PENDIENTES, limit=80, count_limit=10001)
+
+    def _escenario_catalogos(self, env):
+        """Listas de conceptos, proveedores y centros con sus estadísticas"""
+        for modelo in ('ctrl.caja.concepto', 'ctrl.caja.proveedor', 'ctrl.caja.centro.costo'):
+            env[modelo].web_search_read([], LISTA_CATALOGO, limit=80)
+
+    def _escenario_flujo(self, env, centro):
+        """Solicitud de nivel 3 desde la creación hasta la entrega del dinero"""
+        solicitud = env['ctrl.caja.solicitud'].create({
+            'centro_costo_id': centro.id,
+            'categoria_id': env['ctrl.caja.concepto'].search([], limit=1).id,
+            'proveedor_texto': 'Benchmark',
+            'monto_estimado': centro.monto_nivel2 + 1,
+            'metodo_pago': 'efectivo',
+        })
+        solicitud.action_solicitar()
+        for nivel in NIVELES:
+            solicitud._accion_autorizar(nivel)
+        solicitud.action_entregar_dinero()
+
+    def _escenario_arqueo(self, env):
+        """Formulario de arqueo: valores por defecto de uno nuevo y lectura del más reciente"""
+        Arqueo = env['ctrl.caja.arqueo']
+        Arqueo.default_get(list(FORM_ARQUEO))
+        Arqueo.search([], limit=1).web_read(FORM_ARQUEO)
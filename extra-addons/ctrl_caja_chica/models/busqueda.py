@@ -0,0 +1,78 @@
+import logging
+
+import psycopg2
+
+from odoo import models, api, tools
+from odoo.osv import expression
+from odoo.tools import SQL, create_index
+
+_logger = logging.getLogger(__name__)
+
+# word_similarity mínima para sugerir un registro que no contiene el texto buscado
+SIMILITUD_MINIMA = 0.3
+# Con menos caracteres los trigramas no distinguen nada
+LONGITUD_MINIMA_SIMILITUD = 3
+
+
+def asegurar_trigramas(cr):
+    """Activa pg_trgm en la base si hace falta. Retorna False si no se puede
+    (usuario sin privilegio para CREATE EXTENSION): se sigue buscando con ilike sin índice.
+    """
+    cr.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    if cr.fetchone():
+        return True
+    try:
+        with cr.savepoint():
+            cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except psycopg2.Error:
+        _logger.warning("No se pudo activar pg_trgm: los catálogos de caja chica se buscarán sin índice de trigramas")
+        return False
+    return True
+
+
+class CtrlCajaBusquedaMixin(models.AbstractModel):
+    _name = 'ctrl.caja.busqueda.mixin'
+    _description = 'Búsqueda por Trigramas en Catálogos'
+    _rec_names_search = ['name', 'codigo']
+
+    # Columnas con índice GIN de trigramas: atienden el ilike '%texto%' de los many2one
+    # y la similitud de _name_search y de la consolidación de "Otros"
+    _campos_trigrama = ('name', 'codigo')
+
+    def init(self):
+        if self._abstract or not asegurar_trigramas(self.env.cr):
+            return
+        for campo in self._campos_trigrama:
+            create_index(self.env.cr, f'{self._table}_{campo}_trgm_idx', self._table,
+                         [f'{campo} gin_trgm_ops'], method='gin')
+
+    @tools.ormcache()
+    def _trigramas_activos(self):
+        self.env.cr.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return bool(self.env.cr.fetchone())
+
+    @api.model
+    def _name_search(self, name, domain=None, operator='ilike', limit=None, order=None):
+        """Primero las coincidencias por contenido en nombre o código; si no completan
+        `limit`, agrega las más parecidas por trigramas para tolerar errores de escritura
+        ("ferreteria" encuentra "Ferretería López"), de la más a la menos similar.
+        """
+        ids = list(super()._name_search(name, domain, operator, limit=limit, order=order))
+        termino = (name or '').strip()
+        if (operator != 'ilike' or len(termino) < LONGITUD_MINIMA_SIMILITUD
+                or (limit and len(ids) >= limit) or not self._trigramas_activos()):
+            return ids
+        query = self._search(expression.AND([domain or [], [('id', 'not in', ids)]]))
+        columnas = [SQL.identifier(self._table, campo) for campo in self._campos_trigrama]
+        # El operador <% usa este umbral y el índice GIN; set_config local a la transacción
+        self.env.cr.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                            [str(SIMILITUD_MINIMA)])
+        query.add_where(SQL("(%s)", SQL(" OR ").join(
+            SQL("%s <%% %s", termino, columna) for columna in columnas
+        )))
+        query.order = SQL("GREATEST(%s) DESC", SQL(", ").join(
+            SQL("word_similarity(%s, %s)", termino, columna) for columna in columnas
+        ))
+        query.limit = limit - len(ids) if limit else None
+        self.env.cr.execute(query.select())
+        return ids + [fila[0] for fila in self.env.cr.fetchall()]
@@ -1,10 +1,16 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
 
+# Campos que definen la celda (o el monto) del movimiento en el cubo de gastos
+CAMPOS_CUBO = ('fecha', 'centro_costo', 'categoria_id', 'tipo_gasto', 'estado_pago', 'monto')
+# Todo movimiento de caja es una salida del fondo (tipo_gasto solo clasifica el gasto).
+# Lo usan _sign() y el alta masiva del libro: la sincronización y el alta no pueden diferir
+SIGNO_MOVIMIENTO = -1
+
 class CtrlCajaChica(models.Model):
     _name = 'ctrl.caja.chica'
     _description = 'Movimiento de Caja Chica'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['ctrl.caja.secuencia.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'fecha desc, id desc'
 
     name = fields.Char(string='Referencia', readonly=True, copy=False)
@@ -54,6 +60,10 @@ class CtrlCajaChica(models.Model):
         ('remision', 'Remisión')
     ], string='Tipo Documento')
     numero_factura = fields.Char(string='Número de Factura')
+    cfdi_uuid = fields.Char(string='UUID CFDI', readonly=True, copy=False,
+                            help='Folio fiscal del CFDI asignado al importar las facturas XML')
+    comprobante_ids = fields.Many2many('ctrl.caja.comprobante', 'ctrl_caja_chica_comprobante_rel',
+                                       'movimiento_id', 'comprobante_id', string='Comprobantes', copy=False)
     
     # Detalle de compra (uso esporádico)
     cantidad = fields.Float(string='Cantidad', digits=(12, 2))
@@ -81,6 +91,10 @@ class CtrlCajaChica(models.Model):
     # Auditoría
     create_uid = fields.Many2one('res.users', string='Creado por', readonly=True)
     
+    _sql_constraints = [
+        ('cfdi_uuid_unique', 'unique(cfdi_uuid)', 'El CFDI ya está asignado a otro movimiento'),
+    ]
+    
     @api.depends('fecha')
     def _compute_fecha_info(self):
         """Calcula automáticamente semana y mes desde la fecha de pago"""
@@ -98,14 +112,70 @@ class CtrlCajaChica(models.Model):
             if rec.monto < 0:
                 raise ValidationError('El monto no puede ser negativo.')
     
-    @api.model
-    def create(self, vals):
-        """Genera secuencia automática para referencia"""
-        if not vals.get('name'):
-            vals['name'] = self.env['ir.sequence'].next_by_code('ctrl.caja.chica') or 'New'
-        return super().create(vals)
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Genera secuencia automática para referencia, reservando los folios en bloque"""
+        self._asignar_folios(vals_list, 'name', 'ctrl.caja.chica', 'New')
+        records = super().create(vals_list)
+        self.env['ctrl.caja.fondo.movimiento'].sudo()._sincronizar_gastos(records)
+        self.env['ctrl.caja.cubo'].sudo()._aplicar(records._filas_cubo())
+        return records
+    
+    def write(self, vals):
+        cubo = any(campo in vals for campo in CAMPOS_CUBO)
+        antes = self._filas_cubo() if cubo else None
+        res = super().write(vals)
+        if any(campo in vals for campo in ('monto', 'fecha', 'currency_id')):
+            self.env['ctrl.caja.fondo.movimiento'].sudo()._sincronizar_gastos(self)
+        if cubo:
+            self.env['ctrl.caja.cubo'].sudo()._actualizar(antes, self._filas_cubo())
+        return res
+    
+    def unlink(self):
+        # Por ORM (no por cascada) para que los cortes del fondo se ajusten
+        self.env['ctrl.caja.fondo.movimiento'].sudo().search([('gasto_id', 'in', self.ids)]).unlink()
+        self.env['ctrl.caja.cubo'].sudo()._aplicar(self._filas_cubo(), -1)
+        return super().unlink()
+    
+    def action_agregar_comprobante(self):
+        self.ensure_one()
+        return {
+            'name': 'Agregar Comprobante',
+            'type': 'ir.actions.act_window',
+            'res_model': 'ctrl.caja.comprobante.wizard',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {'active_model': self._name, 'active_ids': self.ids},
+        }
+    
+    def action_comprobantes_chatter(self):
+        """Pasa a comprobantes las fotos y PDF que se subieron por el chatter"""
+        cantidad = self.env['ctrl.caja.comprobante']._desde_chatter(self)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': '📎 Comprobantes',
+                'message': f'{cantidad} adjunto(s) del chatter revisado(s).',
+                'type': 'success',
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            }
+        }
+    
+    def _filas_cubo(self):
+        """Celda y monto que aporta cada movimiento al cubo de gastos (ver DIMENSIONES del cubo)"""
+        filas = []
+        for rec in self:
+            celda = (
+                'movimiento', rec.fecha.year, str(rec.fecha.month), rec.fecha.isocalendar()[1],
+                None, rec.centro_costo or None,
+                None, None,
+                rec.tipo_gasto or None, rec.estado_pago or None,
+            )
+            filas.append((celda, rec.monto))
+        return filas
     
     def _sign(self):
-        """Helper para cálculos - todos son salidas por defecto"""
+        """Helper para cálculos - signo del movimiento en el libro del fondo"""
         self.ensure_one()
-        return -1
\ No newline at end of file
+        return SIGNO_MOVIMIENTO
\ No newline at end of file
@@ -1,11 +1,16 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
 
+from .medicion import instrumentado
+
+CAMPOS_AUTORIZADORES = ('autorizador_nivel1_ids', 'autorizador_nivel2_ids', 'autorizador_nivel3_ids')
+
 class CtrlCajaCentroCosto(models.Model):
     _name = 'ctrl.caja.centro.costo'
     _description = 'Centros de Costo'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['ctrl.caja.estadisticas.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'codigo, name'
+    _campo_estadisticas = 'centro_costo_id'
 
     name = fields.Char(string='Centro de Costo', required=True, tracking=True,
                       help='Nombre del centro de costo')
@@ -41,6 +46,11 @@ class CtrlCajaCentroCosto(models.Model):
     
     # Nivel 3 es automático: mayor a monto_nivel2
     
+    # Etiquetas de rango por nivel, precalculadas para las tarjetas y formularios de solicitudes
+    texto_nivel1 = fields.Char(string='Rango Nivel 1', compute='_compute_textos_nivel', store=True)
+    texto_nivel2 = fields.Char(string='Rango Nivel 2', compute='_compute_textos_nivel', store=True)
+    texto_nivel3 = fields.Char(string='Rango Nivel 3', compute='_compute_textos_nivel', store=True)
+    
     # ============ AUTORIZADORES POR NIVEL ============
     autorizador_nivel1_ids = fields.Many2many(
         'res.users',
@@ -78,10 +88,11 @@ class CtrlCajaCentroCosto(models.Model):
     activo = fields.Boolean(string='Activo', default=True, tracking=True)
     
     # Estadísticas
+    solicitud_ids = fields.One2many('ctrl.caja.solicitud', 'centro_costo_id', string='Solicitudes')
     cantidad_solicitudes = fields.Integer(string='# Solicitudes',
-                                         compute='_compute_estadisticas')
+                                         compute='_compute_estadisticas', search='_search_cantidad_solicitudes')
     monto_total = fields.Monetary(string='Monto Total',
-                                  compute='_compute_estadisticas',
+                                  compute='_compute_estadisticas', search='_search_monto_total',
                                   currency_field='currency_id')
     currency_id = fields.Many2one('res.currency', string='Moneda',
                                   default=lambda self: self.env.company.currency_id)
@@ -151,23 +162,44 @@ class CtrlCajaCentroCosto(models.Model):
         """Convierte el código a mayúsculas automáticamente"""
         if vals.get('codigo'):
             vals['codigo'] = vals['codigo'].upper()
-        return super().create(vals)
+        record = super().create(vals)
+        self.env.registry.clear_cache()
+        return record
     
     def write(self, vals):
         """Convierte el código a mayúsculas automáticamente"""
         if vals.get('codigo'):
             vals['codigo'] = vals['codigo'].upper()
-        return super().write(vals)
+        res = super().write(vals)
+        if any(campo in vals for campo in CAMPOS_AUTORIZADORES):
+            self.env.registry.clear_cache()
+            self.env['ctrl.caja.bandeja']._actualizar_centros(self)
+        if 'monto_nivel1' in vals or 'monto_nivel2' in vals:
+            self.env['ctrl.caja.recalculo'].sudo()._encolar(self)
+        return res
+    
+    def unlink(self):
+        Cubo = self.env['ctrl.caja.cubo'].sudo()
+        afectadas = Cubo._solicitudes_con('centro_costo_id', self.ids)
+        res = super().unlink()
+        Cubo._resumar(afectadas, 'centro_costo_id')
+        self.env.registry.clear_cache()
+        return res
+    
+    @api.depends('monto_nivel1', 'monto_nivel2')
+    @instrumentado
+    def _compute_textos_nivel(self):
+        for rec in self:
+            rec.texto_nivel1 = rec.get_rango_nivel('nivel1')
+            rec.texto_nivel2 = rec.get_rango_nivel('nivel2')
+            rec.texto_nivel3 = rec.get_rango_nivel('nivel3')
     
+    @instrumentado
     def _compute_estadisticas(self):
         """Calcula estadísticas de uso del centro de costo"""
-        for rec in self:
-            solicitudes = self.env['ctrl.caja.solicitud'].search([
-                ('centro_costo_id', '=', rec.id)
-            ])
-            rec.cantidad_solicitudes = len(solicitudes)
-            rec.monto_total = sum(solicitudes.mapped('monto_estimado'))
+        self._calcular_estadisticas('centro_costo_id')
     
+    @instrumentado
     def action_view_solicitudes(self):
         """Abre las solicitudes relacionadas con este centro de costo"""
         self.ensure_one()
@@ -180,16 +212,27 @@ class CtrlCajaCentroCosto(models.Model):
             'context': {'default_centro_costo_id': self.id}
         }
     
+    @api.model
+    @tools.ormcache()
+    def _mapa_autorizadores(self):
+        """Mapa (centro_id, nivel) -> frozenset de user ids, en caché hasta que cambien los autorizadores"""
+        self.flush_model(CAMPOS_AUTORIZADORES)
+        mapa = {}
+        for campo in CAMPOS_AUTORIZADORES:
+            nivel = campo.split('_')[1]
+            self.env.cr.execute(f"""
+                SELECT centro_costo_id, array_agg(user_id)
+                  FROM {self._fields[campo].relation}
+                 GROUP BY centro_costo_id
+            """)
+            for centro_id, user_ids in self.env.cr.fetchall():
+                mapa[(centro_id, nivel)] = frozenset(user_ids)
+        return mapa
+    
     def puede_autorizar(self, user_id, nivel):
         """Verifica si un usuario puede autorizar en este centro de costo para un nivel dado"""
         self.ensure_one()
-        if nivel == 'nivel1':
-            return user_id in self.autorizador_nivel1_ids.ids
-        elif nivel == 'nivel2':
-            return user_id in self.autorizador_nivel2_ids.ids
-        elif nivel == 'nivel3':
-            return user_id in self.autorizador_nivel3_ids.ids
-        return False
+        return user_id in self._mapa_autorizadores().get((self.id, nivel), frozenset())
     
     def get_nivel_requerido(self, monto):
         """Determina qué nivel de autorización requiere un monto EN ESTE CENTRO"""
@@ -0,0 +1,335 @@
+import base64
+import io
+import time
+import zipfile
+from datetime import timedelta
+
+from lxml import etree
+
+from odoo import models, fields
+from odoo.exceptions import UserError
+
+from .importacion_wizard import _ArchivoRechazos
+
+# Un CFDI timbrado ocupa unos KB; un archivo más grande no es una factura
+TAMANO_MAXIMO_XML = 10 * 1024 * 1024
+# Días de diferencia aceptados entre la fecha del CFDI y la del movimiento o solicitud
+DIAS_TOLERANCIA = 3
+ESTADOS_SOLICITUD_CFDI = ('autorizado', 'entregado')
+
+
+class _ArchivoPendientes(_ArchivoRechazos):
+    """CSV de facturas no asignadas: cada lote las vuelca al temporal al terminar,
+    así que la memoria no crece con las que quedan pendientes en todo el archivo
+    """
+
+    ENCABEZADOS = ['archivo', 'uuid', 'rfc_emisor', 'total', 'fecha', 'motivo']
+
+    def agregar_lote(self, filas):
+        if filas and not self.cantidad:
+            self._escritor.writerow(self.ENCABEZADOS)
+        self._escritor.writerows(filas)
+        self.cantidad += len(filas)
+
+
+class CtrlCajaCfdiWizard(models.TransientModel):
+    _name = 'ctrl.caja.cfdi.wizard'
+    _description = 'Importar Facturas CFDI (XML)'
+
+    archivo = fields.Binary(string='Archivo (ZIP o XML)', required=True, attachment=True)
+    nombre_archivo = fields.Char(string='Nombre del Archivo')
+    tamano_lote = fields.Integer(string='Facturas por Lote', default=500, required=True)
+    estado = fields.Selection([
+        ('borrador', 'Borrador'),
+        ('hecho', 'Importado'),
+    ], default='borrador')
+
+    # Resultados
+    facturas_leidas = fields.Integer(string='Facturas Leídas', readonly=True)
+    asignadas_movimientos = fields.Integer(string='Asignadas a Movimientos', readonly=True)
+    asignadas_solicitudes = fields.Integer(string='Asignadas a Solicitudes', readonly=True)
+    duplicadas = fields.Integer(string='Duplicadas', readonly=True)
+    sin_coincidencia = fields.Integer(string='Sin Coincidencia o con Error', readonly=True)
+    duracion = fields.Float(string='Duración (s)', readonly=True, digits=(12, 2))
+    archivo_pendientes = fields.Binary(string='Facturas no Asignadas (CSV)', readonly=True, attachment=False)
+    nombre_pendientes = fields.Char(default='cfdi_no_asignados.csv')
+
+    # ============ LECTURA EN STREAMING ============
+
+    def _abrir_archivo(self):
+        """Abre el archivo desde el filestore (sin decodificar todo el base64 en memoria)"""
+        adjunto = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'archivo'),
+        ], limit=1)
+        if adjunto.store_fname:
+            return open(adjunto._full_path(adjunto.store_fname), 'rb')
+        return io.BytesIO(adjunto.raw or base64.b64decode(self.archivo or b''))
+
+    def _leer_xmls(self, archivo):
+        """Genera (nombre, archivo abierto) por cada XML, descomprimiendo una entrada a la vez"""
+        nombre = (self.nombre_archivo or '').lower()
+        if nombre.endswith('.xml'):
+            yield self.nombre_archivo, archivo
+        elif nombre.endswith('.zip'):
+            with zipfile.ZipFile(archivo) as comprimido:
+                for entrada in comprimido.infolist():
+                    if entrada.is_dir() or not entrada.filename.lower().endswith('.xml'):
+                        continue
+                    if entrada.file_size > TAMANO_MAXIMO_XML:
+                        yield entrada.filename, None
+                        continue
+                    with comprimido.open(entrada) as xml:
+                        yield entrada.filename, xml
+        else:
+            raise UserError('Formato no soportado. Use un archivo .zip con los XML o un .xml.')
+
+    def _leer_cfdi(self, xml):
+        """Extrae los datos del CFDI con iterparse: los nodos se liberan al cerrarse,
+        así que los conceptos de una factura grande no se acumulan en memoria.
+        Lanza ValueError si el archivo no es un CFDI timbrado.
+        """
+        datos = {}
+        for evento, nodo in etree.iterparse(xml, events=('start', 'end'), resolve_entities=False,
+                                            no_network=True, huge_tree=False):
+            if evento == 'end':
+                nodo.clear()
+                while nodo.getprevious() is not None:
+                    del nodo.getparent()[0]
+                continue
+            etiqueta = etree.QName(nodo).localname
+            if etiqueta == 'Comprobante':
+                datos.update(
+                    total=nodo.get('Total'),
+                    fecha=nodo.get('Fecha'),
+                    serie=nodo.get('Serie') or '',
+                    folio=nodo.get('Folio') or '',
+                    tipo=nodo.get('TipoDeComprobante'),
+                )
+            elif etiqueta == 'Emisor':
+                datos.update(rfc=(nodo.get('Rfc') or '').strip().upper(), emisor=nodo.get('Nombre') or '')
+            elif etiqueta == 'TimbreFiscalDigital':
+                datos['uuid'] = (nodo.get('UUID') or '').strip().upper()
+                # El timbre va al final: no hace falta leer el resto
+                break
+        if not datos.get('uuid'):
+            raise ValueError('El XML no es un CFDI timbrado (sin TimbreFiscalDigital).')
+        if not datos.get('total') or not datos.get('fecha'):
+            raise ValueError('El CFDI no tiene total o fecha.')
+        if datos.get('tipo') not in (None, 'I'):
+            raise ValueError(f'El CFDI no es de ingreso (tipo {datos["tipo"]}).')
+        datos['total'] = round(float(datos['total']), 2)
+        datos['fecha'] = fields.Date.to_date(datos['fecha'][:10])
+        return datos
+
+    # ============ CATÁLOGOS ============
+
+    def _construir_rfcs(self):
+        """RFC → id, construidos una sola vez: partners para movimientos (proveedor es
+        res.partner) y proveedores de caja para solicitudes (el RFC está en codigo)
+        """
+        partners = {}
+        for fila in self.env['res.partner'].with_context(active_test=False).search_read(
+                [('vat', '!=', False)], ['vat']):
+            partners.setdefault(fila['vat'].strip().upper(), fila['id'])
+        proveedores = {}
+        for fila in self.env['ctrl.caja.proveedor'].with_context(active_test=False).search_read(
+                [('codigo', '!=', False)], ['codigo']):
+            proveedores.setdefault(fila['codigo'].strip().upper(), fila['id'])
+        return partners, proveedores
+
+    # ============ ASIGNACIÓN POR LOTE ============
+
+    def _uuids_existentes(self, uuids):
+        """UUIDs del lote ya asignados, resueltos con los índices únicos de cfdi_uuid"""
+        self.env['ctrl.caja.chica'].flush_model(['cfdi_uuid'])
+        self.env['ctrl.caja.solicitud'].flush_model(['cfdi_uuid'])
+        self.env.cr.execute("""
+            SELECT cfdi_uuid FROM ctrl_caja_chica WHERE cfdi_uuid IN %(uuids)s
+            UNION
+            SELECT cfdi_uuid FROM ctrl_caja_solicitud WHERE cfdi_uuid IN %(uuids)s
+            UNION
+            SELECT cfdi_uuid FROM ctrl_caja_solicitud_archivo WHERE cfdi_uuid IN %(uuids)s
+        """, {'uuids': tuple(uuids)})
+        return {fila[0] for fila in self.env.cr.fetchall()}
+
+    def _candidatos(self, modelo, campo_monto, campo_fecha, dominio, campos, facturas):
+        """Registros sin CFDI cuyo monto y fecha pueden corresponder a alguna factura del
+        lote, leídos en una sola consulta y agrupados por monto
+        """
+        fechas = [factura['fecha'] for factura in facturas]
+        filas = self.env[modelo].search_read(dominio + [
+            ('cfdi_uuid', '=', False),
+            (campo_monto, 'in', list({factura['total'] for factura in facturas})),
+            (campo_fecha, '>=', min(fechas) - timedelta(days=DIAS_TOLERANCIA)),
+            (campo_fecha, '<=', max(fechas) + timedelta(days=DIAS_TOLERANCIA)),
+        ], [campo_monto, campo_fecha, *campos], order='id')
+        por_monto = {}
+        for fila in filas:
+            por_monto.setdefault(round(fila[campo_monto], 2), []).append(fila)
+        return por_monto
+
+    def _opciones(self, candidatos, factura, campo_fecha, coincide):
+        """Candidatos con el total del CFDI, dentro de la tolerancia de fechas, que cumplen `coincide`"""
+        return [
+            fila for fila in candidatos.get(factura['total'], [])
+            if abs((fila[campo_fecha] - factura['fecha']).days) <= DIAS_TOLERANCIA and coincide(fila)
+        ]
+
+    def _elegir(self, candidatos, factura, campo_fecha, opciones):
+        """Opción con la fecha más cercana al CFDI; se retira para que no se repita en el lote"""
+        elegida = min(opciones, key=lambda fila: (abs((fila[campo_fecha] - factura['fecha']).days), fila['id']))
+        candidatos[factura['total']].remove(elegida)
+        return elegida
+
+    def _procesar_lote(self, facturas, rfcs, resultado, pendientes):
+        """Asigna las facturas del lote; las no asignadas se agregan a `pendientes` (lista del lote)"""
+        partners, proveedores = rfcs
+        existentes = self._uuids_existentes([factura['uuid'] for factura in facturas])
+        nuevas = []
+        vistas = set()
+        for factura in facturas:
+            if factura['uuid'] in existentes or factura['uuid'] in vistas:
+                resultado['duplicadas'] += 1
+            else:
+                vistas.add(factura['uuid'])
+                nuevas.append(factura)
+        if not nuevas:
+            return
+
+        movimientos = self._candidatos(
+            'ctrl.caja.chica', 'monto', 'fecha', [], ['proveedor'], nuevas)
+        solicitudes = self._candidatos(
+            'ctrl.caja.solicitud', 'monto_estimado', 'fecha_solicitud',
+            [('estado', 'in', ESTADOS_SOLICITUD_CFDI)], ['proveedor_id', 'movimiento_id'], nuevas)
+        valores_movimientos = []
+        valores_solicitudes = []
+        for factura in nuevas:
+            partner_id = partners.get(factura['rfc'])
+            proveedor_id = proveedores.get(factura['rfc'])
+            numero = f"{factura['serie']}{factura['folio']}" or factura['uuid']
+            motivo = 'Sin movimiento ni solicitud que coincida'
+            # Solo con el emisor conocido: el total y la fecha por sí solos no identifican el gasto
+            if partner_id:
+                opciones = self._opciones(
+                    movimientos, factura, 'fecha',
+                    lambda fila: fila['proveedor'] and fila['proveedor'][0] == partner_id)
+                if not opciones:
+                    # Un movimiento sin proveedor se acepta solo si es el único posible
+                    opciones = self._opciones(movimientos, factura, 'fecha', lambda fila: not fila['proveedor'])
+                    if len(opciones) > 1:
+                        motivo = f'Ambiguo: {len(opciones)} movimientos sin proveedor con el mismo total y fecha'
+                        opciones = []
+                if opciones:
+                    movimiento = self._elegir(movimientos, factura, 'fecha', opciones)
+                    valores_movimientos.append((movimiento['id'], factura['uuid'], numero,
+                                                None if movimiento['proveedor'] else partner_id))
+                    continue
+            if proveedor_id:
+                opciones = self._opciones(
+                    solicitudes, factura, 'fecha_solicitud',
+                    lambda fila: fila['proveedor_id'] and fila['proveedor_id'][0] == proveedor_id)
+                if opciones:
+                    solicitud = self._elegir(solicitudes, factura, 'fecha_solicitud', opciones)
+                    valores_solicitudes.append((solicitud['id'], factura['uuid']))
+                    continue
+            if not partner_id and not proveedor_id:
+                motivo = 'RFC del emisor sin contacto ni proveedor registrado'
+            pendientes.append((factura['archivo'], factura['uuid'], factura['rfc'], factura['total'],
+                               factura['fecha'], motivo))
+        self._escribir_movimientos(valores_movimientos)
+        self._escribir_solicitudes(valores_solicitudes)
+        resultado['movimientos'] += len(valores_movimientos)
+        resultado['solicitudes'] += len(valores_solicitudes)
+
+    def _escribir_movimientos(self, valores):
+        """Datos de factura de todo el lote en un solo UPDATE (ningún campo afecta cubo ni fondo)"""
+        if not valores:
+            return
+        self.env.cr.execute(f"""
+            UPDATE ctrl_caja_chica m
+               SET cfdi_uuid = v.uuid,
+                   numero_factura = v.numero,
+                   tipo_documento = 'factura',
+                   proveedor = COALESCE(m.proveedor, v.partner_id),
+                   write_uid = %s,
+                   write_date = NOW() AT TIME ZONE 'UTC'
+              FROM (VALUES {', '.join(['(%s::int, %s, %s, %s::int)'] * len(valores))})
+                   AS v (id, uuid, numero, partner_id)
+             WHERE m.id = v.id
+        """, [self.env.uid] + [valor for fila in valores for valor in fila])
+        self.env['ctrl.caja.chica'].invalidate_model(['cfdi_uuid', 'numero_factura', 'tipo_documento', 'proveedor'])
+
+    def _escribir_solicitudes(self, valores):
+        """UUID de todo el lote en un solo UPDATE"""
+        if not valores:
+            return
+        self.env.cr.execute(f"""
+            UPDATE ctrl_caja_solicitud s
+               SET cfdi_uuid = v.uuid,
+                   write_uid = %s,
+                   write_date = NOW() AT TIME ZONE 'UTC'
+              FROM (VALUES {', '.join(['(%s::int, %s)'] * len(valores))}) AS v (id, uuid)
+             WHERE s.id = v.id
+        """, [self.env.uid] + [valor for fila in valores for valor in fila])
+        self.env['ctrl.caja.solicitud'].invalidate_model(['cfdi_uuid'])
+
+    # ============ IMPORTACIÓN ============
+
+    def action_importar(self):
+        """Lee los CFDI en lotes de `tamano_lote` facturas con memoria constante"""
+        self.ensure_one()
+        if self.tamano_lote <= 0:
+            raise UserError('El tamaño de lote debe ser mayor a cero.')
+
+        inicio = time.monotonic()
+        rfcs = self._construir_rfcs()
+        resultado = {'leidas': 0, 'movimientos': 0, 'solicitudes': 0, 'duplicadas': 0}
+        archivo_pendientes = _ArchivoPendientes()
+        # Las no asignadas se acumulan solo hasta cerrar cada lote (como máximo tamano_lote
+        # facturas más los XML ilegibles del lote) y después se vuelcan al temporal
+        pendientes = []
+        lote = []
+        try:
+            with self._abrir_archivo() as archivo:
+                for nombre, xml in self._leer_xmls(archivo):
+                    if xml is None:
+                        pendientes.append((nombre, '', '', '', '', 'Archivo demasiado grande'))
+                        continue
+                    try:
+                        factura = self._leer_cfdi(xml)
+                    except (ValueError, etree.XMLSyntaxError) as e:
+                        pendientes.append((nombre, '', '', '', '', str(e)))
+                        continue
+                    factura['archivo'] = nombre
+                    resultado['leidas'] += 1
+                    lote.append(factura)
+                    if len(lote) >= self.tamano_lote:
+                        self._procesar_lote(lote, rfcs, resultado, pendientes)
+                        archivo_pendientes.agregar_lote(pendientes)
+                        lote = []
+                        pendientes = []
+                if lote:
+                    self._procesar_lote(lote, rfcs, resultado, pendientes)
+                archivo_pendientes.agregar_lote(pendientes)
+
+            self.write({
+                'estado': 'hecho',
+                'facturas_leidas': resultado['leidas'],
+                'asignadas_movimientos': resultado['movimientos'],
+                'asignadas_solicitudes': resultado['solicitudes'],
+                'duplicadas': resultado['duplicadas'],
+                'sin_coincidencia': archivo_pendientes.cantidad,
+                'duracion': time.monotonic() - inicio,
+                'archivo_pendientes': archivo_pendientes.contenido(),
+            })
+        finally:
+            archivo_pendientes.cerrar()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
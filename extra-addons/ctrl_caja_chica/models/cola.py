@@ -0,0 +1,116 @@
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools import create_index
+
+_logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = 5
+TAMANO_LOTE = 500
+
+
+class CtrlCajaCola(models.Model):
+    _name = 'ctrl.caja.cola'
+    _description = 'Cola de Efectos Secundarios (Chatter / Notificaciones)'
+    _order = 'id'
+
+    res_model = fields.Char(string='Modelo', required=True, readonly=True)
+    res_id = fields.Integer(string='Registro', required=True, readonly=True)
+    tipo = fields.Selection([
+        ('chatter', 'Mensaje de Chatter'),
+    ], string='Tipo', required=True, default='chatter', readonly=True)
+    cuerpo = fields.Html(string='Mensaje', sanitize=False, readonly=True)
+    autor_id = fields.Many2one('res.partner', string='Autor', readonly=True)
+    estado = fields.Selection([
+        ('pendiente', 'Pendiente'),
+        ('hecho', 'Procesado'),
+        ('fallido', 'Fallido'),
+    ], string='Estado', required=True, default='pendiente', readonly=True)
+    intentos = fields.Integer(string='Intentos', default=0, readonly=True)
+    proximo_intento = fields.Datetime(string='Próximo Intento', default=fields.Datetime.now, readonly=True)
+    error = fields.Text(string='Último Error', readonly=True)
+
+    def init(self):
+        create_index(self.env.cr, 'ctrl_caja_cola_pendiente_idx', self._table,
+                     ['proximo_intento', 'id'], where="estado = 'pendiente'")
+
+    @api.model
+    def _encolar_chatter(self, res_model, mensajes):
+        """Encola los mensajes {res_id: cuerpo} y despierta al cron que los publica"""
+        if not mensajes:
+            return self.browse()
+        autor = self.env.user.partner_id.id
+        trabajos = self.sudo().create([{
+            'res_model': res_model,
+            'res_id': res_id,
+            'tipo': 'chatter',
+            'cuerpo': cuerpo,
+            'autor_id': autor,
+        } for res_id, cuerpo in mensajes.items()])
+        cron = self.env.ref('ctrl_caja_chica.ir_cron_ctrl_caja_cola', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return trabajos
+
+    @api.model
+    def _procesar_cola(self, limite=TAMANO_LOTE):
+        """Publica los trabajos pendientes en lotes por (modelo, autor). Lo ejecuta el cron."""
+        trabajos = self.sudo().search([
+            ('estado', '=', 'pendiente'),
+            ('proximo_intento', '<=', fields.Datetime.now()),
+        ], limit=limite)
+        grupos = {}
+        for trabajo in trabajos:
+            grupos.setdefault((trabajo.res_model, trabajo.autor_id.id), []).append(trabajo.id)
+        for (res_model, autor_id), ids in grupos.items():
+            lote = self.browse(ids)
+            try:
+                with self.env.cr.savepoint():
+                    lote._ejecutar(res_model, autor_id)
+                lote.write({'estado': 'hecho', 'error': False})
+            except Exception:
+                # El lote falló: se reintenta registro por registro para aislar el error
+                self.env.invalidate_all()
+                for trabajo in lote:
+                    try:
+                        with self.env.cr.savepoint():
+                            trabajo._ejecutar(res_model, autor_id)
+                        trabajo.write({'estado': 'hecho', 'error': False})
+                    except Exception as e:
+                        self.env.invalidate_all()
+                        trabajo._marcar_error(e)
+        if len(trabajos) == limite:
+            self.env.ref('ctrl_caja_chica.ir_cron_ctrl_caja_cola')._trigger()
+        return len(trabajos)
+
+    def _ejecutar(self, res_model, autor_id):
+        registros = self.env[res_model].sudo().browse(self.mapped('res_id')).exists()
+        cuerpos = {trabajo.res_id: trabajo.cuerpo for trabajo in self if trabajo.res_id in registros.ids}
+        if cuerpos:
+            registros._message_log_batch(bodies=cuerpos, author_id=autor_id)
+
+    def _marcar_error(self, error):
+        """Reintenta con espera exponencial; tras MAX_INTENTOS pasa a fallido (dead letter)"""
+        self.ensure_one()
+        intentos = self.intentos + 1
+        _logger.warning('Trabajo %s de la cola de caja chica falló (intento %s): %s', self.id, intentos, error)
+        self.write({
+            'intentos': intentos,
+            'error': str(error),
+            'estado': 'fallido' if intentos >= MAX_INTENTOS else 'pendiente',
+            'proximo_intento': fields.Datetime.now() + timedelta(minutes=2 ** intentos),
+        })
+
+    def action_reintentar(self):
+        """Regresa trabajos fallidos a la cola"""
+        self.write({'estado': 'pendiente', 'intentos': 0, 'proximo_intento': fields.Datetime.now()})
+        self.env.ref('ctrl_caja_chica.ir_cron_ctrl_caja_cola')._trigger()
+
+    @api.autovacuum
+    def _gc_trabajos_procesados(self):
+        """Elimina los trabajos procesados con más de una semana"""
+        self.sudo().search([
+            ('estado', '=', 'hecho'),
+            ('write_date', '<', fields.Datetime.now() - timedelta(days=7)),
+        ]).unlink()
@@ -0,0 +1,226 @@
+import base64
+import hashlib
+import os
+import tempfile
+
+from psycopg2 import IntegrityError
+
+from odoo import models, fields, api
+from odoo.exceptions import AccessError, UserError
+from odoo.tools.image import image_process
+from odoo.tools.mimetypes import guess_mimetype
+
+TAMANO_BLOQUE = 64 * 1024
+TAMANO_MINIATURA = (256, 256)
+MIMETYPES_COMPROBANTE = ('image/', 'application/pdf')
+# Modelos que aceptan comprobantes (campo comprobante_ids)
+MODELOS_COMPROBANTE = ('ctrl.caja.solicitud', 'ctrl.caja.chica')
+# Modelos con comprobantes vinculados, incluidas las solicitudes archivadas
+MODELOS_VINCULADOS = ('ctrl.caja.solicitud', 'ctrl.caja.solicitud.archivo', 'ctrl.caja.chica')
+
+
+class CtrlCajaComprobante(models.Model):
+    _name = 'ctrl.caja.comprobante'
+    _description = 'Comprobante de Gasto (foto o PDF del ticket)'
+    _order = 'id desc'
+
+    name = fields.Char(string='Archivo', required=True, readonly=True)
+    # Un solo comprobante por contenido: el mismo ticket subido varias veces se comparte
+    checksum = fields.Char(string='Checksum (SHA-1)', required=True, readonly=True)
+    mimetype = fields.Char(string='Tipo', readonly=True)
+    tamano = fields.Integer(string='Tamaño (bytes)', readonly=True)
+    es_imagen = fields.Boolean(string='Es Imagen', compute='_compute_es_imagen', store=True)
+    attachment_id = fields.Many2one('ir.attachment', string='Archivo Original', required=True,
+                                    readonly=True, ondelete='restrict')
+    # Se genera la primera vez que se muestra (ver _miniatura) y queda en el filestore
+    miniatura = fields.Binary(string='Miniatura', attachment=True, readonly=True)
+    solicitud_ids = fields.Many2many('ctrl.caja.solicitud', 'ctrl_caja_solicitud_comprobante_rel',
+                                     'comprobante_id', 'solicitud_id', string='Solicitudes')
+    movimiento_ids = fields.Many2many('ctrl.caja.chica', 'ctrl_caja_chica_comprobante_rel',
+                                      'comprobante_id', 'movimiento_id', string='Movimientos')
+
+    _sql_constraints = [
+        ('checksum_unique', 'unique(checksum)', 'El comprobante ya existe'),
+    ]
+
+    @api.depends('mimetype')
+    def _compute_es_imagen(self):
+        for rec in self:
+            rec.es_imagen = bool(rec.mimetype and rec.mimetype.startswith('image/'))
+
+    # ============ ALTA CON DEDUPLICACIÓN ============
+
+    @api.model
+    def _desde_archivo(self, archivo, nombre):
+        """Comprobante con el contenido de `archivo` (objeto tipo archivo), leído por bloques.
+
+        El contenido se copia a un temporal dentro del filestore mientras se calcula
+        su SHA-1, sin tenerlo completo en memoria. Si ya existe un comprobante con ese
+        checksum se reutiliza; si no, el temporal se mueve a la ruta del filestore que
+        ir.attachment usa para ese checksum y se crea el adjunto apuntando a ella.
+        """
+        Attachment = self.env['ir.attachment'].sudo()
+        sha = hashlib.sha1()
+        tamano = 0
+        inicio = b''
+        descriptor, temporal = tempfile.mkstemp(dir=Attachment._filestore())
+        try:
+            with os.fdopen(descriptor, 'wb') as destino:
+                for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b''):
+                    if not inicio:
+                        inicio = bloque
+                    sha.update(bloque)
+                    destino.write(bloque)
+                    tamano += len(bloque)
+            if not tamano:
+                raise UserError('El archivo está vacío.')
+            mimetype = guess_mimetype(inicio)
+            if not mimetype.startswith(MIMETYPES_COMPROBANTE):
+                raise UserError(f'"{nombre}" no es una imagen ni un PDF.')
+            checksum = sha.hexdigest()
+            existente = self.search([('checksum', '=', checksum)], limit=1)
+            if existente:
+                return existente
+            if Attachment._storage() == 'file':
+                store_fname, ruta = Attachment._get_path(b'', checksum)
+                if not os.path.exists(ruta):
+                    os.replace(temporal, ruta)
+                # Como en _file_write: si la transacción se revierte, el recolector del
+                # filestore borra el archivo que ya no referencia ningún adjunto
+                Attachment._mark_for_gc(store_fname)
+                contenido = {'store_fname': store_fname, 'checksum': checksum, 'file_size': tamano}
+            else:
+                with open(temporal, 'rb') as origen:
+                    contenido = {'raw': origen.read()}
+            return self._crear(nombre, checksum, mimetype, tamano, contenido)
+        finally:
+            if os.path.exists(temporal):
+                os.unlink(temporal)
+
+    @api.model
+    def _desde_adjunto(self, adjunto, nombre=None):
+        """Comprobante a partir de un adjunto existente (p. ej. una foto del chatter):
+        comparte su archivo del filestore en vez de copiarlo
+        """
+        nombre = nombre or adjunto.name
+        if not (adjunto.mimetype or '').startswith(MIMETYPES_COMPROBANTE):
+            raise UserError(f'"{nombre}" no es una imagen ni un PDF.')
+        existente = self.search([('checksum', '=', adjunto.checksum)], limit=1)
+        if existente:
+            return existente
+        if adjunto.store_fname:
+            contenido = {'store_fname': adjunto.store_fname, 'checksum': adjunto.checksum,
+                         'file_size': adjunto.file_size}
+        else:
+            contenido = {'raw': adjunto.raw}
+        return self._crear(nombre, adjunto.checksum, adjunto.mimetype, adjunto.file_size, contenido)
+
+    @api.model
+    def _crear(self, nombre, checksum, mimetype, tamano, contenido):
+        """Crea adjunto y comprobante. Si otra transacción acaba de crear el mismo
+        contenido su comprobante no es visible en esta instantánea: se pide reintentar
+        en vez de continuar sin comprobante.
+        """
+        try:
+            with self.env.cr.savepoint():
+                adjunto = self.env['ir.attachment'].sudo().create(dict(
+                    contenido, name=nombre, mimetype=mimetype, res_model=self._name, type='binary'))
+                comprobante = self.create({
+                    'name': nombre,
+                    'checksum': checksum,
+                    'mimetype': mimetype,
+                    'tamano': tamano,
+                    'attachment_id': adjunto.id,
+                })
+                adjunto.res_id = comprobante.id
+                return comprobante
+        except IntegrityError as error:
+            raise UserError(
+                f'Otro usuario acaba de registrar el mismo comprobante "{nombre}". '
+                'Vuelva a intentarlo para vincularlo.'
+            ) from error
+
+    def _vincular(self, registros):
+        """Agrega los comprobantes a solicitudes o movimientos"""
+        if registros._name not in MODELOS_COMPROBANTE:
+            raise UserError('Solo las solicitudes y los movimientos de caja aceptan comprobantes.')
+        registros.check_access_rights('write')
+        registros.check_access_rule('write')
+        registros.write({'comprobante_ids': [(4, comprobante.id) for comprobante in self]})
+
+    @api.model
+    def _desde_chatter(self, registros):
+        """Convierte en comprobantes las fotos y PDF adjuntos en el chatter de los registros;
+        las copias repetidas del mismo ticket quedan en un solo comprobante
+        """
+        adjuntos = self.env['ir.attachment'].search([
+            ('res_model', '=', registros._name),
+            ('res_id', 'in', registros.ids),
+            ('res_field', '=', False),
+            '|', ('mimetype', '=like', 'image/%'), ('mimetype', '=', 'application/pdf'),
+        ])
+        for adjunto in adjuntos:
+            self._desde_adjunto(adjunto)._vincular(registros.browse(adjunto.res_id))
+        return len(adjuntos)
+
+    # ============ MINIATURAS ============
+
+    def _check_acceso_vinculados(self):
+        """El comprobante se comparte entre los registros con el mismo ticket: solo lo ve
+        quien puede leer alguna de las solicitudes o movimientos a los que está vinculado
+        (o quien administra los comprobantes)
+        """
+        self.ensure_one()
+        if self.check_access_rights('write', raise_exception=False):
+            return
+        for modelo in MODELOS_VINCULADOS:
+            Modelo = self.env[modelo]
+            if not Modelo.check_access_rights('read', raise_exception=False):
+                continue
+            vinculados = Modelo.sudo().search([('comprobante_ids', '=', self.id)]).with_env(self.env)
+            if vinculados._filter_access_rules('read'):
+                return
+        raise AccessError('No tiene acceso a las solicitudes ni a los movimientos de este comprobante.')
+
+    def _miniatura(self):
+        """Genera y guarda la miniatura la primera vez que se pide; después sale del filestore"""
+        self.ensure_one()
+        if not self.es_imagen:
+            return False
+        if not self.miniatura:
+            imagen = image_process(self.attachment_id.sudo().raw, size=TAMANO_MINIATURA)
+            self.sudo().miniatura = base64.b64encode(imagen)
+        return True
+
+    def action_descargar(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content/{self.attachment_id.id}?download=true',
+            'target': 'self',
+        }
+
+
+class CtrlCajaComprobanteWizard(models.TransientModel):
+    _name = 'ctrl.caja.comprobante.wizard'
+    _description = 'Agregar Comprobante'
+
+    archivo = fields.Binary(string='Foto o PDF', required=True, attachment=True)
+    nombre_archivo = fields.Char(string='Nombre del Archivo')
+
+    def action_agregar(self):
+        """Registra el archivo subido (ya en el filestore) y lo vincula al registro activo"""
+        self.ensure_one()
+        modelo = self.env.context.get('active_model')
+        registros = self.env[modelo].browse(self.env.context.get('active_ids', []))
+        adjunto = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'archivo'),
+        ], limit=1)
+        if not adjunto:
+            raise UserError('Seleccione la foto o el PDF del comprobante.')
+        # El comprobante comparte el archivo del adjunto del asistente en vez de volver a leerlo
+        comprobante = self.env['ctrl.caja.comprobante']._desde_adjunto(adjunto, self.nombre_archivo)
+        comprobante._vincular(registros)
+        return {'type': 'ir.actions.act_window_close'}
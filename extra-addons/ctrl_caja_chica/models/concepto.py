@@ -3,8 +3,9 @@ from odoo import models, fields, api
 class CtrlCajaConcepto(models.Model):
     _name = 'ctrl.caja.concepto'
     _description = 'Conceptos de Gasto'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['ctrl.caja.estadisticas.mixin', 'ctrl.caja.busqueda.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'name'
+    _campo_estadisticas = 'categoria_id'
 
     name = fields.Char(string='Concepto', required=True, tracking=True,
                       help='Nombre del concepto de gasto')
@@ -18,10 +19,11 @@ class CtrlCajaConcepto(models.Model):
     activo = fields.Boolean(string='Activo', default=True, tracking=True)
     
     # Estadísticas
+    solicitud_ids = fields.One2many('ctrl.caja.solicitud', 'categoria_id', string='Solicitudes')
     cantidad_solicitudes = fields.Integer(string='# Solicitudes', 
-                                         compute='_compute_estadisticas')
+                                         compute='_compute_estadisticas', search='_search_cantidad_solicitudes')
     monto_total = fields.Monetary(string='Monto Total Usado',
-                                  compute='_compute_estadisticas',
+                                  compute='_compute_estadisticas', search='_search_monto_total',
                                   currency_field='currency_id')
     currency_id = fields.Many2one('res.currency', string='Moneda',
                                   default=lambda self: self.env.company.currency_id)
@@ -34,12 +36,14 @@ class CtrlCajaConcepto(models.Model):
     
     def _compute_estadisticas(self):
         """Calcula estadísticas de uso del concepto"""
-        for rec in self:
-            solicitudes = self.env['ctrl.caja.solicitud'].search([
-                ('categoria_id', '=', rec.id)
-            ])
-            rec.cantidad_solicitudes = len(solicitudes)
-            rec.monto_total = sum(solicitudes.mapped('monto_estimado'))
+        self._calcular_estadisticas('categoria_id')
+    
+    def unlink(self):
+        Cubo = self.env['ctrl.caja.cubo'].sudo()
+        afectadas = Cubo._solicitudes_con('categoria_id', self.ids)
+        res = super().unlink()
+        Cubo._resumar(afectadas, 'categoria_id')
+        return res
     
     def action_view_solicitudes(self):
         """Abre las solicitudes relacionadas con este concepto"""
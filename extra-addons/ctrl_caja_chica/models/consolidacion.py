@@ -0,0 +1,207 @@
+from collections import defaultdict, namedtuple
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+from .busqueda import SIMILITUD_MINIMA, asegurar_trigramas
+from .solicitud import ESTADOS_ABIERTOS
+
+# Similitud (pg_trgm) entre dos textos libres para considerarlos el mismo proveedor o concepto
+SIMILITUD_GRUPO = 0.5
+# Solo se reescriben solicitudes que siguen en curso; las entregadas, rechazadas y
+# canceladas conservan el texto con el que se cerraron
+ESTADOS_CONSOLIDABLES = (*ESTADOS_ABIERTOS, 'autorizado')
+
+Consolidable = namedtuple('Consolidable', 'campo_otro campo_texto campo_catalogo modelo propuesta')
+
+# Textos libres de la solicitud que se consolidan y el catálogo al que se llevan
+CONSOLIDABLES = {
+    'concepto': Consolidable('concepto_otro', 'concepto_texto', 'categoria_id', 'ctrl.caja.concepto', 'concepto_id'),
+    'proveedor': Consolidable('proveedor_otro', 'proveedor_texto', 'proveedor_id', 'ctrl.caja.proveedor', 'proveedor_id'),
+}
+
+
+def _normalizar(columna):
+    """Clave de comparación de un texto libre: minúsculas y espacios colapsados"""
+    return f"lower(btrim(regexp_replace({columna}, '\\s+', ' ', 'g')))"
+
+
+class CtrlCajaConsolidacion(models.Model):
+    _name = 'ctrl.caja.consolidacion'
+    _description = 'Propuesta de Consolidación de Textos "Otros"'
+    _order = 'estado, cantidad desc, id'
+
+    tipo = fields.Selection([
+        ('concepto', 'Concepto'),
+        ('proveedor', 'Proveedor'),
+    ], string='Tipo', required=True, readonly=True)
+    name = fields.Char(string='Texto', required=True, readonly=True,
+                       help='Escritura más frecuente del grupo')
+    variantes = fields.Text(string='Variantes', readonly=True,
+                            help='Textos (normalizados) agrupados por similitud, uno por línea')
+    cantidad = fields.Integer(string='# Solicitudes', readonly=True)
+    monto_total = fields.Monetary(string='Monto Total', readonly=True, currency_field='currency_id')
+    currency_id = fields.Many2one('res.currency', string='Moneda',
+                                  default=lambda self: self.env.company.currency_id)
+    # Registro del catálogo más parecido; se puede corregir antes de aplicar
+    concepto_id = fields.Many2one('ctrl.caja.concepto', string='Concepto Propuesto', ondelete='set null')
+    proveedor_id = fields.Many2one('ctrl.caja.proveedor', string='Proveedor Propuesto', ondelete='set null')
+    similitud = fields.Float(string='Similitud', readonly=True, digits=(3, 2))
+    estado = fields.Selection([
+        ('propuesta', 'Propuesta'),
+        ('aplicada', 'Aplicada'),
+        ('descartada', 'Descartada'),
+    ], string='Estado', required=True, default='propuesta', readonly=True)
+
+    # ============ GENERACIÓN ============
+
+    @api.model
+    def _proponer(self):
+        """Regenera las propuestas pendientes a partir de los textos libres de las solicitudes.
+        Lo ejecuta el cron semanal; los grupos descartados no se vuelven a proponer.
+        """
+        if not asegurar_trigramas(self.env.cr):
+            raise UserError('La base de datos no tiene la extensión pg_trgm.')
+        self.search([('estado', '=', 'propuesta')]).unlink()
+        for tipo in CONSOLIDABLES:
+            self._proponer_tipo(tipo)
+
+    @api.model
+    def _proponer_tipo(self, tipo):
+        """Agrupa los textos distintos por similitud de trigramas y busca para cada grupo
+        el registro activo del catálogo más parecido. Las comparaciones se hacen en una
+        tabla temporal con índice GIN, así que no recorren todos los pares.
+        """
+        consolidable = CONSOLIDABLES[tipo]
+        Catalogo = self.env[consolidable.modelo]
+        Solicitud = self.env['ctrl.caja.solicitud']
+        Solicitud.flush_model([consolidable.campo_texto, consolidable.campo_catalogo, 'monto_estimado', 'estado'])
+        Catalogo.flush_model(['name', 'codigo', 'activo'])
+        cr = self.env.cr
+        descartados = {
+            variante
+            for propuesta in self.search([('tipo', '=', tipo), ('estado', '=', 'descartada')])
+            for variante in (propuesta.variantes or '').splitlines()
+        }
+        cr.execute("DROP TABLE IF EXISTS ctrl_caja_consolidacion_texto")
+        cr.execute(f"""
+            CREATE TEMP TABLE ctrl_caja_consolidacion_texto ON COMMIT DROP AS
+            SELECT {_normalizar(consolidable.campo_texto)} AS clave,
+                   COUNT(*) AS cantidad,
+                   SUM(monto_estimado)::float AS monto,
+                   mode() WITHIN GROUP (ORDER BY btrim({consolidable.campo_texto})) AS muestra
+              FROM ctrl_caja_solicitud
+             WHERE {consolidable.campo_texto} IS NOT NULL
+               AND {consolidable.campo_catalogo} IS NULL
+               AND estado IN %s
+             GROUP BY 1
+        """, [ESTADOS_CONSOLIDABLES])
+        cr.execute("DELETE FROM ctrl_caja_consolidacion_texto WHERE clave = '' OR clave = ANY(%s)",
+                   [list(descartados)])
+        cr.execute("CREATE INDEX ON ctrl_caja_consolidacion_texto USING gin (clave gin_trgm_ops)")
+        cr.execute("ANALYZE ctrl_caja_consolidacion_texto")
+        cr.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", [str(SIMILITUD_GRUPO)])
+        cr.execute("SELECT clave, cantidad, monto, muestra FROM ctrl_caja_consolidacion_texto ORDER BY cantidad DESC, clave")
+        textos = cr.fetchall()
+        if not textos:
+            return self.browse()
+        cr.execute("""
+            SELECT a.clave, b.clave
+              FROM ctrl_caja_consolidacion_texto a
+              JOIN ctrl_caja_consolidacion_texto b ON a.clave % b.clave AND a.clave <> b.clave
+        """)
+        vecinos = defaultdict(set)
+        for clave, vecino in cr.fetchall():
+            vecinos[clave].add(vecino)
+
+        # El texto más usado encabeza el grupo y se lleva a sus vecinos aún libres
+        grupos = []
+        asignados = set()
+        por_clave = {clave: (cantidad, monto or 0.0, muestra) for clave, cantidad, monto, muestra in textos}
+        for clave, _cantidad, _monto, _muestra in textos:
+            if clave in asignados:
+                continue
+            miembros = [clave] + sorted(vecinos[clave] - asignados, key=lambda v: -por_clave[v][0])
+            asignados.update(miembros)
+            grupos.append(miembros)
+
+        cr.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", [str(SIMILITUD_MINIMA)])
+        cr.execute(f"""
+            SELECT t.clave, c.id, c.similitud
+              FROM unnest(%s::varchar[]) AS t (clave)
+              JOIN LATERAL (
+                    SELECT id, GREATEST(similarity(t.clave, name), similarity(t.clave, COALESCE(codigo, ''))) AS similitud
+                      FROM {Catalogo._table}
+                     WHERE activo AND (t.clave %% name OR t.clave %% codigo)
+                     ORDER BY 2 DESC, id
+                     LIMIT 1
+              ) c ON true
+        """, [[miembros[0] for miembros in grupos]])
+        coincidencias = {clave: (catalogo_id, similitud) for clave, catalogo_id, similitud in cr.fetchall()}
+
+        valores = []
+        for miembros in grupos:
+            catalogo_id, similitud = coincidencias.get(miembros[0], (False, 0.0))
+            valores.append({
+                'tipo': tipo,
+                'name': por_clave[miembros[0]][2],
+                'variantes': '\n'.join(miembros),
+                'cantidad': sum(por_clave[m][0] for m in miembros),
+                'monto_total': sum(por_clave[m][1] for m in miembros),
+                consolidable.propuesta: catalogo_id,
+                'similitud': similitud,
+            })
+        return self.create(valores)
+
+    @api.model
+    def action_proponer(self):
+        self._proponer()
+        return {'type': 'ir.actions.client', 'tag': 'reload'}
+
+    # ============ APLICACIÓN ============
+
+    def action_aplicar(self):
+        """Lleva las solicitudes en curso del grupo al registro propuesto del catálogo (o a uno
+        nuevo con el texto del grupo si no hay propuesta) y deja de marcarlas como "Otros"
+        """
+        for rec in self:
+            if rec.estado != 'propuesta':
+                raise UserError(f'La propuesta "{rec.name}" ya fue {rec.estado}.')
+            consolidable = CONSOLIDABLES[rec.tipo]
+            destino = rec[consolidable.propuesta]
+            if not destino:
+                destino = self.env[consolidable.modelo].create({'name': rec.name})
+            solicitudes = rec._solicitudes()
+            solicitudes.write({
+                consolidable.campo_catalogo: destino.id,
+                consolidable.campo_otro: False,
+                consolidable.campo_texto: False,
+            })
+            rec.write({'estado': 'aplicada', consolidable.propuesta: destino.id, 'cantidad': len(solicitudes)})
+
+    def action_descartar(self):
+        self.write({'estado': 'descartada'})
+
+    def _solicitudes(self):
+        """Solicitudes en curso cuyo texto libre es una de las variantes del grupo"""
+        self.ensure_one()
+        consolidable = CONSOLIDABLES[self.tipo]
+        Solicitud = self.env['ctrl.caja.solicitud']
+        Solicitud.flush_model([consolidable.campo_texto, consolidable.campo_catalogo, 'estado'])
+        self.env.cr.execute(f"""
+            SELECT id FROM ctrl_caja_solicitud
+             WHERE {consolidable.campo_catalogo} IS NULL
+               AND estado IN %s
+               AND {_normalizar(consolidable.campo_texto)} = ANY(%s)
+        """, [ESTADOS_CONSOLIDABLES, (self.variantes or '').splitlines()])
+        return Solicitud.browse([fila[0] for fila in self.env.cr.fetchall()])
+
+    def action_view_solicitudes(self):
+        self.ensure_one()
+        return {
+            'name': f'Solicitudes - {self.name}',
+            'type': 'ir.actions.act_window',
+            'res_model': 'ctrl.caja.solicitud',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', self._solicitudes().ids)],
+        }
@@ -0,0 +1,185 @@
+from odoo import models, fields, api
+from odoo.tools import create_unique_index
+
+# Las celdas se identifican por ids y valores técnicos: renombrar un centro o concepto,
+# o cambiar de idioma, no mueve celdas; las etiquetas se resuelven al leer
+DIMENSIONES = ('origen', 'anio', 'mes', 'semana', 'centro_costo_id', 'centro_costo',
+               'concepto_id', 'concepto_texto', 'tipo_gasto', 'estado')
+# Dimensiones que pueden ir vacías: el índice único las compara con COALESCE
+DIMENSIONES_OPCIONALES = {
+    'centro_costo_id': '0', 'centro_costo': "''", 'concepto_id': '0',
+    'concepto_texto': "''", 'tipo_gasto': "''", 'estado': "''",
+}
+# Columnas de versiones anteriores: nombres y etiquetas en la celda (centro, concepto) y
+# el concepto del movimiento, que apunta a un modelo que no existe en el módulo (categoria_id)
+COLUMNAS_ANTERIORES = ('centro', 'concepto', 'categoria_id')
+# Modelos cuyas filas apuntan a centros y conceptos del catálogo
+MODELOS_SOLICITUD = ('ctrl.caja.solicitud', 'ctrl.caja.solicitud.archivo')
+TAMANO_LOTE_CUBO = 10000
+
+
+def _seleccion_de(modelo, campo):
+    """Opciones de un campo selection de otro modelo, traducidas al idioma del usuario"""
+    return lambda self: self.env[modelo]._fields[campo]._description_selection(self.env)
+
+
+class CtrlCajaCubo(models.Model):
+    """Acumulados almacenados por celda, mantenidos en cada escritura.
+
+    A diferencia de las estadísticas de los catálogos (una sola fila por proveedor o
+    concepto que tocarían todas sus solicitudes), aquí la celda incluye semana,
+    estado y tipo: dos escrituras solo compiten si caen en la misma semana, centro,
+    concepto y estado. A cambio, las pivot sobre millones de registros leen unas
+    pocas miles de celdas. Cada UPSERT toca sus celdas en un orden fijo (ver
+    _aplicar_deltas), así que dos transacciones sobre las mismas celdas se esperan
+    en lugar de bloquearse mutuamente.
+    """
+    _name = 'ctrl.caja.cubo'
+    _description = 'Cubo de Gastos (Análisis)'
+    _order = 'anio desc, semana desc'
+    _log_access = False
+
+    origen = fields.Selection([
+        ('solicitud', 'Solicitud'),
+        ('movimiento', 'Movimiento de Caja'),
+    ], string='Origen', required=True, readonly=True)
+    anio = fields.Integer(string='Año', required=True, readonly=True, group_operator=False)
+    mes = fields.Selection([
+        ('1', 'Enero'), ('2', 'Febrero'), ('3', 'Marzo'),
+        ('4', 'Abril'), ('5', 'Mayo'), ('6', 'Junio'),
+        ('7', 'Julio'), ('8', 'Agosto'), ('9', 'Septiembre'),
+        ('10', 'Octubre'), ('11', 'Noviembre'), ('12', 'Diciembre')
+    ], string='Mes', required=True, readonly=True)
+    semana = fields.Integer(string='Semana', required=True, readonly=True, group_operator=False)
+    # Solicitudes: centro y concepto del catálogo (o el texto de "Otros"). Al eliminar uno
+    # de ellos sus celdas se van en cascada y las solicitudes se vuelven a sumar (ver _resumar)
+    centro_costo_id = fields.Many2one('ctrl.caja.centro.costo', string='Centro de Costos',
+                                      readonly=True, ondelete='cascade')
+    concepto_id = fields.Many2one('ctrl.caja.concepto', string='Concepto', readonly=True, ondelete='cascade')
+    concepto_texto = fields.Char(string='Concepto (Otros)', readonly=True)
+    # Movimientos: centro de la selección
+    centro_costo = fields.Selection(_seleccion_de('ctrl.caja.chica', 'centro_costo'),
+                                    string='Centro (Movimiento)', readonly=True)
+    tipo_gasto = fields.Selection(_seleccion_de('ctrl.caja.chica', 'tipo_gasto'),
+                                  string='Tipo de Gasto', readonly=True)
+    estado = fields.Selection('_selection_estado', string='Estado', readonly=True)
+    cantidad = fields.Integer(string='# Registros', readonly=True)
+    monto = fields.Float(string='Monto', readonly=True, digits=(16, 2))
+
+    @api.model
+    def _selection_estado(self):
+        """Estados de la solicitud y estatus de pago del movimiento (no comparten claves)"""
+        return (
+            self.env['ctrl.caja.solicitud']._fields['estado']._description_selection(self.env)
+            + self.env['ctrl.caja.chica']._fields['estado_pago']._description_selection(self.env)
+        )
+
+    @api.model
+    def _expresiones_celda(self):
+        return [
+            f'COALESCE({dimension}, {DIMENSIONES_OPCIONALES[dimension]})'
+            if dimension in DIMENSIONES_OPCIONALES else dimension
+            for dimension in DIMENSIONES
+        ]
+
+    def init(self):
+        cr = self.env.cr
+        cr.execute("""
+            SELECT column_name FROM information_schema.columns
+             WHERE table_name = 'ctrl_caja_cubo' AND column_name IN %s
+        """, [COLUMNAS_ANTERIORES])
+        if cr.fetchall():
+            # Celdas con otras dimensiones: se descartan y se reconstruyen. Al quitar las
+            # columnas se va con ellas el índice único anterior
+            cr.execute("DELETE FROM ctrl_caja_cubo")
+            cr.execute("ALTER TABLE ctrl_caja_cubo DROP CONSTRAINT IF EXISTS ctrl_caja_cubo_celda_unique")
+            cr.execute(f"ALTER TABLE ctrl_caja_cubo {', '.join(f'DROP COLUMN IF EXISTS {c}' for c in COLUMNAS_ANTERIORES)}")
+        create_unique_index(cr, 'ctrl_caja_cubo_celda_idx', self._table, self._expresiones_celda())
+        cr.execute("SELECT 1 FROM ctrl_caja_cubo LIMIT 1")
+        if not cr.fetchone():
+            self._reconstruir()
+
+    @api.model
+    def _acumular(self, deltas, filas, signo):
+        for celda, monto in filas:
+            cantidad, total = deltas.get(celda, (0, 0.0))
+            deltas[celda] = (cantidad + signo, total + signo * (monto or 0.0))
+        return deltas
+
+    @api.model
+    def _aplicar(self, filas, signo=1):
+        """Suma (signo=1) o resta (signo=-1) filas [(celda, monto)] al cubo"""
+        self._aplicar_deltas(self._acumular({}, filas, signo))
+
+    @api.model
+    def _actualizar(self, antes, despues):
+        """Aplica la diferencia entre las filas anteriores y posteriores a un cambio"""
+        deltas = self._acumular({}, antes, -1)
+        self._aplicar_deltas(self._acumular(deltas, despues, 1))
+
+    @api.model
+    def _aplicar_deltas(self, deltas):
+        """Aplica {celda: (cantidad, monto)} con un solo UPSERT. Las celdas van
+        ordenadas (vacías primero en cada dimensión) para que transacciones
+        concurrentes bloqueen las filas del cubo siempre en el mismo orden.
+        """
+        valores = [
+            (*celda, cantidad, round(total, 2))
+            for celda, (cantidad, total) in sorted(
+                deltas.items(), key=lambda item: [(valor is not None, valor) for valor in item[0]])
+            if cantidad or round(total, 2)
+        ]
+        if not valores:
+            return
+        self.env.cr.execute(f"""
+            INSERT INTO ctrl_caja_cubo ({', '.join(DIMENSIONES)}, cantidad, monto)
+            VALUES {', '.join(['%s'] * len(valores))}
+            ON CONFLICT ({', '.join(self._expresiones_celda())}) DO UPDATE
+               SET cantidad = ctrl_caja_cubo.cantidad + EXCLUDED.cantidad,
+                   monto = ctrl_caja_cubo.monto + EXCLUDED.monto
+            RETURNING id, cantidad
+        """, valores)
+        # Solo las celdas recién tocadas pueden haber quedado vacías
+        vacias = tuple(celda_id for celda_id, cantidad in self.env.cr.fetchall() if not cantidad)
+        if vacias:
+            self.env.cr.execute("DELETE FROM ctrl_caja_cubo WHERE id IN %s AND cantidad = 0", [vacias])
+        self.invalidate_model()
+
+    @api.model
+    def _solicitudes_con(self, campo, ids):
+        """Solicitudes activas y archivadas cuyo `campo` apunta a alguno de `ids`"""
+        return [
+            self.env[modelo].sudo().search([(campo, 'in', ids)])
+            for modelo in MODELOS_SOLICITUD
+        ]
+
+    @api.model
+    def _resumar(self, grupos, campo):
+        """Tras eliminar centros o conceptos: sus celdas se borraron en cascada y sus
+        solicitudes (que los perdieron) vuelven a sumarse en las celdas que les tocan
+        """
+        for solicitudes in grupos:
+            solicitudes.invalidate_recordset([campo])
+            self._aplicar(solicitudes.exists()._filas_cubo())
+
+    @api.model
+    def _reconstruir(self):
+        """Reconstruye el cubo completo desde solicitudes y movimientos (recuperación)"""
+        self.env.cr.execute("DELETE FROM ctrl_caja_cubo")
+        for modelo in (*MODELOS_SOLICITUD, 'ctrl.caja.chica'):
+            Modelo = self.env[modelo].sudo().with_context(active_test=False)
+            ultimo_id = 0
+            while True:
+                registros = Modelo.search([('id', '>', ultimo_id)], order='id', limit=TAMANO_LOTE_CUBO)
+                if not registros:
+                    break
+                self._aplicar(registros._filas_cubo())
+                ultimo_id = registros[-1].id
+                registros.invalidate_recordset()
+        self.invalidate_model()
+        return True
+
+    @api.model
+    def action_reconstruir(self):
+        self._reconstruir()
+        return {'type': 'ir.actions.client', 'tag': 'reload'}
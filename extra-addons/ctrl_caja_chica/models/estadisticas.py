@@ -0,0 +1,87 @@
+from odoo import models, api
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+# Agregado SQL de cada estadística sobre las solicitudes (activas y archivadas) del registro
+AGREGADOS = {
+    'cantidad_solicitudes': 'COUNT(*)',
+    'monto_total': 'COALESCE(SUM(monto_estimado), 0)',
+}
+TABLAS_SOLICITUD = ('ctrl_caja_solicitud', 'ctrl_caja_solicitud_archivo')
+OPERADORES = ('=', '!=', '<', '<=', '>', '>=')
+
+class CtrlCajaEstadisticasMixin(models.AbstractModel):
+    _name = 'ctrl.caja.estadisticas.mixin'
+    _description = 'Motor de Estadísticas de Solicitudes'
+
+    # Many2one de la solicitud que apunta al modelo que hereda el mixin
+    _campo_estadisticas = None
+
+    def _calcular_estadisticas(self, campo):
+        """Calcula cantidad_solicitudes y monto_total para todo el recordset
+        con una consulta agrupada sobre ctrl.caja.solicitud y otra sobre el archivo.
+
+        :param campo: nombre del Many2one de la solicitud que apunta a este modelo
+        """
+        ids = [rec_id for rec_id in self._origin.ids if rec_id]
+        datos = {}
+        if ids:
+            for modelo in ('ctrl.caja.solicitud', 'ctrl.caja.solicitud.archivo'):
+                grupos = self.env[modelo].sudo()._read_group(
+                    [(campo, 'in', ids)],
+                    [campo],
+                    ['__count', 'monto_estimado:sum'],
+                )
+                for registro, cantidad, total in grupos:
+                    previo = datos.get(registro.id, (0, 0.0))
+                    datos[registro.id] = (previo[0] + cantidad, previo[1] + (total or 0.0))
+
+        for rec in self:
+            rec.cantidad_solicitudes, rec.monto_total = datos.get(rec._origin.id, (0, 0.0))
+
+    # ============ BÚSQUEDA Y ORDEN ============
+
+    def _sql_estadistica(self, alias, estadistica):
+        """Subconsulta con la estadística del registro de la fila `alias`: la resuelve
+        el índice del Many2one en cada tabla de solicitudes, sin almacenar acumulados
+        """
+        campo = self._campo_estadisticas
+        for modelo in ('ctrl.caja.solicitud', 'ctrl.caja.solicitud.archivo'):
+            self.env[modelo].flush_model([campo, 'monto_estimado'])
+        solicitudes = SQL(" UNION ALL ").join(
+            SQL("SELECT monto_estimado FROM %s WHERE %s = %s",
+                SQL.identifier(tabla), SQL.identifier(campo), SQL.identifier(alias, 'id'))
+            for tabla in TABLAS_SOLICITUD
+        )
+        return SQL("(SELECT %s FROM (%s) AS solicitudes)", SQL(AGREGADOS[estadistica]), solicitudes)
+
+    def _buscar_estadistica(self, estadistica, operator, value):
+        if operator not in OPERADORES:
+            raise UserError(f'Operador no soportado para {self._fields[estadistica].string}: {operator}')
+        self.env.cr.execute(SQL(
+            "SELECT id FROM %s WHERE %s %s %s",
+            SQL.identifier(self._table), self._sql_estadistica(self._table, estadistica),
+            SQL(operator), value or 0,
+        ))
+        return [('id', 'in', [fila[0] for fila in self.env.cr.fetchall()])]
+
+    def _search_cantidad_solicitudes(self, operator, value):
+        return self._buscar_estadistica('cantidad_solicitudes', operator, value)
+
+    def _search_monto_total(self, operator, value):
+        return self._buscar_estadistica('monto_total', operator, value)
+
+    def _order_field_to_sql(self, alias, field_name, direction, nulls, query):
+        # Permite ordenar las listas por las estadísticas (p. ej. proveedores por monto comprado)
+        if field_name in AGREGADOS:
+            return SQL("%s %s %s", self._sql_estadistica(alias, field_name), direction, nulls)
+        return super()._order_field_to_sql(alias, field_name, direction, nulls, query)
+
+    @api.model
+    def fields_get(self, allfields=None, attributes=None):
+        """Las estadísticas no se almacenan pero se pueden ordenar (ver _order_field_to_sql)"""
+        res = super().fields_get(allfields, attributes)
+        for campo in AGREGADOS:
+            if campo in res and (not attributes or 'sortable' in attributes):
+                res[campo]['sortable'] = True
+        return res
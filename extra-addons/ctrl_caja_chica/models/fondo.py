@@ -0,0 +1,184 @@
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools import create_index, date_utils
+
+from .caja_chica import SIGNO_MOVIMIENTO
+
+
+class CtrlCajaFondoMovimiento(models.Model):
+    _name = 'ctrl.caja.fondo.movimiento'
+    _description = 'Libro del Fondo de Caja Chica'
+    _order = 'fecha desc, id desc'
+
+    fecha = fields.Date(string='Fecha', required=True, default=fields.Date.context_today)
+    tipo = fields.Selection([
+        ('reposicion', 'Reposición'),
+        ('gasto', 'Gasto'),
+        ('ajuste', 'Ajuste'),
+    ], string='Tipo', required=True, default='reposicion')
+    monto = fields.Monetary(string='Monto', required=True, currency_field='currency_id',
+                            help='Positivo para entradas al fondo, negativo para salidas')
+    descripcion = fields.Char(string='Descripción')
+    gasto_id = fields.Many2one('ctrl.caja.chica', string='Movimiento de Caja',
+                               ondelete='cascade', readonly=True, index='btree_not_null')
+    currency_id = fields.Many2one('res.currency', string='Moneda',
+                                  default=lambda self: self.env.company.currency_id)
+
+    _sql_constraints = [
+        ('gasto_unique', 'unique(gasto_id)', 'El movimiento de caja ya está registrado en el fondo'),
+    ]
+
+    def init(self):
+        create_index(self.env.cr, 'ctrl_caja_fondo_movimiento_fecha_monto_idx',
+                     self._table, ['fecha', 'monto'])
+        self._registrar_gastos_faltantes()
+
+    @api.model
+    def _registrar_gastos_faltantes(self):
+        """Da de alta en el libro los movimientos de caja que aún no están registrados"""
+        self.env.cr.execute("""
+            INSERT INTO ctrl_caja_fondo_movimiento (fecha, tipo, monto, descripcion, gasto_id, currency_id,
+                                                    create_uid, create_date, write_uid, write_date)
+            SELECT c.fecha, 'gasto', %s * c.monto, c.name, c.id, c.currency_id,
+                   c.create_uid, NOW() AT TIME ZONE 'UTC', c.write_uid, NOW() AT TIME ZONE 'UTC'
+              FROM ctrl_caja_chica c
+             WHERE NOT EXISTS (SELECT 1 FROM ctrl_caja_fondo_movimiento f WHERE f.gasto_id = c.id)
+        """, [SIGNO_MOVIMIENTO])
+        if self.env.cr.rowcount:
+            self.invalidate_model()
+            self.env['ctrl.caja.fondo.corte']._reconstruir()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._ajustar_cortes(1)
+        return records
+
+    def write(self, vals):
+        if 'monto' not in vals and 'fecha' not in vals:
+            return super().write(vals)
+        self._ajustar_cortes(-1)
+        res = super().write(vals)
+        self._ajustar_cortes(1)
+        return res
+
+    def unlink(self):
+        self._ajustar_cortes(-1)
+        return super().unlink()
+
+    def _ajustar_cortes(self, signo):
+        """Suma (o resta) estos movimientos a los cortes posteriores a su fecha, en una sola sentencia"""
+        if not self:
+            return
+        self.flush_recordset(['fecha', 'monto'])
+        self.env.cr.execute("""
+            UPDATE ctrl_caja_fondo_corte c
+               SET saldo = c.saldo + d.delta
+              FROM (
+                    SELECT c2.id, SUM(m.monto) * %s AS delta
+                      FROM ctrl_caja_fondo_corte c2
+                      JOIN ctrl_caja_fondo_movimiento m ON m.fecha <= c2.fecha
+                     WHERE m.id IN %s
+                     GROUP BY c2.id
+                   ) d
+             WHERE c.id = d.id
+        """, [signo, tuple(self.ids)])
+        self.env['ctrl.caja.fondo.corte'].invalidate_model(['saldo'])
+
+    @api.model
+    def _saldo_a_fecha(self, fecha):
+        """Saldo del fondo al cierre de `fecha`: último corte + movimientos desde ese corte.
+
+        El recorrido queda acotado a los movimientos de un periodo entre cortes,
+        sin importar cuántos años de historia tenga el libro.
+        """
+        self.flush_model(['fecha', 'monto'])
+        self.env['ctrl.caja.fondo.corte'].flush_model(['fecha', 'saldo'])
+        self.env.cr.execute("""
+            SELECT fecha, saldo FROM ctrl_caja_fondo_corte
+             WHERE fecha <= %s
+             ORDER BY fecha DESC LIMIT 1
+        """, [fecha])
+        corte = self.env.cr.fetchone()
+        if corte:
+            self.env.cr.execute("""
+                SELECT COALESCE(SUM(monto), 0) FROM ctrl_caja_fondo_movimiento
+                 WHERE fecha > %s AND fecha <= %s
+            """, [corte[0], fecha])
+            return float(corte[1]) + float(self.env.cr.fetchone()[0])
+        self.env.cr.execute("""
+            SELECT COALESCE(SUM(monto), 0) FROM ctrl_caja_fondo_movimiento WHERE fecha <= %s
+        """, [fecha])
+        return float(self.env.cr.fetchone()[0])
+
+    @api.model
+    def _sincronizar_gastos(self, gastos):
+        """Crea o actualiza la salida del libro correspondiente a cada movimiento de caja"""
+        existentes = {linea.gasto_id.id: linea for linea in self.search([('gasto_id', 'in', gastos.ids)])}
+        nuevas = []
+        for gasto in gastos:
+            vals = {
+                'fecha': gasto.fecha,
+                'monto': gasto._sign() * gasto.monto,
+                'currency_id': gasto.currency_id.id,
+            }
+            linea = existentes.get(gasto.id)
+            if not linea:
+                nuevas.append(dict(vals, tipo='gasto', gasto_id=gasto.id, descripcion=gasto.name))
+            elif linea.fecha != vals['fecha'] or linea.monto != vals['monto']:
+                linea.write(vals)
+        if nuevas:
+            self.create(nuevas)
+
+
+class CtrlCajaFondoCorte(models.Model):
+    _name = 'ctrl.caja.fondo.corte'
+    _description = 'Corte Periódico del Fondo de Caja Chica'
+    _order = 'fecha desc'
+    _rec_name = 'fecha'
+
+    fecha = fields.Date(string='Fecha de Corte', required=True, readonly=True)
+    saldo = fields.Monetary(string='Saldo al Corte', readonly=True, currency_field='currency_id')
+    currency_id = fields.Many2one('res.currency', string='Moneda',
+                                  default=lambda self: self.env.company.currency_id)
+
+    _sql_constraints = [
+        ('fecha_unique', 'unique(fecha)', 'Ya existe un corte para esta fecha'),
+    ]
+
+    def init(self):
+        self._generar_corte()
+
+    @api.model
+    def _generar_corte(self):
+        """Registra los cortes de fin de mes que falten hasta el del mes anterior. Lo ejecuta
+        el cron; si dejó de correr algún mes (o el libro ya tenía historia al instalar) se
+        ponen al día todos los meses desde el último corte, cada uno con su saldo.
+        """
+        Movimiento = self.env['ctrl.caja.fondo.movimiento']
+        hasta = fields.Date.context_today(self).replace(day=1) - timedelta(days=1)
+        fecha = self.search([], order='fecha desc', limit=1).fecha
+        if not fecha:
+            primero = Movimiento.search([], order='fecha', limit=1).fecha or hasta
+            fecha = primero.replace(day=1) - timedelta(days=1)
+        cortes = self.browse()
+        while True:
+            fecha = date_utils.end_of(fecha + timedelta(days=1), 'month')
+            if fecha > hasta:
+                return cortes
+            # Cada saldo parte del corte recién creado: el recorrido sigue acotado a un mes
+            saldo = Movimiento._saldo_a_fecha(fecha)
+            cortes |= self.create({'fecha': fecha, 'saldo': saldo})
+
+    @api.model
+    def _reconstruir(self):
+        """Recalcula el saldo de todos los cortes desde el libro (recuperación)"""
+        self.env['ctrl.caja.fondo.movimiento'].flush_model(['fecha', 'monto'])
+        self.env.cr.execute("""
+            UPDATE ctrl_caja_fondo_corte c
+               SET saldo = COALESCE((
+                    SELECT SUM(monto) FROM ctrl_caja_fondo_movimiento m WHERE m.fecha <= c.fecha
+               ), 0)
+        """)
+        self.invalidate_model(['saldo'])
@@ -0,0 +1,284 @@
+import base64
+import csv
+import io
+import tempfile
+import time
+import unicodedata
+from datetime import date, datetime
+
+from odoo import models, fields
+from odoo.exceptions import UserError
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# Encabezado normalizado del Excel -> campo de ctrl.caja.chica
+COLUMNAS = {
+    'fecha': 'fecha',
+    'fecha pago': 'fecha',
+    'fecha de pago': 'fecha',
+    'fecha solicitud': 'fecha_solicitud',
+    'fecha de solicitud': 'fecha_solicitud',
+    'tipo': 'tipo_gasto',
+    'tipo de gasto': 'tipo_gasto',
+    'tipo gasto': 'tipo_gasto',
+    'concepto': 'categoria_id',
+    'categoria': 'categoria_id',
+    'centro de costos': 'centro_costo',
+    'centro de costo': 'centro_costo',
+    'centro costos': 'centro_costo',
+    'desembolso': 'monto',
+    'monto': 'monto',
+    'importe': 'monto',
+    'folio de pago': 'folio_pago',
+    'folio pago': 'folio_pago',
+    'tipo documento': 'tipo_documento',
+    'tipo de documento': 'tipo_documento',
+    'numero de factura': 'numero_factura',
+    'factura': 'numero_factura',
+    'cantidad': 'cantidad',
+    'unidad': 'unidad',
+    'descripcion': 'descripcion',
+    'proveedor': 'proveedor',
+    'estatus': 'estado_pago',
+    'forma de pago': 'metodo_pago',
+    'responsable': 'responsable_id',
+}
+
+CAMPOS_SELECCION = ('tipo_gasto', 'centro_costo', 'tipo_documento', 'estado_pago', 'metodo_pago')
+FORMATOS_FECHA = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%y')
+
+
+def _normalizar(texto):
+    """Minúsculas, sin acentos ni espacios sobrantes (para encabezados y búsquedas)"""
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode()
+    return ' '.join(texto.lower().replace('_', ' ').split())
+
+
+class _ArchivoRechazos:
+    """CSV de filas rechazadas escrito a un temporal conforme aparecen: la memoria
+    no crece con la cantidad de rechazos de un archivo grande
+    """
+
+    def __init__(self):
+        self.cantidad = 0
+        self._archivo = tempfile.TemporaryFile()
+        self._texto = io.TextIOWrapper(self._archivo, encoding='utf-8-sig', newline='')
+        self._escritor = csv.writer(self._texto)
+
+    def agregar(self, numero, encabezados, valores, error):
+        if not self.cantidad:
+            self._escritor.writerow(['fila', *[str(e or '') for e in encabezados], 'error'])
+        self._escritor.writerow([numero, *['' if v is None else v for v in valores], error])
+        self.cantidad += 1
+
+    def contenido(self):
+        """CSV en base64, o False si no hubo rechazos"""
+        if not self.cantidad:
+            return False
+        self._texto.flush()
+        self._archivo.seek(0)
+        return base64.b64encode(self._archivo.read())
+
+    def cerrar(self):
+        self._texto.close()
+
+
+class CtrlCajaImportacionWizard(models.TransientModel):
+    _name = 'ctrl.caja.importacion.wizard'
+    _description = 'Importar Movimientos desde Excel/CSV'
+
+    archivo = fields.Binary(string='Archivo (XLSX o CSV)', required=True, attachment=True)
+    nombre_archivo = fields.Char(string='Nombre del Archivo')
+    tamano_lote = fields.Integer(string='Registros por Lote', default=2000, required=True)
+    estado = fields.Selection([
+        ('borrador', 'Borrador'),
+        ('hecho', 'Importado'),
+    ], default='borrador')
+
+    # Resultados
+    filas_importadas = fields.Integer(string='Filas Importadas', readonly=True)
+    filas_rechazadas = fields.Integer(string='Filas Rechazadas', readonly=True)
+    duracion = fields.Float(string='Duración (s)', readonly=True, digits=(12, 2))
+    filas_por_segundo = fields.Float(string='Filas por Segundo', readonly=True, digits=(12, 1))
+    archivo_rechazos = fields.Binary(string='Filas Rechazadas (CSV)', readonly=True, attachment=False)
+    nombre_rechazos = fields.Char(default='rechazos.csv')
+
+    # ============ LECTURA EN STREAMING ============
+
+    def _abrir_archivo(self):
+        """Abre el archivo desde el filestore (sin decodificar todo el base64 en memoria)"""
+        adjunto = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'archivo'),
+        ], limit=1)
+        if adjunto.store_fname:
+            return open(adjunto._full_path(adjunto.store_fname), 'rb')
+        return io.BytesIO(adjunto.raw or base64.b64decode(self.archivo or b''))
+
+    def _leer_filas(self, archivo):
+        """Genera (número de fila, encabezados, valores) sin cargar el archivo completo"""
+        nombre = (self.nombre_archivo or '').lower()
+        if nombre.endswith(('.xlsx', '.xlsm')):
+            if openpyxl is None:
+                raise UserError('Para importar archivos XLSX se requiere la librería openpyxl.')
+            libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+            try:
+                filas = libro.worksheets[0].iter_rows(values_only=True)
+                encabezados = next(filas, ())
+                for numero, valores in enumerate(filas, start=2):
+                    if any(v not in (None, '') for v in valores):
+                        yield numero, encabezados, valores
+            finally:
+                libro.close()
+        elif nombre.endswith('.csv'):
+            texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+            filas = csv.reader(texto)
+            encabezados = next(filas, [])
+            for numero, valores in enumerate(filas, start=2):
+                if any(v.strip() for v in valores):
+                    yield numero, encabezados, valores
+        else:
+            raise UserError('Formato no soportado. Use un archivo .xlsx o .csv.')
+
+    # ============ RESOLUCIÓN DE VALORES ============
+
+    def _construir_catalogos(self):
+        """Diccionarios de búsqueda construidos una sola vez para toda la importación"""
+        Movimiento = self.env['ctrl.caja.chica']
+        catalogos = {}
+        for campo in ('categoria_id', 'proveedor', 'responsable_id'):
+            comodelo = self.env[Movimiento._fields[campo].comodel_name].with_context(active_test=False)
+            if comodelo._abstract:
+                # Modelo relacionado que no existe en la base (Odoo lo reemplaza por
+                # _unknown): no hay con qué resolver la columna y se ignora
+                catalogos[campo] = None
+                continue
+            catalogos[campo] = {
+                _normalizar(fila['name']): fila['id']
+                for fila in comodelo.search_read([], ['name'])
+            }
+        for campo in CAMPOS_SELECCION:
+            opciones = Movimiento._fields[campo]._description_selection(self.env)
+            mapa = {}
+            for clave, etiqueta in opciones:
+                mapa[_normalizar(clave)] = clave
+                mapa[_normalizar(etiqueta)] = clave
+            catalogos[campo] = mapa
+        return catalogos
+
+    def _convertir_fecha(self, valor):
+        if isinstance(valor, datetime):
+            return valor.date()
+        if isinstance(valor, date):
+            return valor
+        for formato in FORMATOS_FECHA:
+            try:
+                return datetime.strptime(str(valor).strip(), formato).date()
+            except ValueError:
+                continue
+        raise ValueError(f'Fecha inválida: {valor}')
+
+    def _convertir_numero(self, valor):
+        if isinstance(valor, (int, float)):
+            return float(valor)
+        return float(str(valor).replace('$', '').replace(',', '').strip())
+
+    def _convertir_fila(self, encabezados, valores, catalogos):
+        """Convierte una fila en vals de ctrl.caja.chica; lanza ValueError con el motivo de rechazo"""
+        vals = {}
+        for encabezado, valor in zip(encabezados, valores):
+            campo = COLUMNAS.get(_normalizar(encabezado))
+            if not campo or valor in (None, ''):
+                continue
+            if campo in ('fecha', 'fecha_solicitud'):
+                vals[campo] = self._convertir_fecha(valor)
+            elif campo in ('monto', 'cantidad'):
+                vals[campo] = self._convertir_numero(valor)
+            elif campo in catalogos:
+                if catalogos[campo] is None:
+                    continue
+                clave = catalogos[campo].get(_normalizar(valor))
+                if clave is None:
+                    raise ValueError(f'Valor no encontrado para "{encabezado}": {valor}')
+                vals[campo] = clave
+            else:
+                vals[campo] = str(valor).strip()
+        if 'fecha' not in vals:
+            raise ValueError('Falta la fecha de pago.')
+        if 'monto' not in vals:
+            raise ValueError('Falta el monto.')
+        return vals
+
+    # ============ IMPORTACIÓN ============
+
+    def _insertar_lote(self, lote, encabezados, rechazos):
+        """Inserta un lote; si falla, lo reintenta fila por fila para aislar los rechazos"""
+        Movimiento = self.env['ctrl.caja.chica'].with_context(
+            tracking_disable=True,
+            mail_create_nolog=True,
+            mail_create_nosubscribe=True,
+        )
+        try:
+            with self.env.cr.savepoint():
+                Movimiento.create([vals for __, __, vals in lote])
+            return len(lote)
+        except Exception:
+            self.env.invalidate_all()
+        importadas = 0
+        for numero, valores, vals in lote:
+            try:
+                with self.env.cr.savepoint():
+                    Movimiento.create([vals])
+                importadas += 1
+            except Exception as e:
+                self.env.invalidate_all()
+                rechazos.agregar(numero, encabezados, valores, str(e))
+        return importadas
+
+    def action_importar(self):
+        """Importa el archivo en lotes de `tamano_lote` registros con memoria constante"""
+        self.ensure_one()
+        if self.tamano_lote <= 0:
+            raise UserError('El tamaño de lote debe ser mayor a cero.')
+
+        inicio = time.monotonic()
+        catalogos = self._construir_catalogos()
+        rechazos = _ArchivoRechazos()
+        importadas = 0
+        encabezados = ()
+        lote = []
+        try:
+            with self._abrir_archivo() as archivo:
+                for numero, encabezados, valores in self._leer_filas(archivo):
+                    try:
+                        lote.append((numero, valores, self._convertir_fila(encabezados, valores, catalogos)))
+                    except ValueError as e:
+                        rechazos.agregar(numero, encabezados, valores, str(e))
+                    if len(lote) >= self.tamano_lote:
+                        importadas += self._insertar_lote(lote, encabezados, rechazos)
+                        lote = []
+                if lote:
+                    importadas += self._insertar_lote(lote, encabezados, rechazos)
+            duracion = time.monotonic() - inicio
+
+            self.write({
+                'estado': 'hecho',
+                'filas_importadas': importadas,
+                'filas_rechazadas': rechazos.cantidad,
+                'duracion': duracion,
+                'filas_por_segundo': importadas / duracion if duracion else 0.0,
+                'archivo_rechazos': rechazos.contenido(),
+            })
+        finally:
+            rechazos.cerrar()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
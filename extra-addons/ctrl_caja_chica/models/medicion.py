@@ -0,0 +1,154 @@
+import functools
+import threading
+import time
+
+from odoo import models, fields, api, tools
+
+PARAMETRO_ACTIVO = 'ctrl_caja_chica.instrumentacion'
+PARAMETRO_CAPACIDAD = 'ctrl_caja_chica.instrumentacion_capacidad'
+CAPACIDAD_DEFAULT = 10000
+
+# Mediciones de la llamada en curso; se escriben juntas al terminar la más externa
+_local = threading.local()
+
+
+def instrumentado(metodo):
+    """Registra duración, consultas SQL y tiempo SQL de cada llamada a `metodo`
+    cuando el parámetro ctrl_caja_chica.instrumentacion está activo.
+    Desactivado, el costo es una consulta a caché.
+    """
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        if not self.env['ctrl.caja.medicion']._activo():
+            return metodo(self, *args, **kwargs)
+        pendientes = getattr(_local, 'pendientes', None)
+        externa = pendientes is None
+        if externa:
+            pendientes = _local.pendientes = []
+        cr = self.env.cr
+        hilo = threading.current_thread()
+        sql_inicio = getattr(hilo, 'query_time', None)
+        consultas_inicio = cr.sql_log_count
+        inicio = time.perf_counter()
+        completada = False
+        try:
+            resultado = metodo(self, *args, **kwargs)
+            completada = True
+            return resultado
+        finally:
+            sql_fin = getattr(hilo, 'query_time', None)
+            pendientes.append((
+                self._name,
+                metodo.__name__,
+                len(self),
+                (time.perf_counter() - inicio) * 1000,
+                cr.sql_log_count - consultas_inicio,
+                (sql_fin - sql_inicio) * 1000 if sql_inicio is not None else None,
+            ))
+            if externa:
+                _local.pendientes = None
+                # Si la llamada falló la transacción se revierte: no se escribe nada
+                if completada:
+                    self.env['ctrl.caja.medicion']._registrar(pendientes)
+    return envoltura
+
+
+class CtrlCajaMedicion(models.Model):
+    _name = 'ctrl.caja.medicion'
+    _description = 'Medición de Desempeño'
+    _order = 'fecha desc'
+    _log_access = False
+
+    # Posición en el buffer circular: al llenarse se sobrescriben las más antiguas
+    posicion = fields.Integer(string='Posición', required=True, readonly=True)
+    fecha = fields.Datetime(string='Fecha', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='Usuario', readonly=True, ondelete='set null')
+    modelo = fields.Char(string='Modelo', required=True, readonly=True)
+    metodo = fields.Char(string='Método', required=True, readonly=True)
+    registros = fields.Integer(string='Registros', readonly=True)
+    duracion_ms = fields.Float(string='Duración (ms)', readonly=True, digits=(12, 2))
+    consultas = fields.Integer(string='Consultas SQL', readonly=True)
+    sql_ms = fields.Float(string='Tiempo SQL (ms)', readonly=True, digits=(12, 2))
+
+    _sql_constraints = [
+        ('posicion_unique', 'unique(posicion)', 'La posición del buffer ya está ocupada'),
+    ]
+
+    def init(self):
+        self.env.cr.execute("CREATE SEQUENCE IF NOT EXISTS ctrl_caja_medicion_posicion_seq")
+
+    @api.model
+    @tools.ormcache()
+    def _activo(self):
+        return bool(self.env['ir.config_parameter'].sudo().get_param(PARAMETRO_ACTIVO))
+
+    @api.model
+    @tools.ormcache()
+    def _capacidad(self):
+        valor = self.env['ir.config_parameter'].sudo().get_param(PARAMETRO_CAPACIDAD)
+        return int(valor or CAPACIDAD_DEFAULT)
+
+    @api.model
+    def _registrar(self, mediciones):
+        """Escribe las mediciones en el buffer circular con un solo UPSERT"""
+        if not mediciones:
+            return
+        ahora = fields.Datetime.now()
+        self.env.cr.execute(f"""
+            INSERT INTO ctrl_caja_medicion (posicion, fecha, user_id, modelo, metodo, registros,
+                                            duracion_ms, consultas, sql_ms)
+            SELECT nextval('ctrl_caja_medicion_posicion_seq') %% %s, m.*
+              FROM (VALUES {', '.join(['(%s::timestamp, %s::int, %s, %s, %s::int, %s::float, %s::int, %s::float)'] * len(mediciones))}) AS m
+            ON CONFLICT (posicion) DO UPDATE
+               SET fecha = EXCLUDED.fecha, user_id = EXCLUDED.user_id, modelo = EXCLUDED.modelo,
+                   metodo = EXCLUDED.metodo, registros = EXCLUDED.registros,
+                   duracion_ms = EXCLUDED.duracion_ms, consultas = EXCLUDED.consultas,
+                   sql_ms = EXCLUDED.sql_ms
+        """, [self._capacidad()] + [
+            valor
+            for modelo, metodo, registros, duracion, consultas, sql in mediciones
+            for valor in (ahora, self.env.uid, modelo, metodo, registros, duracion, consultas, sql)
+        ])
+        self.invalidate_model()
+
+    @api.model
+    def action_limpiar(self):
+        self.env.cr.execute("TRUNCATE ctrl_caja_medicion")
+        self.invalidate_model()
+        return {'type': 'ir.actions.client', 'tag': 'reload'}
+
+
+class CtrlCajaMedicionReporte(models.Model):
+    _name = 'ctrl.caja.medicion.reporte'
+    _description = 'Reporte de Desempeño por Método'
+    _auto = False
+    _order = 'p95_ms desc'
+
+    modelo = fields.Char(string='Modelo', readonly=True)
+    metodo = fields.Char(string='Método', readonly=True)
+    llamadas = fields.Integer(string='Llamadas', readonly=True)
+    p50_ms = fields.Float(string='p50 (ms)', readonly=True, digits=(12, 2))
+    p95_ms = fields.Float(string='p95 (ms)', readonly=True, digits=(12, 2))
+    max_ms = fields.Float(string='Máximo (ms)', readonly=True, digits=(12, 2))
+    consultas_p50 = fields.Float(string='Consultas p50', readonly=True, digits=(12, 1))
+    consultas_p95 = fields.Float(string='Consultas p95', readonly=True, digits=(12, 1))
+    sql_p95_ms = fields.Float(string='SQL p95 (ms)', readonly=True, digits=(12, 2))
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE VIEW {self._table} AS (
+                SELECT row_number() OVER (ORDER BY modelo, metodo) AS id,
+                       modelo,
+                       metodo,
+                       COUNT(*) AS llamadas,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY duracion_ms) AS p50_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY duracion_ms) AS p95_ms,
+                       MAX(duracion_ms) AS max_ms,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY consultas) AS consultas_p50,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY consultas) AS consultas_p95,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY sql_ms) AS sql_p95_ms
+                  FROM ctrl_caja_medicion
+                 GROUP BY modelo, metodo
+            )
+        """)
@@ -0,0 +1,186 @@
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+
+from .solicitud import ACUMULADO_ESTADO
+
+ACUMULADOS = ('reservado', 'comprometido', 'consumido')
+
+
+class CtrlCajaPresupuesto(models.Model):
+    _name = 'ctrl.caja.presupuesto'
+    _description = 'Presupuesto Mensual por Centro de Costo'
+    _order = 'periodo desc, centro_costo_id'
+    _rec_name = 'centro_costo_id'
+
+    centro_costo_id = fields.Many2one('ctrl.caja.centro.costo', string='Centro de Costos',
+                                      required=True, ondelete='cascade')
+    periodo = fields.Date(string='Mes', required=True,
+                          default=lambda self: fields.Date.context_today(self).replace(day=1),
+                          help='Se guarda como el primer día del mes')
+    currency_id = fields.Many2one('res.currency', string='Moneda', required=True,
+                                  default=lambda self: self.env.company.currency_id)
+    monto = fields.Monetary(string='Presupuesto', required=True, currency_field='currency_id')
+    # Acumulados que mantienen las escrituras de solicitudes (no se editan a mano)
+    reservado = fields.Monetary(string='En Autorización', readonly=True, currency_field='currency_id')
+    comprometido = fields.Monetary(string='Autorizado', readonly=True, currency_field='currency_id')
+    consumido = fields.Monetary(string='Entregado', readonly=True, currency_field='currency_id')
+    disponible = fields.Monetary(string='Disponible', compute='_compute_disponible',
+                                 currency_field='currency_id')
+
+    _sql_constraints = [
+        ('centro_periodo_unique', 'unique(centro_costo_id, periodo)',
+         'Ya existe un presupuesto para este centro de costo en ese mes'),
+        ('monto_positivo', 'CHECK(monto >= 0)', 'El presupuesto no puede ser negativo'),
+    ]
+
+    @api.depends('monto', 'reservado', 'comprometido', 'consumido')
+    def _compute_disponible(self):
+        for rec in self:
+            rec.disponible = rec.monto - rec.reservado - rec.comprometido - rec.consumido
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('periodo'):
+                vals['periodo'] = fields.Date.to_date(vals['periodo']).replace(day=1)
+        records = super().create(vals_list)
+        records._recalcular()
+        return records
+
+    def write(self, vals):
+        if vals.get('periodo'):
+            vals['periodo'] = fields.Date.to_date(vals['periodo']).replace(day=1)
+        if any(campo in vals for campo in ACUMULADOS):
+            raise ValidationError('Los acumulados del presupuesto se calculan a partir de las solicitudes.')
+        res = super().write(vals)
+        if 'periodo' in vals or 'centro_costo_id' in vals:
+            self._recalcular()
+        return res
+
+    def _recalcular(self):
+        """Recalcula los acumulados desde las solicitudes (alta del presupuesto o recuperación).
+        Incluye las archivadas: una entrega archivada sigue consumiendo su mes.
+        """
+        if not self:
+            return
+        self.flush_recordset()
+        self.env['ctrl.caja.solicitud'].flush_model(['fecha_solicitud', 'centro_costo_id', 'estado', 'monto_estimado'])
+        casos = {
+            acumulado: ', '.join(f"'{estado}'" for estado, a in ACUMULADO_ESTADO.items() if a == acumulado)
+            for acumulado in ACUMULADOS
+        }
+        self.env.cr.execute(f"""
+            UPDATE ctrl_caja_presupuesto p
+               SET {', '.join(f'{acumulado} = COALESCE(t.{acumulado}, 0)' for acumulado in ACUMULADOS)}
+              FROM ctrl_caja_presupuesto p2
+              LEFT JOIN LATERAL (
+                    SELECT {', '.join(
+                        f'SUM(s.monto_estimado) FILTER (WHERE s.estado IN ({casos[acumulado]})) AS {acumulado}'
+                        for acumulado in ACUMULADOS
+                    )}
+                      FROM (SELECT centro_costo_id, fecha_solicitud, estado, monto_estimado FROM ctrl_caja_solicitud
+                            UNION ALL
+                            SELECT centro_costo_id, fecha_solicitud, estado, monto_estimado FROM ctrl_caja_solicitud_archivo
+                           ) s
+                     WHERE s.centro_costo_id = p2.centro_costo_id
+                       AND date_trunc('month', s.fecha_solicitud) = p2.periodo
+              ) t ON true
+             WHERE p.id = p2.id AND p.id IN %s
+        """, [tuple(self.ids)])
+        self.invalidate_recordset(list(ACUMULADOS))
+
+    def action_recalcular(self):
+        self._recalcular()
+        return {'type': 'ir.actions.client', 'tag': 'reload'}
+
+    # ============ ACUMULADOS INCREMENTALES ============
+
+    @api.model
+    def _aplicar(self, filas, signo=1):
+        """Suma (signo=1) o resta (signo=-1) filas [((centro_id, periodo), acumulado, monto)]"""
+        if signo > 0:
+            self._actualizar([], filas)
+        else:
+            self._actualizar(filas, [])
+
+    @api.model
+    def _actualizar(self, antes, despues):
+        """Aplica la diferencia entre las filas anteriores y posteriores a un cambio.
+        Los centros sin presupuesto para el mes no tienen fila y no se controlan.
+        """
+        deltas = {}
+        for filas, signo in ((antes, -1), (despues, 1)):
+            for clave, acumulado, monto in filas:
+                por_acumulado = deltas.setdefault(clave, dict.fromkeys(ACUMULADOS, 0.0))
+                por_acumulado[acumulado] += signo * (monto or 0.0)
+        valores = [
+            (centro_id, periodo, *(round(por_acumulado[a], 2) for a in ACUMULADOS))
+            for (centro_id, periodo), por_acumulado in deltas.items()
+            if any(round(monto, 2) for monto in por_acumulado.values())
+        ]
+        if not valores:
+            return
+        self.env.cr.execute(f"""
+            UPDATE ctrl_caja_presupuesto p
+               SET {', '.join(f'{a} = p.{a} + d.{a}' for a in ACUMULADOS)}
+              FROM (VALUES {', '.join(['(%s::int, %s::date, %s::numeric, %s::numeric, %s::numeric)'] * len(valores))})
+                   AS d (centro_costo_id, periodo, {', '.join(ACUMULADOS)})
+             WHERE p.centro_costo_id = d.centro_costo_id AND p.periodo = d.periodo
+        """, [valor for fila in valores for valor in fila])
+        self.invalidate_model(list(ACUMULADOS))
+
+    # ============ VERIFICACIÓN DE DISPONIBLE ============
+
+    @api.model
+    def _verificar(self, contexto, solicitud, destino):
+        """Guarda de presupuesto para una solicitud que pasa al estado `destino`.
+
+        Solo verifica cuando la solicitud cambia de acumulado: al enviarla (pasa a
+        reservado) y al quedar autorizada, por el último nivel o por un reajuste de
+        límites (pasa de reservado a comprometido). Las autorizaciones intermedias
+        no mueven dinero y no se verifican.
+
+        Lee la fila del presupuesto del centro y mes con SELECT ... FOR UPDATE: las
+        transacciones concurrentes sobre el mismo presupuesto esperan a que esta
+        termine, así que dos envíos simultáneos no pueden gastar el mismo disponible.
+        La fila bloqueada se guarda en `contexto` y se le aplica el mismo movimiento
+        que hará la escritura, para que un lote descuente cada solicitud aceptada sin
+        volver a leerla. Retorna el motivo de rechazo o None.
+        """
+        origen = ACUMULADO_ESTADO.get(solicitud.estado)
+        acumulado = ACUMULADO_ESTADO.get(destino)
+        if acumulado not in ('reservado', 'comprometido') or acumulado == origen:
+            return None
+        if not solicitud.centro_costo_id or not solicitud.fecha_solicitud:
+            return None
+        clave = (solicitud.centro_costo_id.id, solicitud.fecha_solicitud.replace(day=1))
+        presupuestos = contexto.setdefault('presupuestos', {})
+        if clave not in presupuestos:
+            self.env.cr.execute(f"""
+                SELECT monto, {', '.join(ACUMULADOS)}
+                  FROM ctrl_caja_presupuesto
+                 WHERE centro_costo_id = %s AND periodo = %s
+                   FOR UPDATE
+            """, list(clave))
+            fila = self.env.cr.dictfetchone()
+            presupuestos[clave] = fila and {nombre: float(valor) for nombre, valor in fila.items()}
+        presupuesto = presupuestos[clave]
+        if presupuesto is None:
+            return None
+        monto = solicitud.monto_estimado
+        if acumulado == 'reservado':
+            # Al enviar, la solicitud reserva su monto junto a las demás en autorización
+            libre = presupuesto['monto'] - presupuesto['reservado'] - presupuesto['comprometido'] - presupuesto['consumido']
+        else:
+            # Al autorizar su monto ya está reservado: basta que quepa en lo no comprometido
+            libre = presupuesto['monto'] - presupuesto['comprometido'] - presupuesto['consumido']
+        if monto > round(libre, 2):
+            return (
+                f'El centro de costo "{solicitud.centro_costo_id.name}" no tiene presupuesto suficiente '
+                f'para {solicitud.fecha_solicitud.strftime("%m/%Y")}: disponible ${max(libre, 0):,.2f}, '
+                f'solicitado ${monto:,.2f}.'
+            )
+        presupuesto[acumulado] += monto
+        if origen in presupuesto:
+            presupuesto[origen] -= monto
+        return None
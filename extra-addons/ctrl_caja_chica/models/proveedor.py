@@ -3,8 +3,9 @@ from odoo import models, fields, api
 class CtrlCajaProveedor(models.Model):
     _name = 'ctrl.caja.proveedor'
     _description = 'Proveedores de Caja Chica'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['ctrl.caja.estadisticas.mixin', 'ctrl.caja.busqueda.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'name'
+    _campo_estadisticas = 'proveedor_id'
 
     name = fields.Char(string='Nombre del Proveedor', required=True, tracking=True)
     
@@ -24,10 +25,11 @@ class CtrlCajaProveedor(models.Model):
     activo = fields.Boolean(string='Activo', default=True, tracking=True)
     
     # Estadísticas
+    solicitud_ids = fields.One2many('ctrl.caja.solicitud', 'proveedor_id', string='Solicitudes')
     cantidad_solicitudes = fields.Integer(string='# Solicitudes',
-                                         compute='_compute_estadisticas')
+                                         compute='_compute_estadisticas', search='_search_cantidad_solicitudes')
     monto_total = fields.Monetary(string='Monto Total Comprado',
-                                  compute='_compute_estadisticas',
+                                  compute='_compute_estadisticas', search='_search_monto_total',
                                   currency_field='currency_id')
     currency_id = fields.Many2one('res.currency', string='Moneda',
                                   default=lambda self: self.env.company.currency_id)
@@ -38,12 +40,7 @@ class CtrlCajaProveedor(models.Model):
     
     def _compute_estadisticas(self):
         """Calcula estadísticas de compras al proveedor"""
-        for rec in self:
-            solicitudes = self.env['ctrl.caja.solicitud'].search([
-                ('proveedor_id', '=', rec.id)
-            ])
-            rec.cantidad_solicitudes = len(solicitudes)
-            rec.monto_total = sum(solicitudes.mapped('monto_estimado'))
+        self._calcular_estadisticas('proveedor_id')
     
     def action_view_solicitudes(self):
         """Abre las solicitudes relacionadas con este proveedor"""
@@ -0,0 +1,84 @@
+from odoo import models, fields, api
+
+from .solicitud import ESTADOS_ABIERTOS
+
+TAMANO_LOTE_RECALCULO = 1000
+
+
+class CtrlCajaRecalculo(models.Model):
+    _name = 'ctrl.caja.recalculo'
+    _description = 'Recálculo de Niveles por Cambio de Límites'
+    _order = 'id desc'
+    _rec_name = 'centro_costo_id'
+
+    centro_costo_id = fields.Many2one('ctrl.caja.centro.costo', string='Centro de Costos',
+                                      required=True, readonly=True, ondelete='cascade')
+    estado = fields.Selection([
+        ('pendiente', 'Pendiente'),
+        ('hecho', 'Terminado'),
+    ], string='Estado', required=True, default='pendiente', readonly=True)
+    total = fields.Integer(string='Solicitudes Abiertas', readonly=True)
+    procesadas = fields.Integer(string='Procesadas', readonly=True)
+    reajustadas = fields.Integer(string='Pasadas a Autorizado', readonly=True)
+    progreso = fields.Float(string='Progreso', compute='_compute_progreso')
+    # Cursor por id: el siguiente lote continúa después de la última procesada
+    ultimo_id = fields.Integer(string='Última Solicitud', readonly=True)
+
+    @api.depends('total', 'procesadas')
+    def _compute_progreso(self):
+        for rec in self:
+            rec.progreso = 100.0 * rec.procesadas / rec.total if rec.total else 100.0
+
+    @api.model
+    def _encolar(self, centros):
+        """Programa el recálculo de las solicitudes abiertas de los centros; si ya había
+        uno pendiente para el centro se reinicia desde el principio
+        """
+        totales = dict(self.env['ctrl.caja.solicitud'].sudo()._read_group(
+            [('centro_costo_id', 'in', centros.ids), ('estado', 'in', ESTADOS_ABIERTOS)],
+            ['centro_costo_id'], ['__count'],
+        ))
+        pendientes = self.search([('centro_costo_id', 'in', centros.ids), ('estado', '=', 'pendiente')])
+        for trabajo in pendientes:
+            trabajo.write({
+                'total': totales.get(trabajo.centro_costo_id, 0),
+                'procesadas': 0,
+                'reajustadas': 0,
+                'ultimo_id': 0,
+            })
+        trabajos = pendientes | self.create([
+            {'centro_costo_id': centro.id, 'total': totales.get(centro, 0)}
+            for centro in centros - pendientes.centro_costo_id
+        ])
+        self.env.ref('ctrl_caja_chica.ir_cron_ctrl_caja_recalculo')._trigger()
+        return trabajos
+
+    @api.model
+    def _procesar(self, limite=TAMANO_LOTE_RECALCULO):
+        """Procesa hasta `limite` solicitudes de los recálculos pendientes. Lo ejecuta el cron,
+        que se vuelve a programar mientras quede trabajo para confirmar el avance por lote.
+        """
+        Solicitud = self.env['ctrl.caja.solicitud'].sudo()
+        restante = limite
+        for trabajo in self.search([('estado', '=', 'pendiente')], order='id'):
+            if restante <= 0:
+                break
+            lote = Solicitud.search([
+                ('centro_costo_id', '=', trabajo.centro_costo_id.id),
+                ('estado', 'in', ESTADOS_ABIERTOS),
+                ('id', '>', trabajo.ultimo_id),
+            ], order='id', limit=restante)
+            reajustadas = lote._recalcular_nivel()
+            valores = {
+                'procesadas': trabajo.procesadas + len(lote),
+                'reajustadas': trabajo.reajustadas + len(reajustadas),
+            }
+            if len(lote) < restante:
+                valores['estado'] = 'hecho'
+            else:
+                valores['ultimo_id'] = lote[-1].id
+            trabajo.write(valores)
+            restante -= len(lote)
+        if self.search_count([('estado', '=', 'pendiente')], limit=1):
+            self.env.ref('ctrl_caja_chica.ir_cron_ctrl_caja_recalculo')._trigger()
+        return limite - restante
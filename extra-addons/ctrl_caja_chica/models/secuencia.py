@@ -0,0 +1,53 @@
+from odoo import models, api
+
+class CtrlCajaSecuenciaMixin(models.AbstractModel):
+    _name = 'ctrl.caja.secuencia.mixin'
+    _description = 'Reserva de Folios en Bloque'
+
+    @api.model
+    def _reservar_folios(self, codigo, cantidad):
+        """Reserva `cantidad` folios consecutivos de la secuencia `codigo` con una sola llamada.
+
+        Retorna la lista de folios formateados (prefijo, relleno, sufijo) o una
+        lista vacía si la secuencia no existe.
+        """
+        secuencia = self.env['ir.sequence'].sudo().search([
+            ('code', '=', codigo),
+            ('company_id', 'in', [self.env.company.id, False]),
+        ], order='company_id', limit=1)
+        if not secuencia or cantidad <= 0:
+            return []
+        if secuencia.use_date_range:
+            # Los rangos por fecha no admiten reserva en bloque
+            return [secuencia._next() for _ in range(cantidad)]
+        
+        if secuencia.implementation == 'standard':
+            self.env.cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                ['ir_sequence_%03d' % secuencia.id, cantidad]
+            )
+            numeros = [fila[0] for fila in self.env.cr.fetchall()]
+        else:
+            self.env.cr.execute(
+                "SELECT number_next FROM ir_sequence WHERE id = %s FOR UPDATE NOWAIT",
+                [secuencia.id]
+            )
+            inicio = self.env.cr.fetchone()[0]
+            self.env.cr.execute(
+                "UPDATE ir_sequence SET number_next = number_next + %s WHERE id = %s",
+                [secuencia.number_increment * cantidad, secuencia.id]
+            )
+            secuencia.invalidate_recordset(['number_next'])
+            numeros = [inicio + i * secuencia.number_increment for i in range(cantidad)]
+        return [secuencia.get_next_char(numero) for numero in numeros]
+
+    @api.model
+    def _asignar_folios(self, vals_list, campo, codigo, default):
+        """Completa `campo` en los vals que no lo traen, con una sola reserva de folios"""
+        sin_folio = [vals for vals in vals_list if not vals.get(campo)]
+        if not sin_folio:
+            return vals_list
+        folios = self._reservar_folios(codigo, len(sin_folio))
+        for i, vals in enumerate(sin_folio):
+            vals[campo] = folios[i] if i < len(folios) else default
+        return vals_list
@@ -1,14 +1,112 @@
+import logging
+from datetime import timedelta
+
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError, UserError
+from odoo.tools import SQL, create_index
+from odoo.tools.sql import drop_index, make_index_name
+
+from .busqueda import asegurar_trigramas
+from .medicion import instrumentado
+
+_logger = logging.getLogger(__name__)
+
+# Niveles de autorización en orden. Agregar un nivel requiere sus columnas
+# (autorizador_nivelN_id, fecha_autorizacion_nivelN, comentario_nivelN), su
+# estado autorizacion_nivelN y su relación de autorizadores en el centro.
+NIVELES = ('nivel1', 'nivel2', 'nivel3')
+ESTADO_NIVEL = {f'autorizacion_{nivel}': nivel for nivel in NIVELES}
+
+# Campos que definen la celda (o el monto) de la solicitud en el cubo de gastos
+CAMPOS_CUBO = ('fecha_solicitud', 'centro_costo_id', 'categoria_id', 'concepto_texto', 'estado', 'monto_estimado')
+# Campos que definen el presupuesto (centro y mes) y el acumulado en el que cuenta la solicitud
+CAMPOS_PRESUPUESTO = ('fecha_solicitud', 'centro_costo_id', 'estado', 'monto_estimado')
+ACUMULADO_ESTADO = dict.fromkeys(ESTADO_NIVEL, 'reservado')
+ACUMULADO_ESTADO.update({'autorizado': 'comprometido', 'entregado': 'consumido'})
+
+# Tabla de transiciones de la solicitud: estados origen, destino (fijo o
+# calculado), guarda que devuelve el motivo de rechazo, valores a escribir
+# junto con el estado y mensaje de chatter. La aplica _transicionar().
+# 'toma': la transición respeta la solicitud tomada por otro usuario;
+# 'automatica': la aplica el sistema, espera los bloqueos e ignora las tomas.
+TRANSICIONES = {
+    'solicitar': {
+        'origen': ('borrador',),
+        'error_origen': 'Solo se pueden enviar solicitudes en borrador.',
+        'destino': f'autorizacion_{NIVELES[0]}',
+        'guarda': '_guarda_solicitar',
+        'mensaje': '_mensaje_solicitar',
+        'excepcion': ValidationError,
+    },
+    'autorizar': {
+        'origen': tuple(ESTADO_NIVEL),
+        'error_origen': 'Esta solicitud no está en autorización.',
+        'calcular_destino': '_destino_autorizar',
+        'guarda': '_guarda_autorizar',
+        'valores': '_valores_autorizacion',
+        'mensaje': '_mensaje_autorizar',
+        'toma': True,
+    },
+    'rechazar': {
+        'origen': tuple(ESTADO_NIVEL),
+        'error_origen': 'Esta solicitud no está en autorización.',
+        'destino': 'rechazado',
+        'guarda': '_guarda_autorizador',
+        'valores': '_valores_autorizacion',
+        'mensaje': '_mensaje_rechazar',
+        'toma': True,
+    },
+    'cancelar': {
+        'origen': ('borrador', *ESTADO_NIVEL, 'entregado'),
+        'error_origen': 'No puede cancelar una solicitud autorizada o rechazada.',
+        'destino': 'cancelado',
+        'mensaje': '_mensaje_cancelar',
+    },
+    'volver_borrador': {
+        'origen': ('rechazado', 'cancelado'),
+        'error_origen': 'Solo puede regresar a borrador solicitudes rechazadas o canceladas.',
+        'destino': 'borrador',
+        'valores': '_valores_borrador',
+        'mensaje': '_mensaje_volver_borrador',
+    },
+    'entregar': {
+        'origen': ('autorizado',),
+        'error_origen': 'Solo se puede entregar dinero a solicitudes autorizadas.',
+        'destino': 'entregado',
+        'valores': '_valores_entrega',
+        'mensaje': '_mensaje_entregar',
+        'toma': True,
+    },
+    # Automática: el centro bajó sus límites y el nivel en curso ya no es necesario
+    'reajustar': {
+        'origen': tuple(ESTADO_NIVEL),
+        'error_origen': 'Esta solicitud no está en autorización.',
+        'destino': 'autorizado',
+        'guarda': '_guarda_reajustar',
+        'mensaje': '_mensaje_reajustar',
+        'automatica': True,
+    },
+}
+
+# Estados en los que el nivel requerido todavía puede cambiar
+ESTADOS_ABIERTOS = ('borrador', *ESTADO_NIVEL)
+
+# Colas de trabajo de las que se toma la siguiente solicitud (ver _tomar_siguiente)
+COLAS_TOMA = {
+    'tesoreria': [('estado', '=', 'autorizado')],
+    'autorizacion': [('puedo_autorizar', '=', True)],
+}
+PARAMETRO_MINUTOS_TOMA = 'ctrl_caja_chica.minutos_toma'
+MINUTOS_TOMA_DEFAULT = 15
 
 class CtrlCajaSolicitud(models.Model):
     _name = 'ctrl.caja.solicitud'
     _description = 'Solicitud de Compra'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['ctrl.caja.secuencia.mixin', 'mail.thread', 'mail.activity.mixin']
     _order = 'fecha_solicitud desc, id desc'
     _rec_name = 'numero_solicitud'
 
-    numero_solicitud = fields.Char(string='Número de Solicitud', readonly=True, copy=False)
+    numero_solicitud = fields.Char(string='Número de Solicitud', readonly=True, copy=False, index=True)
     fecha_solicitud = fields.Date(string='Fecha de Solicitud', 
                                    default=fields.Date.context_today, 
                                    required=True,
@@ -24,10 +122,12 @@ class CtrlCajaSolicitud(models.Model):
     categoria_id = fields.Many2one('ctrl.caja.concepto',
                                    string='Concepto',
                                    domain=[('activo', '=', True)],
+                                   index='btree_not_null',
                                    tracking=True)
     concepto_otro = fields.Boolean(string='Concepto: Otros', default=False)
     concepto_texto = fields.Char(string='Especificar Concepto')
     
+    # Sin índice propio: lo cubre ctrl_caja_solicitud_centro_estado_idx (centro_costo_id, estado)
     centro_costo_id = fields.Many2one('ctrl.caja.centro.costo',
                                       string='Centro de Costos',
                                       domain=[('activo', '=', True)],
@@ -52,6 +152,7 @@ class CtrlCajaSolicitud(models.Model):
     proveedor_id = fields.Many2one('ctrl.caja.proveedor',
                                    string='Proveedor',
                                    domain=[('activo', '=', True)],
+                                   index='btree_not_null',
                                    tracking=True)
     proveedor_otro = fields.Boolean(string='Proveedor: Otros', default=False)
     proveedor_texto = fields.Char(string='Especificar Proveedor')
@@ -88,6 +189,8 @@ class CtrlCajaSolicitud(models.Model):
         compute='_compute_puedo_autorizar',
         search='_search_puedo_autorizar'
     )
+    bandeja_ids = fields.One2many('ctrl.caja.bandeja', 'solicitud_id', string='Bandeja de Autorización')
+    evento_ids = fields.One2many('ctrl.caja.solicitud.evento', 'solicitud_id', string='Bitácora')
     
     # Autorizaciones
     autorizador_nivel1_id = fields.Many2one('res.users', string='Autorizador Nivel 1', readonly=True)
@@ -109,8 +212,46 @@ class CtrlCajaSolicitud(models.Model):
     descripcion = fields.Text(string='Descripción / Justificación')
     notas_internas = fields.Text(string='Notas Internas')
     movimiento_id = fields.Many2one('ctrl.caja.chica', string='Movimiento de Caja', readonly=True)
-    
+    cfdi_uuid = fields.Char(string='UUID CFDI', readonly=True, copy=False,
+                            help='Folio fiscal de la factura XML asignada a la solicitud')
+    comprobante_ids = fields.Many2many('ctrl.caja.comprobante', 'ctrl_caja_solicitud_comprobante_rel',
+                                       'solicitud_id', 'comprobante_id', string='Comprobantes', copy=False)
+    
+    # Toma de la solicitud desde una cola de trabajo; vence sola en tomada_hasta
+    tomada_por_id = fields.Many2one('res.users', string='Tomada por', readonly=True, copy=False)
+    tomada_hasta = fields.Datetime(string='Tomada hasta', readonly=True, copy=False)
+    
+    _sql_constraints = [
+        ('cfdi_uuid_unique', 'unique(cfdi_uuid)', 'El CFDI ya está asignado a otra solicitud'),
+    ]
+    
+    def init(self):
+        cr = self.env.cr
+        en_autorizacion = ', '.join(f"'{estado}'" for estado in ESTADO_NIVEL)
+        # Orden por defecto de todas las listas
+        create_index(cr, 'ctrl_caja_solicitud_orden_idx', self._table,
+                     ['fecha_solicitud DESC', 'id DESC'])
+        create_index(cr, 'ctrl_caja_solicitud_centro_estado_idx', self._table,
+                     ['centro_costo_id', 'estado'])
+        drop_index(cr, make_index_name(self._table, 'centro_costo_id'), self._table)
+        # Parciales sobre estados abiertos: se mantienen pequeños aunque crezca el histórico
+        create_index(cr, 'ctrl_caja_solicitud_en_autorizacion_idx', self._table,
+                     ['centro_costo_id', 'fecha_solicitud DESC', 'id DESC'],
+                     where=f"estado IN ({en_autorizacion})")
+        create_index(cr, 'ctrl_caja_solicitud_autorizado_idx', self._table,
+                     ['fecha_solicitud DESC', 'id DESC'],
+                     where="estado = 'autorizado'")
+        # Textos libres de "Otros": búsqueda por contenido y consolidación (ctrl.caja.consolidacion)
+        if asegurar_trigramas(cr):
+            for campo in ('concepto_texto', 'proveedor_texto'):
+                create_index(cr, f'ctrl_caja_solicitud_{campo}_trgm_idx', self._table,
+                             [f'{campo} gin_trgm_ops'], method='gin', where=f'{campo} IS NOT NULL')
+    
+    # No depende de los límites del centro a propósito: al cambiarlos el centro
+    # encola un recálculo por lotes (ctrl.caja.recalculo) en lugar de recalcular
+    # todas sus solicitudes dentro del guardado
     @api.depends('monto_estimado', 'centro_costo_id')
+    @instrumentado
     def _compute_nivel_requerido(self):
         """Determina el nivel según el centro de costo"""
         for rec in self:
@@ -119,79 +260,31 @@ class CtrlCajaSolicitud(models.Model):
             else:
                 rec.nivel_requerido = 'nivel1'
     
-    @api.depends('nivel_requerido', 'centro_costo_id')
+    @api.depends('nivel_requerido', 'centro_costo_id.texto_nivel1',
+                 'centro_costo_id.texto_nivel2', 'centro_costo_id.texto_nivel3')
+    @instrumentado
     def _compute_nivel_requerido_texto(self):
-        """Muestra el rango de montos para el nivel según el centro"""
+        """Etiqueta del rango del nivel, leída de las precalculadas en el centro"""
         for rec in self:
             if rec.centro_costo_id and rec.nivel_requerido:
-                rec.nivel_requerido_texto = rec.centro_costo_id.get_rango_nivel(rec.nivel_requerido)
+                rec.nivel_requerido_texto = rec.centro_costo_id[f'texto_{rec.nivel_requerido}']
             else:
                 rec.nivel_requerido_texto = 'Sin definir'
     
     @api.depends('estado', 'centro_costo_id')
+    @api.depends_context('uid')
+    @instrumentado
     def _compute_puedo_autorizar(self):
         """Determina si el usuario actual puede autorizar esta solicitud"""
+        mapa = self.env['ctrl.caja.centro.costo']._mapa_autorizadores()
+        user_id = self.env.user.id
         for rec in self:
-            rec.puedo_autorizar = False
-            
-            if not rec.centro_costo_id:
-                continue
-            
-            user_id = self.env.user.id
-            
-            # Verificar según el estado actual
-            if rec.estado == 'autorizacion_nivel1':
-                rec.puedo_autorizar = rec.centro_costo_id.puede_autorizar(user_id, 'nivel1')
-            elif rec.estado == 'autorizacion_nivel2':
-                rec.puedo_autorizar = rec.centro_costo_id.puede_autorizar(user_id, 'nivel2')
-            elif rec.estado == 'autorizacion_nivel3':
-                rec.puedo_autorizar = rec.centro_costo_id.puede_autorizar(user_id, 'nivel3')
+            nivel = ESTADO_NIVEL.get(rec.estado)
+            rec.puedo_autorizar = bool(nivel) and user_id in mapa.get((rec.centro_costo_id.id, nivel), frozenset())
     
     def _search_puedo_autorizar(self, operator, value):
-        """Permite buscar solicitudes que el usuario puede autorizar"""
-        user_id = self.env.user.id
-        
-        # Buscar todos los centros donde el usuario es autorizador
-        centros = self.env['ctrl.caja.centro.costo'].search([
-            '|', '|',
-            ('autorizador_nivel1_ids', 'in', [user_id]),
-            ('autorizador_nivel2_ids', 'in', [user_id]),
-            ('autorizador_nivel3_ids', 'in', [user_id])
-        ])
-        
-        if not centros:
-            return [('id', '=', False)]
-        
-        # Construir dominio complejo
-        domain = ['|', '|']
-        
-        # N1: centros donde soy autorizador N1 Y estado es autorizacion_nivel1
-        centros_n1 = centros.filtered(lambda c: user_id in c.autorizador_nivel1_ids.ids)
-        if centros_n1:
-            domain.append('&')
-            domain.append(('centro_costo_id', 'in', centros_n1.ids))
-            domain.append(('estado', '=', 'autorizacion_nivel1'))
-        else:
-            domain.append(('id', '=', False))
-        
-        # N2: centros donde soy autorizador N2 Y estado es autorizacion_nivel2
-        centros_n2 = centros.filtered(lambda c: user_id in c.autorizador_nivel2_ids.ids)
-        if centros_n2:
-            domain.append('&')
-            domain.append(('centro_costo_id', 'in', centros_n2.ids))
-            domain.append(('estado', '=', 'autorizacion_nivel2'))
-        else:
-            domain.append(('id', '=', False))
-        
-        # N3: centros donde soy autorizador N3 Y estado es autorizacion_nivel3
-        centros_n3 = centros.filtered(lambda c: user_id in c.autorizador_nivel3_ids.ids)
-        if centros_n3:
-            domain.append('&')
-            domain.append(('centro_costo_id', 'in', centros_n3.ids))
-            domain.append(('estado', '=', 'autorizacion_nivel3'))
-        else:
-            domain.append(('id', '=', False))
-        
+        """Permite buscar solicitudes que el usuario puede autorizar (vía bandeja materializada)"""
+        domain = [('bandeja_ids.user_id', '=', self.env.user.id)]
         if operator == '=' and value:
             return domain
         else:
@@ -211,192 +304,442 @@ class CtrlCajaSolicitud(models.Model):
         else:
             self.proveedor_texto = False
     
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._asignar_folios(vals_list, 'numero_solicitud', 'ctrl.caja.solicitud', 'New')
+        records = super().create(vals_list)
+        abiertas = records.filtered(lambda r: r.estado != 'borrador')
+        if abiertas:
+            self.env['ctrl.caja.bandeja']._actualizar_solicitudes(abiertas)
+        self.env['ctrl.caja.cubo'].sudo()._aplicar(records._filas_cubo())
+        self.env['ctrl.caja.presupuesto'].sudo()._aplicar(records._filas_presupuesto())
+        return records
+    
+    @instrumentado
+    def write(self, vals):
+        cubo = any(campo in vals for campo in CAMPOS_CUBO)
+        presupuesto = any(campo in vals for campo in CAMPOS_PRESUPUESTO)
+        antes = self._filas_cubo() if cubo else None
+        antes_presupuesto = self._filas_presupuesto() if presupuesto else None
+        res = super().write(vals)
+        if 'estado' in vals or 'centro_costo_id' in vals:
+            self.env['ctrl.caja.bandeja']._actualizar_solicitudes(self)
+        if cubo:
+            self.env['ctrl.caja.cubo'].sudo()._actualizar(antes, self._filas_cubo())
+        if presupuesto:
+            self.env['ctrl.caja.presupuesto'].sudo()._actualizar(antes_presupuesto, self._filas_presupuesto())
+        return res
+    
+    def unlink(self):
+        # Al archivar, la solicitud sigue contando en el cubo y en el presupuesto desde la tabla de archivo
+        if not self.env.context.get('ctrl_caja_archivando'):
+            self.env['ctrl.caja.cubo'].sudo()._aplicar(self._filas_cubo(), -1)
+            self.env['ctrl.caja.presupuesto'].sudo()._aplicar(self._filas_presupuesto(), -1)
+        return super().unlink()
+    
+    def _filas_cubo(self):
+        """Celda y monto que aporta cada solicitud al cubo de gastos (ver DIMENSIONES del cubo)"""
+        filas = []
+        for rec in self:
+            fecha = rec.fecha_solicitud or fields.Date.context_today(rec)
+            celda = (
+                'solicitud', fecha.year, str(fecha.month), fecha.isocalendar()[1],
+                rec.centro_costo_id.id or None, None,
+                rec.categoria_id.id or None,
+                None if rec.categoria_id else (rec.concepto_texto or None),
+                None, rec.estado or None,
+            )
+            filas.append((celda, rec.monto_estimado))
+        return filas
+    
+    def _filas_presupuesto(self):
+        """Presupuesto (centro, mes), acumulado y monto en los que cuenta cada solicitud"""
+        return [
+            ((rec.centro_costo_id.id, rec.fecha_solicitud.replace(day=1)),
+             ACUMULADO_ESTADO[rec.estado], rec.monto_estimado)
+            for rec in self
+            if rec.estado in ACUMULADO_ESTADO and rec.centro_costo_id and rec.fecha_solicitud
+        ]
+    
+    # ============ PLAN DE ÍNDICES ============
+    
     @api.model
-    def create(self, vals):
-        if not vals.get('numero_solicitud'):
-            vals['numero_solicitud'] = self.env['ir.sequence'].next_by_code('ctrl.caja.solicitud') or 'New'
-        return super().create(vals)
+    def _consultas_criticas(self):
+        """Consultas de las rutas críticas: (nombre, dominio, orden, índice que debe usar).
+        Las búsquedas por concepto y proveedor van sin orden: lo que se verifica es el
+        filtro, no el recorrido de la llave primaria.
+        """
+        centro = self.env['ctrl.caja.centro.costo'].sudo().search([], limit=1).id or 0
+        concepto = self.env['ctrl.caja.concepto'].sudo().search([], limit=1).id or 0
+        proveedor = self.env['ctrl.caja.proveedor'].sudo().search([], limit=1).id or 0
+        return [
+            ('listado', [], self._order, 'ctrl_caja_solicitud_orden_idx'),
+            ('bandeja', [('centro_costo_id', '=', centro), ('estado', 'in', list(ESTADO_NIVEL))], self._order,
+             'ctrl_caja_solicitud_en_autorizacion_idx'),
+            ('centro_estado', [('centro_costo_id', '=', centro), ('estado', '=', 'entregado')], None,
+             'ctrl_caja_solicitud_centro_estado_idx'),
+            ('tesoreria', [('estado', '=', 'autorizado')], self._order, 'ctrl_caja_solicitud_autorizado_idx'),
+            ('concepto', [('categoria_id', '=', concepto)], None, make_index_name(self._table, 'categoria_id')),
+            ('proveedor', [('proveedor_id', '=', proveedor)], None, make_index_name(self._table, 'proveedor_id')),
+        ]
     
-    def action_solicitar(self):
-        """Envía la solicitud para autorización"""
+    @api.model
+    def _verificar_plan_indices(self, limite=80):
+        """Verifica con EXPLAIN que cada consulta crítica use el índice que le corresponde.
+        
+        Se deshabilita el seq scan para que el resultado no dependa del volumen
+        de la base; como entonces el planificador siempre elige algún índice (la
+        llave primaria con un filtro, por ejemplo), se exige el índice esperado y
+        no cualquiera. Lanza UserError con las consultas que regresaron; retorna
+        {nombre: índices usados}.
+        """
+        Solicitud = self.sudo()
+        usados = {}
+        faltantes = []
+        cr = self.env.cr
+        cr.execute("SET enable_seqscan = off")
+        try:
+            for nombre, domain, orden, indice in self._consultas_criticas():
+                query = Solicitud._search(domain, order=orden, limit=limite)
+                if orden is None:
+                    query.order = None
+                cr.execute(SQL("EXPLAIN (FORMAT JSON) %s", query.select()))
+                plan = cr.fetchone()[0][0]['Plan']
+                usados[nombre] = self._indices_del_plan(plan)
+                _logger.info('Plan de la consulta %s: índices %s', nombre, usados[nombre] or 'ninguno')
+                if indice not in usados[nombre]:
+                    faltantes.append(f'{nombre} (esperado {indice})')
+        finally:
+            cr.execute("RESET enable_seqscan")
+        if faltantes:
+            raise UserError('Consultas sin su índice en ctrl_caja_solicitud: %s' % ', '.join(faltantes))
+        return usados
+    
+    @api.model
+    def _indices_del_plan(self, nodo):
+        """Índices que aparecen en un nodo del plan y sus hijos"""
+        indices = set()
+        if nodo.get('Index Name'):
+            indices.add(nodo['Index Name'])
+        for hijo in nodo.get('Plans', []):
+            indices |= self._indices_del_plan(hijo)
+        return indices
+    
+    # ============ MÁQUINA DE ESTADOS ============
+    
+    def _preparar_transicion(self, accion, **datos):
+        """Valida la transición declarada en TRANSICIONES para cada solicitud.
+
+        Retorna (grupos, mensajes, errores): grupos agrupa los ids por
+        (estado destino, valores a escribir), mensajes contiene el cuerpo del
+        chatter por id y errores el motivo por el que cada solicitud no aplica.
+        """
+        transicion = TRANSICIONES[accion]
+        contexto = {
+            'mapa': self.env['ctrl.caja.centro.costo']._mapa_autorizadores(),
+            'ahora': fields.Datetime.now(),
+        }
+        grupos = {}
+        mensajes = {}
+        errores = {}
+        for rec in self:
+            if rec.estado not in transicion['origen']:
+                errores[rec] = transicion['error_origen']
+                continue
+            error = transicion.get('guarda') and getattr(rec, transicion['guarda'])(contexto, **datos)
+            if error:
+                errores[rec] = error
+                continue
+            if transicion.get('calcular_destino'):
+                destino = getattr(rec, transicion['calcular_destino'])(**datos)
+            else:
+                destino = transicion['destino']
+            valores = getattr(rec, transicion['valores'])(contexto, **datos) if transicion.get('valores') else {}
+            clave = (destino, tuple(sorted(valores.items())))
+            grupos.setdefault(clave, []).append(rec.id)
+            mensajes[rec.id] = getattr(rec, transicion['mensaje'])(destino, **datos)
+        return grupos, mensajes, errores
+    
+    @instrumentado
+    def _transicionar(self, accion, **datos):
+        """Aplica una transición a todo el recordset.
+
+        Cada grupo con el mismo estado destino y los mismos valores se escribe
+        con un único write (estado incluido); los mensajes del chatter se
+        encolan en ctrl.caja.cola y los publica el cron fuera de la petición
+        del usuario. Retorna (procesadas, errores).
+        """
+        errores_bloqueo = self._bloquear(accion)
+        disponibles = self - self.browse([rec.id for rec in errores_bloqueo])
+        grupos, mensajes, errores = disponibles._preparar_transicion(accion, **datos)
+        errores.update(errores_bloqueo)
+        eventos = []
+        for (destino, valores), ids in grupos.items():
+            registros = self.browse(ids)
+            eventos += [rec._valores_evento(accion, destino, **datos) for rec in registros]
+            # Con tracking: el chatter conserva "Estado: X → Y"; el mensaje encolado solo
+            # agrega el detalle. Al cambiar de estado la solicitud sale de la cola: se libera la toma.
+            registros.write(dict(valores, estado=destino, tomada_por_id=False, tomada_hasta=False))
+        if eventos:
+            self.env['ctrl.caja.solicitud.evento']._registrar(eventos)
+        procesadas = self.browse(list(mensajes))
+        if procesadas:
+            self.env['ctrl.caja.cola']._encolar_chatter(self._name, mensajes)
+            procesadas._despues_transicion(accion, **datos)
+        return procesadas, errores
+    
+    def _bloquear(self, accion):
+        """Bloquea las filas antes de aplicar la transición.
+
+        Con FOR UPDATE SKIP LOCKED una solicitud que otra transacción está
+        procesando (dos clics simultáneos en Entregar) falla en el acto en vez
+        de esperar; si la otra ya terminó, REPEATABLE READ hace reintentar la
+        petición y la guarda de estado la rechaza: nunca se aplica dos veces.
+        Retorna {solicitud: motivo} de las que no se pueden procesar.
+        """
+        if not self.ids:
+            return {}
+        transicion = TRANSICIONES[accion]
+        if transicion.get('automatica'):
+            self.env.cr.execute(
+                "SELECT id FROM ctrl_caja_solicitud WHERE id IN %s ORDER BY id FOR UPDATE",
+                [tuple(self.ids)])
+            return {}
+        self.env.cr.execute(
+            "SELECT id FROM ctrl_caja_solicitud WHERE id IN %s ORDER BY id FOR UPDATE SKIP LOCKED",
+            [tuple(self.ids)])
+        bloqueadas = {fila[0] for fila in self.env.cr.fetchall()}
+        ahora = fields.Datetime.now()
+        errores = {}
+        for rec in self:
+            if rec.id not in bloqueadas:
+                errores[rec] = 'Otro usuario está procesando esta solicitud en este momento.'
+            elif (transicion.get('toma') and rec.tomada_por_id and rec.tomada_por_id != self.env.user
+                    and rec.tomada_hasta and rec.tomada_hasta > ahora):
+                hasta = fields.Datetime.context_timestamp(rec, rec.tomada_hasta)
+                errores[rec] = f'La solicitud está tomada por {rec.tomada_por_id.name} hasta las {hasta:%H:%M}.'
+        return errores
+    
+    def _transicionar_uno(self, accion, **datos):
+        """Aplica una transición a una sola solicitud, lanzando el error si no procede"""
         self.ensure_one()
-        
+        procesadas, errores = self._transicionar(accion, **datos)
+        if errores:
+            raise TRANSICIONES[accion].get('excepcion', UserError)(errores[self])
+        return procesadas
+    
+    def _verificar_transicion(self, accion, **datos):
+        """Valida una transición sin aplicarla (p. ej. antes de abrir el wizard de rechazo)"""
+        self.ensure_one()
+        errores = self._preparar_transicion(accion, **datos)[2]
+        if errores:
+            raise TRANSICIONES[accion].get('excepcion', UserError)(errores[self])
+    
+    def _valores_evento(self, accion, destino, comentario=None, **datos):
+        """Fila de la bitácora de autorizaciones para esta transición (antes de escribir el estado)"""
+        return {
+            'solicitud_id': self.id,
+            'numero_solicitud': self.numero_solicitud,
+            'centro_costo_id': self.centro_costo_id.id,
+            'nivel': ESTADO_NIVEL.get(self.estado),
+            'user_id': self.env.user.id,
+            'accion': accion,
+            'estado_origen': self.estado,
+            'estado_destino': destino,
+            'fecha': fields.Datetime.now(),
+            'comentario': comentario,
+            'monto': self.monto_estimado,
+        }
+    
+    def _despues_transicion(self, accion, **datos):
+        """Punto de extensión para efectos secundarios tras aplicar una transición"""
+        return True
+    
+    # ---- Guardas ----
+    
+    def _guarda_solicitar(self, contexto, **datos):
         if not self.categoria_id and not self.concepto_texto:
-            raise ValidationError('Debe especificar un concepto.')
-        
+            return 'Debe especificar un concepto.'
         if not self.proveedor_id and not self.proveedor_texto:
-            raise ValidationError('Debe especificar un proveedor.')
-        
+            return 'Debe especificar un proveedor.'
         if not self.centro_costo_id:
-            raise ValidationError('Debe especificar un centro de costo.')
-        
+            return 'Debe especificar un centro de costo.'
         if self.monto_estimado <= 0:
-            raise ValidationError('El costo estimado debe ser mayor a cero.')
-        
-        if not self.centro_costo_id.autorizador_nivel1_ids:
-            raise ValidationError(
+            return 'El costo estimado debe ser mayor a cero.'
+        if not contexto['mapa'].get((self.centro_costo_id.id, NIVELES[0])):
+            return (
                 f'El centro de costo "{self.centro_costo_id.name}" no tiene autorizadores configurados. '
                 'Por favor contacte al administrador.'
             )
-        
-        self.estado = 'autorizacion_nivel1'
-        
-        self.message_post(
-            body=f'📋 Solicitud enviada para autorización<br/>'
-                 f'Centro de Costo: {self.centro_costo_id.name}<br/>'
-                 f'Monto: ${self.monto_estimado:,.2f}<br/>'
-                 f'Nivel requerido: {self.nivel_requerido_texto}<br/>'
-                 f'Autorizadores disponibles: {", ".join(self.centro_costo_id.autorizador_nivel1_ids.mapped("name"))}',
-            message_type='notification'
-        )
-    
-    def _verificar_permiso_autorizacion(self, nivel):
-        """Verifica si el usuario actual puede autorizar en este nivel y centro"""
-        self.ensure_one()
-        
+        return self.env['ctrl.caja.presupuesto'].sudo()._verificar(
+            contexto, self, TRANSICIONES['solicitar']['destino'])
+    
+    def _guarda_autorizador(self, contexto, nivel=None, **datos):
+        """Verifica que la solicitud esté en el nivel indicado y que el usuario pueda autorizarlo"""
+        nivel_actual = ESTADO_NIVEL[self.estado]
+        if nivel and nivel != nivel_actual:
+            return f'Esta solicitud no está en autorización Nivel {nivel[-1]}.'
         if not self.centro_costo_id:
-            raise UserError('Esta solicitud no tiene un centro de costo asignado.')
-        
-        puede_autorizar = self.centro_costo_id.puede_autorizar(self.env.user.id, nivel)
-        
-        if not puede_autorizar:
-            autorizadores = getattr(self.centro_costo_id, f'autorizador_{nivel}_ids')
-            raise UserError(
-                f'No tiene permisos para autorizar solicitudes de {nivel.upper()} '
+            return 'Esta solicitud no tiene un centro de costo asignado.'
+        if self.env.user.id not in contexto['mapa'].get((self.centro_costo_id.id, nivel_actual), frozenset()):
+            autorizadores = self.centro_costo_id[f'autorizador_{nivel_actual}_ids']
+            return (
+                f'No tiene permisos para autorizar solicitudes de {nivel_actual.upper()} '
                 f'del centro de costo "{self.centro_costo_id.name}".\n\n'
                 f'Autorizadores autorizados: {", ".join(autorizadores.mapped("name"))}'
             )
     
-    def action_autorizar_nivel1(self):
-        """Autoriza nivel 1"""
-        self.ensure_one()
-        
-        if self.estado != 'autorizacion_nivel1':
-            raise UserError('Esta solicitud no está en autorización Nivel 1.')
-        
-        self._verificar_permiso_autorizacion('nivel1')
-        
-        self.write({
-            'autorizador_nivel1_id': self.env.user.id,
-            'fecha_autorizacion_nivel1': fields.Datetime.now(),
-        })
-        
-        if self.nivel_requerido == 'nivel1':
-            self.estado = 'autorizado'
-            mensaje = f'✅ Solicitud AUTORIZADA por {self.env.user.name} (Nivel 1 - Autorización completa)'
-        else:
-            self.estado = 'autorizacion_nivel2'
-            autorizadores = ", ".join(self.centro_costo_id.autorizador_nivel2_ids.mapped("name"))
-            mensaje = f'✅ Autorizado por {self.env.user.name} (Nivel 1)<br/>Pasa a Nivel 2<br/>Autorizadores: {autorizadores}'
-        
-        self.message_post(body=mensaje, message_type='notification')
-        
+    def _guarda_autorizar(self, contexto, nivel=None, **datos):
+        error = self._guarda_autorizador(contexto, nivel=nivel)
+        if error:
+            return error
+        previos = NIVELES[:NIVELES.index(ESTADO_NIVEL[self.estado])]
+        if any(not self[f'autorizador_{previo}_id'] for previo in previos):
+            return f'Debe ser autorizada primero por {" y ".join(p.replace("nivel", "Nivel ") for p in previos)}.'
+        return self.env['ctrl.caja.presupuesto'].sudo()._verificar(
+            contexto, self, self._destino_autorizar(nivel=nivel))
+    
+    def _guarda_reajustar(self, contexto, **datos):
+        if NIVELES.index(ESTADO_NIVEL[self.estado]) <= NIVELES.index(self.nivel_requerido):
+            return 'El nivel en curso sigue siendo requerido.'
+        # Como cualquier otro camino a autorizado: sin presupuesto se queda en su nivel
+        return self.env['ctrl.caja.presupuesto'].sudo()._verificar(
+            contexto, self, TRANSICIONES['reajustar']['destino'])
+    
+    # ---- Destinos y valores ----
+    
+    def _destino_autorizar(self, **datos):
+        """Pasa al siguiente nivel o queda autorizada si ya se cubrió el nivel requerido"""
+        nivel = ESTADO_NIVEL[self.estado]
+        if self.nivel_requerido == nivel or nivel == NIVELES[-1]:
+            return 'autorizado'
+        return f'autorizacion_{NIVELES[NIVELES.index(nivel) + 1]}'
+    
+    def _valores_autorizacion(self, contexto, comentario=None, **datos):
+        nivel = ESTADO_NIVEL[self.estado]
+        valores = {
+            f'autorizador_{nivel}_id': self.env.user.id,
+            f'fecha_autorizacion_{nivel}': contexto['ahora'],
+        }
+        if comentario is not None:
+            valores[f'comentario_{nivel}'] = comentario
+        return valores
+    
+    def _valores_borrador(self, contexto, **datos):
+        valores = {}
+        for nivel in NIVELES:
+            valores.update({
+                f'autorizador_{nivel}_id': False,
+                f'fecha_autorizacion_{nivel}': False,
+                f'comentario_{nivel}': False,
+            })
+        return valores
+    
+    def _valores_entrega(self, contexto, **datos):
+        return {
+            'tesorero_id': self.env.user.id,
+            'fecha_entrega': contexto['ahora'],
+        }
+    
+    # ---- Mensajes de chatter ----
+    
+    # Registros breves: los autorizadores se enteran por el resumen periódico de su bandeja
+    def _mensaje_solicitar(self, destino, **datos):
+        return f'📋 Enviada a autorización: {self.nivel_requerido_texto}'
+    
+    def _mensaje_autorizar(self, destino, **datos):
+        nivel = ESTADO_NIVEL[self.estado]
+        etiqueta = nivel.replace('nivel', 'Nivel ')
+        if destino == 'autorizado':
+            return f'✅ Solicitud AUTORIZADA por {self.env.user.name} ({etiqueta} - Autorización completa)'
+        siguiente = ESTADO_NIVEL[destino].replace('nivel', 'Nivel ')
+        return f'✅ Autorizado por {self.env.user.name} ({etiqueta}), pasa a {siguiente}'
+    
+    def _mensaje_rechazar(self, destino, comentario=None, **datos):
+        return (
+            f'❌ Solicitud RECHAZADA por {self.env.user.name} ({ESTADO_NIVEL[self.estado].upper()})'
+            f'<br/>Motivo: {comentario}'
+        )
+    
+    def _mensaje_cancelar(self, destino, **datos):
+        return 'Solicitud cancelada.'
+    
+    def _mensaje_volver_borrador(self, destino, **datos):
+        return 'Solicitud regresada a borrador.'
+    
+    def _mensaje_entregar(self, destino, **datos):
+        return f'💰 Dinero ENTREGADO por {self.env.user.name}'
+    
+    def _mensaje_reajustar(self, destino, **datos):
+        return (
+            f'🔁 Solicitud AUTORIZADA por cambio de límites del centro de costo<br/>'
+            f'Nivel requerido: {self.nivel_requerido_texto}'
+        )
+    
+    def _recalcular_nivel(self):
+        """Recalcula nivel_requerido con los límites actuales del centro y autoriza las
+        solicitudes cuyo nivel en curso ya no es necesario; las que no caben en el
+        presupuesto del centro siguen en su nivel. Retorna las reajustadas.
+        """
+        self.env.add_to_compute(self._fields['nivel_requerido'], self)
+        self.flush_recordset(['nivel_requerido'])
+        en_autorizacion = self.filtered(lambda r: r.estado in ESTADO_NIVEL)
+        return en_autorizacion._transicionar('reajustar')[0]
+    
+    # ============ ACCIONES ============
+    
+    def _notificacion(self, titulo, mensaje):
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
-                'title': '✅ Autorizado',
-                'message': 'Solicitud autorizada exitosamente',
+                'title': titulo,
+                'message': mensaje,
                 'type': 'success',
                 'sticky': False,
                 'next': {'type': 'ir.actions.act_window_close'},
             }
         }
     
+    @instrumentado
+    def action_solicitar(self):
+        """Envía la solicitud para autorización"""
+        self._transicionar_uno('solicitar')
+    
+    def _accion_autorizar(self, nivel):
+        self._transicionar_uno('autorizar', nivel=nivel)
+        return self._notificacion('✅ Autorizado', 'Solicitud autorizada exitosamente')
+    
+    def _accion_rechazar(self, nivel):
+        self._verificar_transicion('rechazar', nivel=nivel)
+        return self._wizard_rechazo(nivel)
+    
+    @instrumentado
+    def action_autorizar_nivel1(self):
+        """Autoriza nivel 1"""
+        return self._accion_autorizar('nivel1')
+    
+    @instrumentado
     def action_rechazar_nivel1(self):
-        self.ensure_one()
-        if self.estado != 'autorizacion_nivel1':
-            raise UserError('Esta solicitud no está en autorización Nivel 1.')
-        self._verificar_permiso_autorizacion('nivel1')
-        return self._wizard_rechazo('nivel1')
+        return self._accion_rechazar('nivel1')
     
+    @instrumentado
     def action_autorizar_nivel2(self):
         """Autoriza nivel 2"""
-        self.ensure_one()
-        
-        if self.estado != 'autorizacion_nivel2':
-            raise UserError('Esta solicitud no está en autorización Nivel 2.')
-        
-        if not self.autorizador_nivel1_id:
-            raise UserError('Debe ser autorizada primero por Nivel 1.')
-        
-        self._verificar_permiso_autorizacion('nivel2')
-        
-        self.write({
-            'autorizador_nivel2_id': self.env.user.id,
-            'fecha_autorizacion_nivel2': fields.Datetime.now(),
-        })
-        
-        if self.nivel_requerido == 'nivel2':
-            self.estado = 'autorizado'
-            mensaje = f'✅ Solicitud AUTORIZADA por {self.env.user.name} (Nivel 2 - Autorización completa)'
-        else:
-            self.estado = 'autorizacion_nivel3'
-            autorizadores = ", ".join(self.centro_costo_id.autorizador_nivel3_ids.mapped("name"))
-            mensaje = f'✅ Autorizado por {self.env.user.name} (Nivel 2)<br/>Pasa a Nivel 3<br/>Autorizadores: {autorizadores}'
-        
-        self.message_post(body=mensaje, message_type='notification')
-        
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': '✅ Autorizado',
-                'message': 'Solicitud autorizada exitosamente',
-                'type': 'success',
-                'sticky': False,
-                'next': {'type': 'ir.actions.act_window_close'},
-            }
-        }
+        return self._accion_autorizar('nivel2')
     
+    @instrumentado
     def action_rechazar_nivel2(self):
-        self.ensure_one()
-        if self.estado != 'autorizacion_nivel2':
-            raise UserError('Esta solicitud no está en autorización Nivel 2.')
-        self._verificar_permiso_autorizacion('nivel2')
-        return self._wizard_rechazo('nivel2')
+        return self._accion_rechazar('nivel2')
     
+    @instrumentado
     def action_autorizar_nivel3(self):
         """Autoriza nivel 3 - autorización final"""
-        self.ensure_one()
-        
-        if self.estado != 'autorizacion_nivel3':
-            raise UserError('Esta solicitud no está en autorización Nivel 3.')
-        
-        if not self.autorizador_nivel1_id or not self.autorizador_nivel2_id:
-            raise UserError('Debe ser autorizada primero por Nivel 1 y 2.')
-        
-        self._verificar_permiso_autorizacion('nivel3')
-        
-        self.write({
-            'autorizador_nivel3_id': self.env.user.id,
-            'fecha_autorizacion_nivel3': fields.Datetime.now(),
-            'estado': 'autorizado',
-        })
-        
-        self.message_post(
-            body=f'✅ Solicitud AUTORIZADA por {self.env.user.name} (Nivel 3 - Autorización completa)',
-            message_type='notification'
-        )
-        
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': '✅ Autorizado',
-                'message': 'Solicitud autorizada exitosamente',
-                'type': 'success',
-                'sticky': False,
-                'next': {'type': 'ir.actions.act_window_close'},
-            }
-        }
+        return self._accion_autorizar('nivel3')
     
+    @instrumentado
     def action_rechazar_nivel3(self):
-        self.ensure_one()
-        if self.estado != 'autorizacion_nivel3':
-            raise UserError('Esta solicitud no está en autorización Nivel 3.')
-        self._verificar_permiso_autorizacion('nivel3')
-        return self._wizard_rechazo('nivel3')
+        return self._accion_rechazar('nivel3')
     
     def _wizard_rechazo(self, nivel):
         return {
@@ -411,86 +754,150 @@ class CtrlCajaSolicitud(models.Model):
             }
         }
     
+    @instrumentado
     def procesar_rechazo(self, nivel, comentario):
-        self.ensure_one()
-        
-        if nivel == 'nivel1':
-            self.write({
-                'autorizador_nivel1_id': self.env.user.id,
-                'fecha_autorizacion_nivel1': fields.Datetime.now(),
-                'comentario_nivel1': comentario,
-            })
-        elif nivel == 'nivel2':
-            self.write({
-                'autorizador_nivel2_id': self.env.user.id,
-                'fecha_autorizacion_nivel2': fields.Datetime.now(),
-                'comentario_nivel2': comentario,
-            })
-        elif nivel == 'nivel3':
-            self.write({
-                'autorizador_nivel3_id': self.env.user.id,
-                'fecha_autorizacion_nivel3': fields.Datetime.now(),
-                'comentario_nivel3': comentario,
-            })
-        
-        self.estado = 'rechazado'
-        self.message_post(
-            body=f'❌ Solicitud RECHAZADA por {self.env.user.name} ({nivel.upper()})<br/>Motivo: {comentario}',
-            message_type='notification'
-        )
+        self._transicionar_uno('rechazar', nivel=nivel, comentario=comentario)
     
+    @instrumentado
     def action_cancelar(self):
-        self.ensure_one()
-        if self.estado in ['autorizado', 'rechazado']:
-            raise UserError('No puede cancelar una solicitud autorizada o rechazada.')
-        self.estado = 'cancelado'
-        self.message_post(body='Solicitud cancelada.', message_type='notification')
+        self._transicionar_uno('cancelar')
     
+    @instrumentado
     def action_volver_borrador(self):
-        self.ensure_one()
-        if self.estado not in ['rechazado', 'cancelado']:
-            raise UserError('Solo puede regresar a borrador solicitudes rechazadas o canceladas.')
-        
-        self.estado = 'borrador'
-        self.autorizador_nivel1_id = False
-        self.fecha_autorizacion_nivel1 = False
-        self.autorizador_nivel2_id = False
-        self.fecha_autorizacion_nivel2 = False
-        self.autorizador_nivel3_id = False
-        self.fecha_autorizacion_nivel3 = False
-        self.comentario_nivel1 = False
-        self.comentario_nivel2 = False
-        self.comentario_nivel3 = False
-        self.message_post(body='Solicitud regresada a borrador.', message_type='notification')
+        self._transicionar_uno('volver_borrador')
     
+    @instrumentado
     def action_entregar_dinero(self):
-        self.ensure_one()
-        if self.estado != 'autorizado':
-            raise UserError('Solo se puede entregar dinero a solicitudes autorizadas.')
-        
-        self.write({
-            'tesorero_id': self.env.user.id,
-            'fecha_entrega': fields.Datetime.now(),
-            'estado': 'entregado',
+        self._transicionar_uno('entregar')
+        return self._notificacion('💰 Entregado', 'Dinero entregado exitosamente')
+    
+    # ============ COLAS DE TRABAJO ============
+    
+    @api.model
+    def _tomar_siguiente(self, cola):
+        """Toma la siguiente solicitud de la cola para el usuario actual.
+
+        Primero la que ya tenía tomada, luego la más antigua libre o con la toma
+        vencida. FOR UPDATE SKIP LOCKED hace que dos usuarios que piden la siguiente
+        al mismo tiempo reciban solicitudes distintas sin esperarse.
+        """
+        ahora = fields.Datetime.now()
+        minutos = int(self.env['ir.config_parameter'].sudo().get_param(PARAMETRO_MINUTOS_TOMA)
+                      or MINUTOS_TOMA_DEFAULT)
+        dominio = COLAS_TOMA[cola] + [
+            '|', '|', ('tomada_hasta', '=', False), ('tomada_hasta', '<', ahora),
+            ('tomada_por_id', '=', self.env.uid),
+        ]
+        query = self._search(dominio, limit=1, order='fecha_solicitud, id')
+        query.order = SQL("(%s = %s) DESC NULLS LAST, %s",
+                          SQL.identifier(self._table, 'tomada_por_id'), self.env.uid, query.order)
+        self.env.cr.execute(SQL("%s FOR UPDATE OF %s SKIP LOCKED", query.select(), SQL.identifier(self._table)))
+        fila = self.env.cr.fetchone()
+        if not fila:
+            return self.browse()
+        solicitud = self.browse(fila[0])
+        solicitud.write({
+            'tomada_por_id': self.env.uid,
+            'tomada_hasta': ahora + timedelta(minutes=minutos),
         })
-        
-        self.message_post(
-            body=f'💰 Dinero ENTREGADO por {self.env.user.name}',
-            message_type='notification'
-        )
-        
+        return solicitud
+    
+    @api.model
+    @instrumentado
+    def action_tomar_siguiente(self, cola):
+        """Abre la siguiente solicitud de la cola ('tesoreria' o 'autorizacion')"""
+        solicitud = self._tomar_siguiente(cola)
+        if not solicitud:
+            notificacion = self._notificacion('Cola vacía', 'No hay solicitudes libres en la cola.')
+            notificacion['params']['type'] = 'info'
+            return notificacion
+        vista = 'view_tesoreria_form' if cola == 'tesoreria' else 'view_autorizador_form_unificada'
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': solicitud.id,
+            'view_mode': 'form',
+            'views': [(self.env.ref(f'ctrl_caja_chica.{vista}').id, 'form')],
+            'target': 'current',
+        }
+    
+    @instrumentado
+    def action_liberar(self):
+        """Devuelve a la cola las solicitudes tomadas por el usuario actual"""
+        self.filtered(lambda r: r.tomada_por_id == self.env.user).write({
+            'tomada_por_id': False,
+            'tomada_hasta': False,
+        })
+    
+    # ============ ACCIONES EN LOTE ============
+    
+    def _resumen_lote(self, titulo, procesadas, errores):
+        """Notificación con el resultado de una acción en lote, con el detalle de errores por solicitud"""
+        lineas = [f'{len(procesadas)} solicitud(es) procesada(s).']
+        if errores:
+            lineas.append(f'{len(errores)} no procesada(s):')
+            lineas += [f'• {rec.numero_solicitud}: {mensaje}' for rec, mensaje in errores.items()]
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
-                'title': '💰 Entregado',
-                'message': 'Dinero entregado exitosamente',
-                'type': 'success',
-                'sticky': False,
-                'next': {'type': 'ir.actions.act_window_close'},
+                'title': titulo,
+                'message': '\n'.join(lineas),
+                'type': 'warning' if errores else 'success',
+                'sticky': bool(errores),
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            }
+        }
+    
+    @instrumentado
+    def action_autorizar_seleccion(self):
+        """Autoriza en lote las solicitudes seleccionadas: una escritura por estado destino"""
+        procesadas, errores = self._transicionar('autorizar')
+        return self._resumen_lote('✅ Autorización en lote', procesadas, errores)
+    
+    @instrumentado
+    def action_rechazar_seleccion(self):
+        """Abre el wizard de rechazo con un motivo común para toda la selección"""
+        return {
+            'name': 'Motivo de Rechazo',
+            'type': 'ir.actions.act_window',
+            'res_model': 'ctrl.caja.solicitud.rechazo.wizard',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {
+                'default_solicitud_ids': [(6, 0, self.ids)],
             }
         }
     
+    @instrumentado
+    def procesar_rechazo_lote(self, comentario):
+        """Rechaza en lote con un mismo motivo: una escritura por nivel"""
+        procesadas, errores = self._transicionar('rechazar', comentario=comentario)
+        return self._resumen_lote('❌ Rechazo en lote', procesadas, errores)
+    
+    @instrumentado
+    def action_entregar_seleccion(self):
+        """Entrega en lote el dinero de las solicitudes autorizadas seleccionadas"""
+        procesadas, errores = self._transicionar('entregar')
+        return self._resumen_lote('💰 Entrega en lote', procesadas, errores)
+    
+    def action_agregar_comprobante(self):
+        self.ensure_one()
+        return {
+            'name': 'Agregar Comprobante',
+            'type': 'ir.actions.act_window',
+            'res_model': 'ctrl.caja.comprobante.wizard',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {'active_model': self._name, 'active_ids': self.ids},
+        }
+    
+    def action_comprobantes_chatter(self):
+        """Pasa a comprobantes las fotos y PDF que se subieron por el chatter"""
+        cantidad = self.env['ctrl.caja.comprobante']._desde_chatter(self)
+        return self._notificacion('📎 Comprobantes', f'{cantidad} adjunto(s) del chatter revisado(s).')
+    
+    @instrumentado
     def action_view_movimiento(self):
         self.ensure_one()
         if not self.movimiento_id:
@@ -0,0 +1,63 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import create_index
+
+class CtrlCajaSolicitudEvento(models.Model):
+    _name = 'ctrl.caja.solicitud.evento'
+    _description = 'Bitácora de Autorizaciones'
+    _order = 'fecha desc, id desc'
+    _rec_name = 'numero_solicitud'
+    _log_access = False
+
+    solicitud_id = fields.Many2one('ctrl.caja.solicitud', string='Solicitud',
+                                   ondelete='set null', readonly=True)
+    # Se conserva aunque la solicitud se elimine o se archive
+    numero_solicitud = fields.Char(string='Número de Solicitud', readonly=True, index=True)
+    centro_costo_id = fields.Many2one('ctrl.caja.centro.costo', string='Centro de Costos',
+                                      ondelete='set null', readonly=True)
+    nivel = fields.Selection([
+        ('nivel1', 'Nivel 1'),
+        ('nivel2', 'Nivel 2'),
+        ('nivel3', 'Nivel 3')
+    ], string='Nivel', readonly=True)
+    user_id = fields.Many2one('res.users', string='Usuario', required=True,
+                              ondelete='restrict', readonly=True)
+    accion = fields.Selection([
+        ('solicitar', 'Enviada'),
+        ('autorizar', 'Autorizada'),
+        ('rechazar', 'Rechazada'),
+        ('cancelar', 'Cancelada'),
+        ('volver_borrador', 'Regresada a Borrador'),
+        ('entregar', 'Entregada'),
+        ('reajustar', 'Reajustada por Límites'),
+    ], string='Acción', required=True, readonly=True)
+    estado_origen = fields.Char(string='Estado Anterior', readonly=True)
+    estado_destino = fields.Char(string='Estado Nuevo', readonly=True)
+    fecha = fields.Datetime(string='Fecha', required=True, readonly=True)
+    comentario = fields.Text(string='Comentario', readonly=True)
+    monto = fields.Float(string='Monto', readonly=True)
+
+    def init(self):
+        create_index(self.env.cr, 'ctrl_caja_solicitud_evento_solicitud_fecha_idx',
+                     self._table, ['solicitud_id', 'fecha'])
+        create_index(self.env.cr, 'ctrl_caja_solicitud_evento_user_fecha_idx',
+                     self._table, ['user_id', 'fecha DESC'])
+        create_index(self.env.cr, 'ctrl_caja_solicitud_evento_accion_fecha_idx',
+                     self._table, ['accion', 'nivel', 'fecha DESC'])
+
+    @api.model
+    def _registrar(self, vals_list):
+        """Agrega eventos a la bitácora (única vía de escritura)"""
+        return self.sudo().with_context(ctrl_caja_evento_registro=True).create(vals_list)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        if not self.env.context.get('ctrl_caja_evento_registro'):
+            raise UserError('La bitácora de autorizaciones solo se escribe desde las transiciones de la solicitud.')
+        return super().create(vals_list)
+
+    def write(self, vals):
+        raise UserError('La bitácora de autorizaciones no se puede modificar.')
+
+    def unlink(self):
+        raise UserError('La bitácora de autorizaciones no se puede eliminar.')
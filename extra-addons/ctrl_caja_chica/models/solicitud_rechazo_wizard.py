@@ -5,8 +5,10 @@ class CtrlCajaSolicitudRechazoWizard(models.TransientModel):
     _name = 'ctrl.caja.solicitud.rechazo.wizard'
     _description = 'Wizard para Rechazar Solicitud'
 
-    solicitud_id = fields.Many2one('ctrl.caja.solicitud', string='Solicitud', required=True)
-    nivel = fields.Char(string='Nivel', required=True)
+    solicitud_id = fields.Many2one('ctrl.caja.solicitud', string='Solicitud')
+    nivel = fields.Char(string='Nivel')
+    solicitud_ids = fields.Many2many('ctrl.caja.solicitud', string='Solicitudes',
+                                     help='Selección a rechazar en lote con un mismo motivo')
     comentario = fields.Text(string='Motivo del Rechazo', required=True,
                             placeholder='Explique el motivo por el cual rechaza esta solicitud...')
 
@@ -17,6 +19,9 @@ class CtrlCajaSolicitudRechazoWizard(models.TransientModel):
         if not self.comentario or self.comentario.strip() == '':
             raise ValidationError('Debe especificar un motivo para el rechazo.')
         
+        if self.solicitud_ids:
+            return self.solicitud_ids.procesar_rechazo_lote(self.comentario)
+        
         self.solicitud_id.procesar_rechazo(self.nivel, self.comentario)
         
         # Regresar a la vista de autorizaciones según el nivel
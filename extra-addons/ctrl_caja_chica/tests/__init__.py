@@ -0,0 +1,10 @@
+from . import test_estadisticas
+from . import test_indices
+from . import test_benchmark
+from . import test_bandeja_api
+from . import test_toma_concurrente
+from . import test_tomar_siguiente
+from . import test_importacion
+from . import test_cubo
+from . import test_comprobante
+from . import test_fondo
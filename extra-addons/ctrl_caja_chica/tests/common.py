@@ -0,0 +1,44 @@
+from odoo.tests.common import TransactionCase, new_test_user
+
+from ..models.solicitud import NIVELES
+
+
+class CajaChicaCommon(TransactionCase):
+    """Centro de costo con un autorizador por nivel, dos tesoreros y catálogos mínimos"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.solicitante = new_test_user(
+            cls.env, 'caja.solicitante', groups='base.group_user,ctrl_caja_chica.group_caja_solicitante')
+        cls.autorizadores = {
+            nivel: new_test_user(cls.env, f'caja.autorizador.{nivel}',
+                                 groups=f'base.group_user,ctrl_caja_chica.group_caja_autorizador_{nivel}')
+            for nivel in NIVELES
+        }
+        cls.tesoreros = [
+            new_test_user(cls.env, f'caja.tesorero.{i}', groups='base.group_user,ctrl_caja_chica.group_caja_tesorero')
+            for i in range(2)
+        ]
+        cls.centro = cls.env['ctrl.caja.centro.costo'].create({
+            'name': 'Centro de Pruebas',
+            'codigo': 'TEST',
+            'monto_nivel1': 1000.0,
+            'monto_nivel2': 5000.0,
+            **{f'autorizador_{nivel}_ids': [(6, 0, usuario.ids)] for nivel, usuario in cls.autorizadores.items()},
+        })
+        cls.concepto = cls.env['ctrl.caja.concepto'].create({'name': 'Papelería', 'codigo': 'PAP'})
+        cls.proveedor = cls.env['ctrl.caja.proveedor'].create({'name': 'Papelería del Centro', 'codigo': 'PCE'})
+
+    @classmethod
+    def _crear_solicitudes(cls, cantidad, **valores):
+        """Crea `cantidad` solicitudes del centro de pruebas con los valores indicados"""
+        return cls.env['ctrl.caja.solicitud'].create([{
+            'responsable_id': cls.solicitante.id,
+            'centro_costo_id': cls.centro.id,
+            'categoria_id': cls.concepto.id,
+            'proveedor_id': cls.proveedor.id,
+            'monto_estimado': 100.0,
+            'metodo_pago': 'efectivo',
+            **valores,
+        } for __ in range(cantidad)])
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from odoo import fields
+from odoo.tests import HttpCase, tagged
+
+from .common import CajaChicaCommon
+
+URL_BANDEJA = '/ctrl_caja/api/bandeja'
+
+
+@tagged('post_install', '-at_install')
+class TestBandejaApi(CajaChicaCommon, HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        hoy = fields.Date.today()
+        # Dos solicitudes por fecha: la paginación desempata por id
+        cls.solicitudes = cls.env['ctrl.caja.solicitud'].browse()
+        for dias in range(3):
+            cls.solicitudes |= cls._crear_solicitudes(
+                2, estado='autorizacion_nivel1', fecha_solicitud=hoy - timedelta(days=dias))
+        cls.autorizador = cls.autorizadores['nivel1']
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.autorizador.login, self.autorizador.login)
+
+    def _bandeja(self, headers=None, **parametros):
+        return self.url_open(f'{URL_BANDEJA}?{urlencode(parametros)}', headers=headers)
+
+    def test_paginacion_por_cursor(self):
+        vistas = []
+        cursor = None
+        for __ in range(len(self.solicitudes)):
+            parametros = {'limite': 4}
+            if cursor:
+                parametros['cursor'] = cursor
+            respuesta = self._bandeja(**parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            pagina = respuesta.json()
+            vistas += [solicitud['id'] for solicitud in pagina['solicitudes']]
+            cursor = pagina['siguiente']
+            if not cursor:
+                break
+        esperadas = self.solicitudes.sorted(lambda s: (s.fecha_solicitud, s.id), reverse=True)
+        self.assertEqual(vistas, esperadas.ids, 'Cada solicitud aparece una vez y en el orden de las listas')
+
+    def test_cursor_invalido(self):
+        respuesta = self._bandeja(cursor='no-es-cursor')
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_etag(self):
+        respuesta = self._bandeja()
+        etag = respuesta.headers['ETag']
+        sin_cambios = self._bandeja(headers={'If-None-Match': etag})
+        self.assertEqual(sin_cambios.status_code, 304)
+        self.assertFalse(sin_cambios.content)
+
+        # Entra una solicitud nueva a la bandeja: la huella cambia
+        self._crear_solicitudes(1, estado='autorizacion_nivel1')
+        con_cambios = self._bandeja(headers={'If-None-Match': etag})
+        self.assertEqual(con_cambios.status_code, 200)
+        self.assertNotEqual(con_cambios.headers['ETag'], etag)
+        self.assertEqual(len(con_cambios.json()['solicitudes']), len(self.solicitudes) + 1)
+
+    def test_autorizar(self):
+        solicitud = self.solicitudes[0]
+        resultado = self.make_jsonrpc_request(
+            f'/ctrl_caja/api/solicitud/{solicitud.id}/autorizar', {'nivel': 'nivel1'})
+        self.assertTrue(resultado['ok'], resultado.get('error'))
+        solicitud.invalidate_recordset()
+        self.assertEqual(solicitud.estado, 'autorizado')
+        # El segundo clic encuentra la solicitud fuera del nivel 1
+        repetido = self.make_jsonrpc_request(
+            f'/ctrl_caja/api/solicitud/{solicitud.id}/autorizar', {'nivel': 'nivel1'})
+        self.assertFalse(repetido['ok'])
@@ -0,0 +1,26 @@
+import json
+
+from odoo.tests import TransactionCase, tagged
+
+ESCENARIOS = ('kanban_autorizador', 'mis_pendientes', 'estadisticas_catalogos', 'flujo_completo', 'formulario_arqueo')
+
+
+@tagged('benchmark', '-standard', 'post_install', '-at_install')
+class TestBenchmark(TransactionCase):
+    """Benchmark del módulo; fuera de la suite normal. Se ejecuta con
+    --test-tags benchmark y el JSON de resultados queda en el log.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['ctrl.caja.benchmark']._generar_datos(
+            centros=5, autorizadores=2, catalogos=50, solicitudes=50000, movimientos=50000, dias=365)
+
+    def test_benchmark(self):
+        resultado = json.loads(self.env['ctrl.caja.benchmark']._ejecutar_benchmark(repeticiones=3))
+        self.assertGreaterEqual(resultado['volumen']['ctrl.caja.solicitud'], 50000)
+        self.assertEqual(set(resultado['escenarios']), set(ESCENARIOS))
+        for nombre, medicion in resultado['escenarios'].items():
+            self.assertGreater(medicion['consultas'], 0, nombre)
+            self.assertLessEqual(medicion['ms_min'], medicion['ms_max'], nombre)
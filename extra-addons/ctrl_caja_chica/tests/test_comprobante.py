@@ -0,0 +1,52 @@
+import base64
+import io
+
+from PIL import Image
+
+from odoo.tests import HttpCase, new_test_user, tagged
+
+from .common import CajaChicaCommon
+
+
+@tagged('post_install', '-at_install')
+class TestComprobante(CajaChicaCommon, HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        imagen = io.BytesIO()
+        Image.new('RGB', (600, 400), 'white').save(imagen, 'PNG')
+        cls.solicitud = cls._crear_solicitudes(1)
+        cls.wizard = cls.env['ctrl.caja.comprobante.wizard'].with_context(
+            active_model='ctrl.caja.solicitud', active_ids=cls.solicitud.ids,
+        ).create({'archivo': base64.b64encode(imagen.getvalue()), 'nombre_archivo': 'ticket.png'})
+        cls.wizard.action_agregar()
+        cls.comprobante = cls.solicitud.comprobante_ids
+        cls.ajeno = new_test_user(cls.env, 'caja.ajeno', groups='base.group_user')
+
+    def test_agregar_comparte_archivo(self):
+        adjunto = self.env['ir.attachment'].search([
+            ('res_model', '=', self.wizard._name),
+            ('res_id', '=', self.wizard.id),
+            ('res_field', '=', 'archivo'),
+        ])
+        self.assertEqual(len(self.comprobante), 1)
+        self.assertEqual(self.comprobante.name, 'ticket.png')
+        self.assertEqual(self.comprobante.checksum, adjunto.checksum)
+        self.assertEqual(self.comprobante.attachment_id.store_fname, adjunto.store_fname)
+
+    def test_miniatura_con_acceso(self):
+        self.authenticate(self.solicitante.login, self.solicitante.login)
+        respuesta = self.url_open(f'/ctrl_caja/comprobante/{self.comprobante.id}/miniatura')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.headers['Content-Type'], 'image/png')
+        self.comprobante.invalidate_recordset(['miniatura'])
+        self.assertTrue(self.comprobante.miniatura)
+
+    def test_miniatura_sin_acceso(self):
+        """Sin acceso a la solicitud vinculada no se sirve ni se genera la miniatura"""
+        self.authenticate(self.ajeno.login, self.ajeno.login)
+        respuesta = self.url_open(f'/ctrl_caja/comprobante/{self.comprobante.id}/miniatura')
+        self.assertEqual(respuesta.status_code, 403)
+        self.comprobante.invalidate_recordset(['miniatura'])
+        self.assertFalse(self.comprobante.miniatura)
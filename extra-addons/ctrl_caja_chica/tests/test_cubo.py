@@ -0,0 +1,26 @@
+from odoo.tests import tagged
+
+from .common import CajaChicaCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCubo(CajaChicaCommon):
+
+    def _celdas(self, **dominio):
+        Cubo = self.env['ctrl.caja.cubo']
+        Cubo.invalidate_model()
+        return Cubo.search([('origen', '=', 'solicitud')] + [(campo, '=', valor) for campo, valor in dominio.items()])
+
+    def test_eliminar_concepto(self):
+        """Eliminar un concepto usado no falla y sus solicitudes siguen en el cubo"""
+        concepto = self.env['ctrl.caja.concepto'].create({'name': 'Temporal'})
+        solicitudes = self._crear_solicitudes(3, categoria_id=concepto.id, concepto_texto='Temporal',
+                                              monto_estimado=50.0)
+        self.assertEqual(sum(self._celdas(concepto_id=concepto.id).mapped('cantidad')), 3)
+
+        concepto.unlink()
+        self.assertFalse(solicitudes.categoria_id)
+        celdas = self._celdas(centro_costo_id=self.centro.id, concepto_texto='Temporal')
+        self.assertEqual(sum(celdas.mapped('cantidad')), 3)
+        self.assertAlmostEqual(sum(celdas.mapped('monto')), 150.0)
+        self.assertFalse(celdas.concepto_id)
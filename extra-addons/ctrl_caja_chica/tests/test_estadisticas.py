@@ -0,0 +1,60 @@
+from odoo.tests import tagged
+
+from .common import CajaChicaCommon
+
+
+@tagged('post_install', '-at_install')
+class TestEstadisticas(CajaChicaCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.proveedores = cls.env['ctrl.caja.proveedor'].create([
+            {'name': f'Proveedor {i}', 'codigo': f'P{i}'} for i in range(30)
+        ])
+        for i, proveedor in enumerate(cls.proveedores):
+            cls._crear_solicitudes(i % 3 + 1, proveedor_id=proveedor.id, monto_estimado=10.0 * (i + 1))
+
+    def _consultas_estadisticas(self, registros):
+        """Consultas SQL que cuesta calcular las estadísticas del recordset"""
+        self.env.flush_all()
+        registros.invalidate_recordset(['cantidad_solicitudes', 'monto_total'])
+        inicio = self.cr.sql_log_count
+        registros.mapped('monto_total')
+        return self.cr.sql_log_count - inicio
+
+    def test_valores(self):
+        for i, proveedor in enumerate(self.proveedores):
+            cantidad = i % 3 + 1
+            self.assertEqual(proveedor.cantidad_solicitudes, cantidad)
+            self.assertAlmostEqual(proveedor.monto_total, cantidad * 10.0 * (i + 1))
+        self.assertEqual(self.concepto.cantidad_solicitudes, 60)
+        self.assertEqual(self.centro.cantidad_solicitudes, 60)
+
+    def test_consultas_constantes(self):
+        """Uno o treinta proveedores cuestan lo mismo: una consulta agrupada por
+        tabla (solicitudes activas y archivadas)
+        """
+        self._consultas_estadisticas(self.proveedores)
+        una = self._consultas_estadisticas(self.proveedores[:1])
+        todas = self._consultas_estadisticas(self.proveedores)
+        self.assertEqual(una, todas, 'Las consultas de estadísticas crecen con el recordset')
+        self.assertLessEqual(todas, 2)
+
+    def test_orden_por_monto(self):
+        """Los proveedores se pueden listar de mayor a menor monto comprado"""
+        self.assertTrue(self.env['ctrl.caja.proveedor'].fields_get(['monto_total'])['monto_total']['sortable'])
+        proveedores = self.env['ctrl.caja.proveedor'].search(
+            [('id', 'in', self.proveedores.ids)], order='monto_total desc, id')
+        montos = proveedores.mapped('monto_total')
+        self.assertEqual(montos, sorted(montos, reverse=True))
+        self.assertEqual(proveedores[0], self.proveedores[-1])
+
+    def test_busqueda(self):
+        proveedores = self.env['ctrl.caja.proveedor'].search(
+            [('id', 'in', self.proveedores.ids), ('monto_total', '>', 500)])
+        self.assertEqual(proveedores, self.proveedores.filtered(lambda p: p.monto_total > 500))
+        sin_compras = self.env['ctrl.caja.proveedor'].create({'name': 'Sin Compras', 'codigo': 'SC'})
+        self.assertEqual(
+            self.env['ctrl.caja.proveedor'].search([('cantidad_solicitudes', '=', 0), ('codigo', '=', 'SC')]),
+            sin_compras)
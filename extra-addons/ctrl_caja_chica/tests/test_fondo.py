@@ -0,0 +1,32 @@
+from datetime import date
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+from odoo.tools import date_utils
+
+
+@tagged('post_install', '-at_install')
+class TestFondo(TransactionCase):
+
+    def test_cortes_faltantes(self):
+        """Sin cortes, el cron registra uno por mes desde el primer movimiento del libro"""
+        Corte = self.env['ctrl.caja.fondo.corte']
+        Movimiento = self.env['ctrl.caja.fondo.movimiento']
+        Corte.search([]).unlink()
+        Movimiento.create([
+            {'fecha': date(2020, 1, 15), 'monto': 1000.0, 'tipo': 'reposicion'},
+            {'fecha': date(2020, 3, 10), 'monto': -250.0, 'tipo': 'ajuste'},
+        ])
+        cortes = Corte._generar_corte()
+        hasta = fields.Date.context_today(Corte).replace(day=1)
+        esperadas = []
+        fecha = date_utils.end_of(Movimiento.search([], order='fecha', limit=1).fecha, 'month')
+        while fecha < hasta:
+            esperadas.append(fecha)
+            fecha = date_utils.end_of(date_utils.add(fecha, days=1), 'month')
+        self.assertEqual(sorted(cortes.mapped('fecha')), esperadas)
+        for corte in cortes:
+            self.env.cr.execute(
+                "SELECT COALESCE(SUM(monto), 0) FROM ctrl_caja_fondo_movimiento WHERE fecha <= %s", [corte.fecha])
+            self.assertAlmostEqual(corte.saldo, float(self.env.cr.fetchone()[0]))
+        self.assertFalse(Corte._generar_corte(), 'Con los cortes al día no se registra ninguno')
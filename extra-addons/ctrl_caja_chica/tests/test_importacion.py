@@ -0,0 +1,37 @@
+import base64
+import csv
+import io
+
+from odoo.tests import TransactionCase, tagged
+
+ARCHIVO = """Fecha,Tipo de Gasto,Concepto,Centro de Costos,Desembolso,Descripción
+15/01/2024,Caja Chica,Papelería,Almacén,"$1,150.50",Hojas y plumas
+2024-01-16,Variable,Limpieza,Logística,80,Jabón
+no es fecha,Fijo,Renta,Planta,900,Renta de enero
+"""
+
+
+@tagged('post_install', '-at_install')
+class TestImportacion(TransactionCase):
+
+    def test_importar_csv(self):
+        wizard = self.env['ctrl.caja.importacion.wizard'].create({
+            'archivo': base64.b64encode(ARCHIVO.encode('utf-8-sig')),
+            'nombre_archivo': 'movimientos.csv',
+            'tamano_lote': 1,
+        })
+        wizard.action_importar()
+        self.assertEqual(wizard.estado, 'hecho')
+        self.assertEqual(wizard.filas_importadas, 2)
+        self.assertEqual(wizard.filas_rechazadas, 1)
+
+        movimientos = self.env['ctrl.caja.chica'].search(
+            [('descripcion', 'in', ('Hojas y plumas', 'Jabón'))], order='fecha')
+        self.assertEqual(movimientos.mapped('monto'), [1150.50, 80.0])
+        self.assertEqual(movimientos.mapped('tipo_gasto'), ['caja_chica', 'variable'])
+        self.assertEqual(movimientos.mapped('centro_costo'), ['alm', 'logis'])
+
+        rechazos = list(csv.reader(io.StringIO(base64.b64decode(wizard.archivo_rechazos).decode('utf-8-sig'))))
+        self.assertEqual(rechazos[0][0], 'fila')
+        self.assertEqual(rechazos[1][0], '4')
+        self.assertIn('Fecha inválida', rechazos[1][-1])
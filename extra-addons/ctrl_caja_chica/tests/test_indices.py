@@ -0,0 +1,31 @@
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import CajaChicaCommon
+
+VOLUMEN = 20000
+
+
+@tagged('post_install', '-at_install')
+class TestIndices(CajaChicaCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Volumen sintético con la distribución de estados del generador de benchmark
+        cls.env['ctrl.caja.benchmark']._insertar_solicitudes(
+            1, VOLUMEN, cls.centro.ids, cls.concepto.ids, cls.proveedor.ids, cls.solicitante, 365)
+        cls.env.invalidate_all()
+        cls.cr.execute('ANALYZE ctrl_caja_solicitud')
+
+    def test_consultas_criticas_usan_su_indice(self):
+        Solicitud = self.env['ctrl.caja.solicitud']
+        usados = Solicitud._verificar_plan_indices()
+        for nombre, __, __, indice in Solicitud._consultas_criticas():
+            self.assertIn(indice, usados[nombre], f'La consulta {nombre} no usa {indice}')
+
+    def test_indice_faltante(self):
+        """Sin el índice de tesorería la verificación lo reporta"""
+        self.cr.execute('DROP INDEX ctrl_caja_solicitud_autorizado_idx')
+        with self.assertRaisesRegex(UserError, 'tesoreria'):
+            self.env['ctrl.caja.solicitud']._verificar_plan_indices()
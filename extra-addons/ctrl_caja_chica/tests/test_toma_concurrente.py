@@ -0,0 +1,127 @@
+import functools
+import threading
+import uuid
+from datetime import date
+
+from odoo import api, SUPERUSER_ID
+from odoo.exceptions import UserError
+from odoo.service.model import retrying
+from odoo.tests import TransactionCase, new_test_user, tagged
+
+SOLICITUDES = 20
+TESOREROS = 3
+# Más antigua que cualquier dato de la base: la cola entrega primero las de la prueba
+FECHA_PRUEBA = date(2000, 1, 1)
+
+
+@tagged('concurrency', '-standard', 'post_install', '-at_install')
+class TestTomaConcurrente(TransactionCase):
+    """La toma concurrente solo se puede probar entre transacciones reales: los datos
+    se confirman desde cursores propios (que no ven la transacción del test) y se
+    eliminan al terminar. Como escribe en la base fuera de la transacción del test,
+    queda fuera de la suite normal; se ejecuta con --test-tags concurrency.
+    """
+
+    def setUp(self):
+        super().setUp()
+        sufijo = uuid.uuid4().hex[:8]
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            tesoreros = [
+                new_test_user(env, f'caja.concurrente.{sufijo}.{i}',
+                              groups='base.group_user,ctrl_caja_chica.group_caja_tesorero')
+                for i in range(TESOREROS)
+            ]
+            centro = env['ctrl.caja.centro.costo'].create({'name': f'Concurrente {sufijo}', 'codigo': sufijo})
+            solicitudes = env['ctrl.caja.solicitud'].create([{
+                'centro_costo_id': centro.id,
+                'concepto_texto': 'Prueba concurrente',
+                'proveedor_texto': 'Prueba concurrente',
+                'monto_estimado': 100.0,
+                'metodo_pago': 'efectivo',
+                'fecha_solicitud': FECHA_PRUEBA,
+                'estado': 'autorizado',
+            } for __ in range(SOLICITUDES)])
+            self.tesoreros_ids = [tesorero.id for tesorero in tesoreros]
+            self.centro_id = centro.id
+            self.solicitudes_ids = solicitudes.ids
+        self.addCleanup(self._limpiar)
+
+    def _limpiar(self):
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            ids = tuple(self.solicitudes_ids)
+            # La bitácora no se deja borrar por el ORM
+            cr.execute("DELETE FROM ctrl_caja_solicitud_evento WHERE solicitud_id IN %s", [ids])
+            cr.execute("DELETE FROM ctrl_caja_cola WHERE res_model = 'ctrl.caja.solicitud' AND res_id IN %s", [ids])
+            env['ctrl.caja.solicitud'].browse(ids).unlink()
+            env['ctrl.caja.centro.costo'].browse(self.centro_id).unlink()
+            env['res.users'].browse(self.tesoreros_ids).write({'active': False})
+
+    def _entregas(self):
+        """{solicitud_id: número de entregas registradas en la bitácora}"""
+        with self.registry.cursor() as cr:
+            cr.execute("""
+                SELECT solicitud_id, COUNT(*) FROM ctrl_caja_solicitud_evento
+                 WHERE accion = 'entregar' AND solicitud_id IN %s
+                 GROUP BY solicitud_id
+            """, [tuple(self.solicitudes_ids)])
+            return dict(cr.fetchall())
+
+    def _entregar_siguiente(self, Solicitud):
+        solicitud = Solicitud._tomar_siguiente('tesoreria')
+        if solicitud.id in self.solicitudes_ids:
+            solicitud.action_entregar_dinero()
+        return solicitud
+
+    def _tesorero(self, user_id, barrera, entregadas, fallas):
+        """Toma y entrega solicitudes de la cola de tesorería hasta vaciarla"""
+        try:
+            with self.registry.cursor() as cr:
+                Solicitud = api.Environment(cr, user_id, {})['ctrl.caja.solicitud']
+                barrera.wait()
+                while True:
+                    # Los acumulados compartidos (cubo, presupuesto) pueden chocar entre
+                    # tesoreros: se reintenta igual que en una petición al servidor
+                    solicitud = retrying(functools.partial(self._entregar_siguiente, Solicitud), Solicitud.env)
+                    if solicitud.id not in self.solicitudes_ids:
+                        # Cola vacía o solicitud ajena a la prueba: no se toca
+                        cr.rollback()
+                        return
+                    cr.commit()
+                    entregadas.append(solicitud.id)
+        except Exception as error:
+            fallas.append(error)
+            barrera.abort()
+
+    def test_sin_entregas_dobles(self):
+        barrera = threading.Barrier(TESOREROS)
+        entregadas = {user_id: [] for user_id in self.tesoreros_ids}
+        fallas = []
+        hilos = [
+            threading.Thread(target=self._tesorero, args=(user_id, barrera, entregadas[user_id], fallas))
+            for user_id in self.tesoreros_ids
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        if fallas:
+            raise fallas[0]
+
+        todas = [solicitud_id for ids in entregadas.values() for solicitud_id in ids]
+        self.assertEqual(len(todas), len(set(todas)), 'Dos tesoreros entregaron la misma solicitud')
+        self.assertEqual(set(todas), set(self.solicitudes_ids))
+        self.assertEqual(self._entregas(), dict.fromkeys(self.solicitudes_ids, 1))
+
+    def test_segundo_clic_falla_sin_esperar(self):
+        solicitud_id = self.solicitudes_ids[0]
+        with self.registry.cursor() as cr_primero, self.registry.cursor() as cr_segundo:
+            primero = api.Environment(cr_primero, self.tesoreros_ids[0], {})['ctrl.caja.solicitud']
+            segundo = api.Environment(cr_segundo, self.tesoreros_ids[1], {})['ctrl.caja.solicitud']
+            # El primero entrega y mantiene la fila bloqueada hasta confirmar
+            primero.browse(solicitud_id).action_entregar_dinero()
+            with self.assertRaisesRegex(UserError, 'Otro usuario está procesando'):
+                segundo.browse(solicitud_id).action_entregar_dinero()
+            cr_segundo.rollback()
+        self.assertEqual(self._entregas(), {solicitud_id: 1})
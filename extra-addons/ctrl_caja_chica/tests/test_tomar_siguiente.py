@@ -0,0 +1,47 @@
+import json
+from datetime import date
+
+from lxml import etree
+
+from odoo.tests import HttpCase, tagged
+
+from .common import CajaChicaCommon
+
+
+@tagged('post_install', '-at_install')
+class TestTomarSiguiente(CajaChicaCommon, HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Más antigua que cualquier otra de la base: es la primera de la cola
+        cls.solicitud = cls._crear_solicitudes(1, estado='autorizado', fecha_solicitud=date(2000, 1, 1))
+        cls.tesorero = cls.tesoreros[0]
+
+    def _clic_encabezado(self, vista):
+        """Ejecuta el botón del encabezado de la lista como lo hace el cliente web,
+        sin registros seleccionados
+        """
+        Solicitud = self.env['ctrl.caja.solicitud'].with_user(self.tesorero)
+        arch = Solicitud.get_views([(self.env.ref(vista).id, 'list')])['views']['list']['arch']
+        boton = etree.fromstring(arch).find('header/button')
+        contexto = {'active_model': Solicitud._name, 'active_ids': []}
+        if boton.get('type') == 'action':
+            return self.make_jsonrpc_request('/web/action/run', {
+                'action_id': int(boton.get('name')),
+                'context': contexto,
+            })
+        return self.make_jsonrpc_request('/web/dataset/call_button', {
+            'model': Solicitud._name,
+            'method': boton.get('name'),
+            'args': [[], *json.loads((boton.get('args') or '[]').replace("'", '"'))],
+            'kwargs': {'context': contexto},
+        })
+
+    def test_boton_tesoreria(self):
+        self.authenticate(self.tesorero.login, self.tesorero.login)
+        accion = self._clic_encabezado('ctrl_caja_chica.view_tesoreria_tree')
+        self.assertEqual(accion['type'], 'ir.actions.act_window')
+        self.assertEqual(accion['res_id'], self.solicitud.id)
+        self.solicitud.invalidate_recordset()
+        self.assertEqual(self.solicitud.tomada_por_id, self.tesorero)